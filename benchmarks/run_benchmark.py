@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Staging Load Benchmark for ANAIS
+
+This script generates synthetic CSV files from the DDL (see synthetic_data.py) at
+several scales, then times, for each scale:
+    - each stage on its own: CSV parse (pandas), type conversion (the conversion
+      plans used by pipeline_patches.py) and the native DuckDB load
+    - the full local_staging_pipeline_with_sftp path (load + dbt run + dbt test)
+      for each requested loader, with the per-stage numbers of its run report
+
+Results are saved as JSON under benchmarks/results/. Passing a previous result
+file with --baseline compares each timing with it and exits with code 1 when a
+timing regressed by more than --max-regression.
+
+Each scale runs in a temporary work directory holding the generated files, the
+DuckDB database and links to output_sql/, dbtStaging/ and profiles.yml, so the
+repository's own data/ and input/ directories are never touched.
+
+Usage:
+    python benchmarks/run_benchmark.py --scales 1 10 --base-rows 1000
+    python benchmarks/run_benchmark.py --scales 1 10 --baseline benchmarks/results/benchmark_20250101_120000.json
+"""
+
+# === Packages ===
+import argparse
+import gc
+import importlib.util
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import duckdb
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# === Modules ===
+from synthetic_data import DEFAULT_SEED, generate_dataset
+from ddl_schema import load_table_schemas
+from file_inspection import inspect_file
+from run_report import RunReport
+from staging_loader import NativeDuckDBLoader
+from type_conversion import compile_plan
+
+# === Constants ===
+RESULTS_DIRECTORY = REPO_ROOT / "benchmarks" / "results"
+LINKED_PATHS = ["output_sql", "dbtStaging", "profiles.yml", "metadata.yml"]
+INPUT_DIRECTORY = "input/staging/"
+DDL_DIRECTORY = "output_sql/staging/"
+DB_PATH = "data/staging/duckdb_database.duckdb"
+PROFILE = "Staging"
+LOADER_CHOICE = ["pipeline", "duckdb-native"]
+
+
+def git_commit() -> Optional[str]:
+    """Current commit of the repository (None outside a git checkout)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(function: Callable, repeat: int) -> dict:
+    """Run function repeat times and return the median and minimum wall time."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"seconds": round(statistics.median(timings), 3), "min_seconds": round(min(timings), 3)}
+
+
+def prepare_work_directory(rows: int, seed: int, tables: Optional[List[str]]) -> tuple:
+    """Create a work directory with generated inputs and links to the project files."""
+    work_directory = tempfile.mkdtemp(prefix="anais_benchmark_")
+    for name in LINKED_PATHS:
+        os.symlink(REPO_ROOT / name, os.path.join(work_directory, name))
+    os.makedirs(os.path.join(work_directory, os.path.dirname(DB_PATH)))
+    sizes = generate_dataset(
+        os.path.join(work_directory, INPUT_DIRECTORY), rows, str(REPO_ROOT / DDL_DIRECTORY), seed, tables
+    )
+    return work_directory, sizes
+
+
+def remove_database():
+    # dbt-duckdb keeps the database open in-process between dbt commands: release it
+    # first, or the next loader would reuse an instance whose files were removed.
+    # Only once dbt ran in this process: the isolated stages run without dbt installed
+    if "dbt.adapters.duckdb.connections" in sys.modules:
+        from dbt.adapters.duckdb.connections import DuckDBConnectionManager
+
+        DuckDBConnectionManager.close_all_connections()
+    gc.collect()
+    for path in (DB_PATH, f"{DB_PATH}.wal"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def benchmark_isolated_stages(logger: logging.Logger, repeat: int) -> Dict[str, dict]:
+    """Time CSV parsing, type conversion and the native DuckDB load separately."""
+    config = {"local_directory_input": INPUT_DIRECTORY, "create_table_directory": DDL_DIRECTORY}
+    loader = NativeDuckDBLoader(db_config={"path": DB_PATH}, config=config, logger=logger)
+    loader.schemas = load_table_schemas(DDL_DIRECTORY)
+    tables = loader.list_tables_to_load()
+    inspections = {table: inspect_file(os.path.join(INPUT_DIRECTORY, f"{table}.csv"), table) for table in tables}
+
+    def parse() -> Dict[str, pd.DataFrame]:
+        return {table: next(loader.iter_csv_batches(inspections[table])) for table in tables}
+
+    frames = parse()
+
+    def convert():
+        for table, df in frames.items():
+            schema = loader.schemas[table]
+            plan = compile_plan(schema.to_schema_df(), {c.base_type: c.target for c in schema.columns})
+            plan.apply(df.copy())
+
+    def native_load():
+        remove_database()
+        loader.connect()
+        try:
+            loader.run()
+        finally:
+            loader.close()
+
+    return {
+        "csv_parse": timed(parse, repeat),
+        "type_conversion": timed(convert, repeat),
+        "native_load": timed(native_load, repeat),
+    }
+
+
+def benchmark_full_pipeline(loader_type: str, logger: logging.Logger, repeat: int) -> dict:
+    """Time local_staging_pipeline_with_sftp from an empty database (load + dbt run + dbt test)."""
+    if loader_type == "pipeline" and importlib.util.find_spec("pipeline") is None:
+        return {"skipped": "the 'pipeline' loader needs the pipeline package"}
+    from run_local_with_sftp import PipelineOptions, local_staging_pipeline_with_sftp
+
+    config = {
+        "local_directory_input": INPUT_DIRECTORY,
+        "create_table_directory": DDL_DIRECTORY,
+        "models_directory": "dbtStaging",
+    }
+    timings, reports, errors = [], [], []
+    for _ in range(repeat):
+        remove_database()
+        report = RunReport()
+        start = time.perf_counter()
+        try:
+            local_staging_pipeline_with_sftp(
+                profile=PROFILE,
+                config=config,
+                db_config={"path": DB_PATH},
+                logger=logger,
+                options=PipelineOptions(loader_type=loader_type, full_load=True),
+                report=report
+            )
+        except Exception as e:
+            # Synthetic data may fail some dbt data tests: the timings are still valid
+            errors.append(str(e))
+        timings.append(time.perf_counter() - start)
+        reports.append(report.to_dict())
+
+    median_index = timings.index(sorted(timings)[len(timings) // 2])
+    return {
+        "seconds": round(timings[median_index], 3),
+        "min_seconds": round(min(timings), 3),
+        "stages": reports[median_index]["stages"],
+        "errors": sorted(set(errors)),
+    }
+
+
+def flatten_timings(results: dict) -> Dict[str, float]:
+    """'<scale>/<benchmark>' -> seconds, for baseline comparison."""
+    timings = {}
+    for scale, scale_results in results.items():
+        for stage, timing in scale_results["isolated"].items():
+            timings[f"{scale}/isolated/{stage}"] = timing["seconds"]
+        for loader_type, timing in scale_results["full"].items():
+            if "seconds" in timing:
+                timings[f"{scale}/full/{loader_type}"] = timing["seconds"]
+                for stage, metrics in timing["stages"].items():
+                    timings[f"{scale}/full/{loader_type}/{stage}"] = metrics["wall_seconds"]
+    return timings
+
+
+def compare_with_baseline(results: dict, baseline_path: str, max_regression: float) -> bool:
+    """Print current vs baseline timings and return False if one regressed beyond max_regression."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = flatten_timings(json.load(f)["results"])
+    current = flatten_timings(results)
+
+    print(f"\n{'Benchmark':<60} {'Baseline':>10} {'Current':>10} {'Ratio':>8}")
+    ok = True
+    for name in sorted(set(baseline) & set(current)):
+        ratio = current[name] / baseline[name] if baseline[name] else 1.0
+        flag = ""
+        if ratio > 1 + max_regression:
+            flag, ok = "  ❌ regression", False
+        elif ratio < 1 - max_regression:
+            flag = "  ✅ faster"
+        print(f"{name:<60} {baseline[name]:>9.3f}s {current[name]:>9.3f}s {ratio:>7.2f}x{flag}")
+    return ok
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Benchmark the staging load on synthetic data")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10], help="Scales (multiples of --base-rows)")
+    parser.add_argument("--base-rows", type=int, default=1000, help="Rows per table at scale 1")
+    parser.add_argument("--loaders", nargs="+", choices=LOADER_CHOICE, default=LOADER_CHOICE,
+                        help="Loaders timed on the full pipeline path")
+    parser.add_argument("--tables", nargs="*", help="Tables to generate (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (the median is kept)")
+    parser.add_argument("--skip-full", action="store_true", help="Only time the isolated stages")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed of the synthetic data")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/benchmark_<timestamp>.json)")
+    parser.add_argument("--baseline", help="Previous result file to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed slowdown vs the baseline before failing (default: 0.2 = 20%%)")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the work directories")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+    logger = logging.getLogger("benchmark")
+
+    started_at = datetime.now()
+    results = {}
+    for scale in args.scales:
+        rows = args.base_rows * scale
+        print(f"=== Scale {scale}x ({rows} rows per table) ===")
+        work_directory, sizes = prepare_work_directory(rows, args.seed, args.tables)
+        previous_directory = os.getcwd()
+        os.chdir(work_directory)
+        try:
+            scale_results = {
+                "rows_per_table": rows,
+                "tables": len(sizes),
+                "input_bytes": sum(sizes.values()),
+                "isolated": benchmark_isolated_stages(logger, args.repeat),
+                "full": {},
+            }
+            if not args.skip_full:
+                for loader_type in args.loaders:
+                    scale_results["full"][loader_type] = benchmark_full_pipeline(loader_type, logger, args.repeat)
+        finally:
+            os.chdir(previous_directory)
+            if args.keep_data:
+                print(f"Work directory kept: {work_directory}")
+            else:
+                shutil.rmtree(work_directory, ignore_errors=True)
+
+        for stage, timing in scale_results["isolated"].items():
+            print(f"  {stage:<20} {timing['seconds']:>8.3f}s")
+        for loader_type, timing in scale_results["full"].items():
+            if "skipped" in timing:
+                print(f"  full ({loader_type}): skipped, {timing['skipped']}")
+            else:
+                print(f"  full ({loader_type}){'':<6} {timing['seconds']:>8.3f}s")
+        results[f"{scale}x"] = scale_results
+
+    output = {
+        "created_at": started_at.isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "duckdb": duckdb.__version__,
+            "pandas": pd.__version__,
+        },
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results,
+    }
+    output_path = args.output or str(RESULTS_DIRECTORY / f"benchmark_{started_at:%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nResults saved to {output_path}")
+
+    if args.baseline and not compare_with_baseline(results, args.baseline, args.max_regression):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Synthetic Staging Data for ANAIS Benchmarks
+
+This module generates, from the CREATE TABLE files of output_sql/staging/, CSV files
+shaped like the real extracts but containing no real data:
+    - per-source delimiters (';' for SIREC, '¤' for SIVSS, ',' otherwise)
+    - accented, human-readable headers that normalize back to the DDL column names
+    - %d-%m-%Y dates in date columns, 'true'/'false' strings in VARCHAR(5) columns
+    - long free-text columns (descriptions, comments...) with quotes, delimiters
+      and line breaks, and values longer than their VARCHAR(n) length
+    - empty values and 'nan' in numeric columns
+
+Values are drawn with a fixed seed, so a given scale always produces the same files.
+
+Usage:
+    python benchmarks/synthetic_data.py --output /tmp/bench/input/staging --rows 10000
+"""
+
+# === Packages ===
+import argparse
+import csv
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# === Modules ===
+from ddl_schema import (
+    DELIMITER_MAP, ColumnDef, TableSchema, load_table_schemas, normalize_column_name, normalize_column_names
+)
+
+# === Constants ===
+DEFAULT_DDL_DIRECTORY = "output_sql/staging/"
+DEFAULT_SEED = 20240101
+WRITE_BATCH_ROWS = 50_000
+POOL_SIZE = 5_000
+EMPTY_RATE = 0.05
+LONG_TEXT_PATTERN = re.compile(r"description|commentaire|observation|precision|mesures|consequences")
+DATE_PATTERN = re.compile(r"(^|_)date(_|$)")
+YES_NO_PATTERN = re.compile(r"_oui_non$")
+# Appended to the header of a name ending with '_' at the truncation length
+TRUNCATED_CONTINUATION = "-1"
+
+ACCENTED_WORDS = {
+    "numero": "numéro", "reception": "réception", "reclamation": "réclamation",
+    "requerant": "requérant", "etablissement": "établissement", "etablissements": "établissements",
+    "region": "région", "departement": "département", "creation": "création",
+    "prioritaire": "prioritaire", "precisions": "précisions", "cloture": "clôture",
+    "reponse": "réponse", "competence": "compétence", "declarant": "déclarant",
+    "qualite": "qualité", "categorie": "catégorie", "entree": "entrée",
+    "siege": "siège", "mesures": "mesures", "premier": "premier", "niveau": "niveau",
+}
+WORDS = [
+    "établissement", "réclamation", "santé", "hôpital", "médico-social", "qualité", "sécurité",
+    "évènement", "déclaration", "agence", "région", "contrôle", "inspection", "usager", "prise",
+    "charge", "délai", "procédure", "médecin", "infirmier", "résident", "famille", "suivi",
+]
+WORD_ARRAY = np.array(WORDS, dtype=object)
+
+
+def accented_header(column_name: str, max_length: int = 63) -> str:
+    """
+    Human-readable header of a column (e.g. 'numero_de_la_reclamation' ->
+    'Numéro de la réclamation'), or the column name itself when the header would
+    not normalize back to it.
+
+    A name truncated right after an underscore ('..._de_lannee_n_') gets a header
+    that continues past the truncation length ('... de l'année n-1'): the separator
+    normalizes to the trailing '_', the next character is truncated away.
+    """
+    truncated = column_name.endswith("_") and len(column_name) == max_length
+    words = [ACCENTED_WORDS.get(word, word) for word in column_name.rstrip("_").split("_")]
+    header = " ".join(words) + (TRUNCATED_CONTINUATION if truncated else "")
+    header = header[:1].upper() + header[1:]
+    return header if normalize_column_name(header, max_length) == column_name else column_name
+
+
+def accented_headers(column_names: List[str]) -> List[str]:
+    """
+    Headers of a table (see accented_header) that normalize_column_names turns back
+    into column_names.
+
+    A duplicated column ('..._n_11', '..._de__1', 'commentaire_1') repeats the header
+    of an earlier column, as is or with another case, as the real extracts do.
+    """
+    headers: List[str] = []
+    for column_name in column_names:
+        # Only a name ending with a digit can be a duplicate, of a column sharing its stem
+        stem = column_name.rstrip("0123456789").rstrip("_")
+        candidates = []
+        if stem != column_name:
+            for previous, previous_name in zip(reversed(headers), reversed(column_names[:len(headers)])):
+                if previous_name.startswith(stem):
+                    candidates += [previous, previous.lower() if previous != previous.lower() else previous.upper()]
+        candidates.append(accented_header(column_name))
+        header = next(
+            (candidate for candidate in candidates
+             if normalize_column_names(headers + [candidate])[-1] == column_name),
+            column_name
+        )
+        headers.append(header)
+    return headers
+
+
+class SyntheticTableWriter:
+    """Generate the CSV file of one table, batch by batch, from its schema."""
+
+    def __init__(self, schema: TableSchema, seed: int = DEFAULT_SEED):
+        self.schema = schema
+        self.delimiter = DELIMITER_MAP.get(schema.name, ",")
+        # Stable per-table seed, independent of the table order
+        self.rng = np.random.default_rng([seed, sum(schema.name.encode("utf-8"))])
+        self.pools: Dict[str, np.ndarray] = {}
+
+    def _texts(self, count: int, min_words: int, max_words: int) -> List[str]:
+        """count random texts of min_words to max_words words."""
+        lengths = self.rng.integers(min_words, max_words + 1, size=count)
+        words = WORD_ARRAY[self.rng.integers(0, len(WORDS), size=int(lengths.sum()))]
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        return [" ".join(words[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def _long_texts(self, count: int) -> List[str]:
+        texts = self._texts(count, 5, 120)
+        extras = self._texts(count, 2, 10)
+        for i, draw in enumerate(self.rng.random(count)):
+            # Quotes, delimiters and line breaks inside quoted fields
+            if draw < 0.3:
+                texts[i] = f'{texts[i]} "{extras[i]}"{self.delimiter} {extras[i]}'
+            elif draw < 0.4:
+                texts[i] = f"{texts[i]}\n{extras[i]}"
+        return texts
+
+    def _pool(self, column: ColumnDef) -> np.ndarray:
+        """Pre-generated values of a kind of text column (drawn from for each batch)."""
+        if LONG_TEXT_PATTERN.search(column.name):
+            kind = "long"
+        elif column.length is not None:
+            kind = f"varchar({column.length})"
+        else:
+            kind = "short"
+
+        if kind not in self.pools:
+            if kind == "long":
+                values = self._long_texts(POOL_SIZE // 10)
+            elif column.length is not None:
+                # Some values exceed VARCHAR(n) to exercise truncation
+                overflow = self.rng.random(POOL_SIZE) < 0.05
+                values = [
+                    text[:column.length * 2 if long else column.length]
+                    for text, long in zip(self._texts(POOL_SIZE, 1, 4), overflow)
+                ]
+            else:
+                values = self._texts(POOL_SIZE, 1, 6)
+            self.pools[kind] = np.array(values, dtype=object)
+        return self.pools[kind]
+
+    def column_values(self, column: ColumnDef, rows: int) -> np.ndarray:
+        """Values of a column for a batch of rows, as strings ('' for empty values)."""
+        if column.target == "int":
+            values = self.rng.integers(0, 1_000_000, size=rows).astype(str).astype(object)
+        elif column.target == "float":
+            values = np.char.mod("%.2f", self.rng.uniform(0, 10_000, size=rows)).astype(object)
+            values[self.rng.random(rows) < 0.01] = "nan"
+        elif DATE_PATTERN.search(column.name) or column.target == "datetime64":
+            days = pd.to_datetime("2015-01-01") + pd.to_timedelta(self.rng.integers(0, 3650, size=rows), unit="D")
+            values = days.strftime("%d-%m-%Y").to_numpy(dtype=object)
+        elif column.length == 5 or column.target == "bool":
+            values = self.rng.choice(np.array(["true", "false"], dtype=object), size=rows)
+        elif YES_NO_PATTERN.search(column.name):
+            values = self.rng.choice(np.array(["Oui", "Non"], dtype=object), size=rows)
+        else:
+            values = self.rng.choice(self._pool(column), size=rows)
+        values[self.rng.random(rows) < EMPTY_RATE] = ""
+        return values
+
+    def write(self, path: str, rows: int) -> int:
+        """
+        Write rows rows to path and return the file size in bytes.
+
+        Raises ValueError if a header does not normalize back to its column.
+        """
+        header = accented_headers(self.schema.column_names)
+        mismatched = [
+            column_name for column_name, name in zip(self.schema.column_names, normalize_column_names(header))
+            if name != column_name
+        ]
+        if mismatched:
+            raise ValueError(f"{self.schema.name}: headers do not normalize back to {', '.join(mismatched)}")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=self.delimiter, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+            writer.writerow(header)
+            for start in range(0, rows, WRITE_BATCH_ROWS):
+                batch = min(WRITE_BATCH_ROWS, rows - start)
+                columns = [self.column_values(column, batch) for column in self.schema.columns]
+                writer.writerows(zip(*columns))
+        return os.path.getsize(path)
+
+
+def generate_dataset(
+    output_directory: str,
+    rows: int,
+    ddl_directory: str = DEFAULT_DDL_DIRECTORY,
+    seed: int = DEFAULT_SEED,
+    tables: Optional[list] = None
+) -> Dict[str, int]:
+    """
+    Generate one CSV file per CREATE TABLE file.
+
+    Parameters
+    ----------
+    output_directory : str
+        Directory receiving <table>.csv files (e.g. input/staging/ of a work directory).
+    rows : int
+        Number of rows per table.
+    ddl_directory : str
+        Directory of the CREATE TABLE files.
+    seed : int
+        Random seed.
+    tables : Optional[list]
+        Tables to generate (all by default).
+
+    Returns
+    -------
+    Dict[str, int]
+        Size in bytes of each generated file.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    sizes = {}
+    for table_name, schema in sorted(load_table_schemas(ddl_directory).items()):
+        if tables and table_name not in tables:
+            continue
+        path = os.path.join(output_directory, f"{table_name}.csv")
+        sizes[table_name] = SyntheticTableWriter(schema, seed).write(path, rows)
+    return sizes
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Generate synthetic staging CSV files from the DDL")
+    parser.add_argument("--output", required=True, help="Output directory for the CSV files")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per table")
+    parser.add_argument("--ddl", default=DEFAULT_DDL_DIRECTORY, help="Directory of the CREATE TABLE files")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument("--tables", nargs="*", help="Tables to generate (default: all)")
+    args = parser.parse_args()
+
+    sizes = generate_dataset(args.output, args.rows, args.ddl, args.seed, args.tables)
+    for table_name, size in sizes.items():
+        print(f"{table_name}.csv: {args.rows} rows, {size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
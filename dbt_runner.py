@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+In-process dbt invocation for ANAIS Staging
+
+pipeline.utils.dbt_tools.dbt_exec always runs a command over the whole project.
+This module runs dbt commands through dbt's programmatic entry point (dbtRunner)
+with an optional node selection, so only the models downstream of changed sources
+are rebuilt and tested.
+
+The packages a project declares (packages.yml / dependencies.yml) are installed
+first with 'dbt deps' (has_packages), as they must exist before the project is
+parsed. The project can be parsed once (parse_manifest) and the manifest handed to
+each following command, so 'run' and 'test' do not parse it again. Parsing itself keeps
+dbt's partial parsing state (target/partial_parse.msgpack) between runs, so only
+the files changed since the previous run are re-parsed.
+
+Usage:
+    if has_packages("dbtStaging"):
+        run_dbt("deps", "Staging", "local", "dbtStaging", ".", logger)
+    manifest = parse_manifest("Staging", "local", "dbtStaging", ".", logger)
+    run_dbt("run", "Staging", "local", "dbtStaging", ".", logger,
+            select=["source:main.sa_sirec+", "source:main.sa_sivss+"], manifest=manifest)
+"""
+
+# === Packages ===
+import os
+from logging import Logger
+from typing import List, Optional
+
+from dbt.cli.main import dbtRunner, dbtRunnerResult
+from dbt.contracts.graph.manifest import Manifest
+
+# === Constants ===
+DUCKDB_SOURCE = "main"
+# Nodes listed in the log after each command, slowest first
+MAX_LOGGED_NODES = 20
+# Files declaring the dbt packages of a project
+PACKAGE_FILES = ("packages.yml", "dependencies.yml")
+
+
+def _dbt_args(command: str, profile: str, target: str, project_dir: str, profiles_dir: str) -> List[str]:
+    return [
+        command,
+        "--project-dir", project_dir,
+        "--profiles-dir", profiles_dir,
+        "--profile", profile,
+        "--target", target,
+    ]
+
+
+def downstream_selectors(tables: List[str], source: str = DUCKDB_SOURCE) -> List[str]:
+    """dbt selectors of the given source tables and every node downstream of them."""
+    return [f"source:{source}.{table}+" for table in sorted(tables)]
+
+
+def has_packages(project_dir: str) -> bool:
+    """Return True if the dbt project declares packages, to install with 'dbt deps'."""
+    return any(os.path.exists(os.path.join(project_dir, name)) for name in PACKAGE_FILES)
+
+
+def parse_manifest(profile: str, target: str, project_dir: str, profiles_dir: str, logger: Logger) -> Manifest:
+    """
+    Parse the dbt project once, reusing the partial parsing state of the previous run.
+
+    Returns
+    -------
+    Manifest
+        Parsed project, to pass to run_dbt(manifest=...).
+
+    Raises
+    ------
+    RuntimeError
+        If the project cannot be parsed.
+    """
+    result = dbtRunner().invoke(_dbt_args("parse", profile, target, project_dir, profiles_dir))
+    if not result.success:
+        if result.exception is not None:
+            logger.error(f"❌ dbt parse failed: {result.exception}")
+        raise RuntimeError("dbt parse failed")
+    logger.info(f"✅ dbt project parsed ({len(result.result.nodes)} nodes)")
+    return result.result
+
+
+def log_node_timings(result: dbtRunnerResult, logger: Logger, limit: int = MAX_LOGGED_NODES):
+    """Log the status and execution time of the nodes of a dbt result, slowest first."""
+    node_results = sorted(
+        getattr(result.result, "results", None) or [],
+        key=lambda node_result: node_result.execution_time or 0.0,
+        reverse=True
+    )
+    for node_result in node_results[:limit]:
+        logger.info(f"   {node_result.execution_time or 0.0:>7.2f}s  {node_result.status!s:<8} {node_result.node.name}")
+    if len(node_results) > limit:
+        logger.info(f"   ... {len(node_results) - limit} faster node(s)")
+
+
+def run_dbt(
+    command: str,
+    profile: str,
+    target: str,
+    project_dir: str,
+    profiles_dir: str,
+    logger: Logger,
+    select: Optional[List[str]] = None,
+    manifest: Optional[Manifest] = None
+) -> dbtRunnerResult:
+    """
+    Run a dbt command in-process.
+
+    Parameters
+    ----------
+    command : str
+        dbt command ('deps', 'run', 'test', 'build'...).
+    profile : str
+        Profile from 'profiles.yml'.
+    target : str
+        Output of the profile ('local', 'anais').
+    project_dir : str
+        dbt project directory (e.g. 'dbtStaging').
+    profiles_dir : str
+        Directory containing 'profiles.yml'.
+    logger : Logger
+        Log file.
+    select : Optional[List[str]]
+        Node selectors; the whole project when None.
+    manifest : Optional[Manifest]
+        Manifest from parse_manifest; the project is parsed again when None.
+
+    Returns
+    -------
+    dbtRunnerResult
+        Result of the command (per-node results in result.result.results).
+
+    Raises
+    ------
+    RuntimeError
+        If the dbt command fails.
+    """
+    args = _dbt_args(command, profile, target, project_dir, profiles_dir)
+    if select:
+        args += ["--select", *select]
+
+    logger.info(f"▶️  dbt {command}" + (f" --select {' '.join(select)}" if select else ""))
+    result = dbtRunner(manifest=manifest).invoke(args)
+    log_node_timings(result, logger)
+    if not result.success:
+        if result.exception is not None:
+            logger.error(f"❌ dbt {command} failed: {result.exception}")
+        raise RuntimeError(f"dbt {command} failed")
+    logger.info(f"✅ dbt {command} completed")
+    return result
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+DDL Schema Reader for ANAIS Staging
+
+This module parses the CREATE TABLE files of output_sql/staging/ into table
+schemas (column names, SQL base types, VARCHAR lengths and accepted date
+formats), and holds the CSV conventions shared by the loaders: per-source
+delimiters and column name standardization.
+
+The accepted formats of a DATE / TIMESTAMP column are declared in a comment on
+its line, tried in order (default: type_conversion.DATE_FORMAT):
+
+    date_de_reception DATE, -- formats: %d-%m-%Y, %Y-%m-%d, %d/%m/%Y
+
+This is opt-in: the CREATE TABLE files of output_sql/staging/ currently declare
+their date columns as VARCHAR (the dbt models parse them), so no column uses it yet.
+
+Usage:
+    from ddl_schema import load_table_schemas
+    schemas = load_table_schemas("output_sql/staging/")
+    schemas["sa_sivss"].column_names
+"""
+
+import os
+import re
+import sys
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# === Constants ===
+# SQL base type -> pandas type, same mapping as pipeline ColumnsManagement.type_mapping
+TYPE_MAPPING = {
+    "VARCHAR": "string",
+    "TEXT": "string",
+    "CHAR": "string",
+    "INTEGER": "int",
+    "INT": "int",
+    "BIGINT": "int",
+    "SMALLINT": "int",
+    "REAL": "float",
+    "FLOAT": "float",
+    "DOUBLE": "float",
+    "NUMERIC": "float",
+    "DECIMAL": "float",
+    "BOOLEAN": "bool",
+    "DATE": "datetime64",
+    "TIMESTAMP": "datetime64",
+}
+
+# Expected delimiters by table (other tables are detected from their header)
+DELIMITER_MAP = {
+    "sa_sirec": ";",
+    "sa_sivss": "¤",
+    "sa_siicea_decisions": ",",
+    "sa_siicea_cibles": ",",
+    "sa_siicea_missions_prog": ",",
+    "sa_siicea_missions_real": ",",
+}
+POTENTIAL_DELIMITERS = [",", ";", "¤", "\t", "|"]
+
+CREATE_TABLE_PATTERN = re.compile(
+    r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?\"?(\w+)\"?\s*\((.*)\)",
+    re.IGNORECASE | re.DOTALL,
+)
+FORMATS_COMMENT_PATTERN = re.compile(
+    r"^\s*\"?(\w+)\"?\s[^\n]*?--\s*formats?\s*:\s*([^\n]+)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+COLUMN_PATTERN = re.compile(
+    r"^\"?(\w+)\"?\s+([A-Za-z]+(?:\s+PRECISION)?)\s*(?:\(\s*(\d+)(?:\s*,\s*\d+)?\s*\))?",
+)
+
+ACCENT_MAP = {
+    'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
+    'à': 'a', 'â': 'a', 'ä': 'a',
+    'î': 'i', 'ï': 'i',
+    'ô': 'o', 'ö': 'o',
+    'ù': 'u', 'û': 'u', 'ü': 'u',
+    'ç': 'c', 'ñ': 'n',
+    'É': 'E', 'È': 'E', 'Ê': 'E', 'Ë': 'E',
+    'À': 'A', 'Â': 'A', 'Ä': 'A',
+    'Î': 'I', 'Ï': 'I',
+    'Ô': 'O', 'Ö': 'O',
+    'Ù': 'U', 'Û': 'U', 'Ü': 'U',
+    'Ç': 'C', 'Ñ': 'N'
+}
+
+
+# === Column names ===
+def normalize_column_name(name: str, max_length: int = 63) -> str:
+    """
+    Normalize column name to match pipeline standardization:
+    - Replace French accented characters
+    - Convert to lowercase
+    - Replace special characters with underscores
+    - Truncate to 63 characters (PostgreSQL limit)
+    """
+    for accented, plain in ACCENT_MAP.items():
+        name = name.replace(accented, plain)
+
+    col = re.sub(r'[^\w]', '_', name.lower())
+    col = re.sub(r'_+', '_', col).strip('_')
+    return col[:max_length]
+
+
+def normalize_column_names(names: List[str], max_length: int = 63) -> List[str]:
+    """
+    Normalize the column names of a CSV header, keeping duplicated names apart the
+    way the pipeline does:
+    - pandas suffixes the k-th repeat of a header with '.k', the dot being dropped
+      by normalization ('N-1', 'N-1' -> 'n_1', 'n_11')
+    - names still equal once normalized or truncated end with '_k' within max_length
+      ('Commentaire', 'commentaire' -> 'commentaire', 'commentaire_1')
+
+    Parameters
+    ----------
+    names : List[str]
+        Raw header names, in file order.
+    max_length : int
+        Maximum length of a name (PostgreSQL limit).
+
+    Returns
+    -------
+    List[str]
+        Normalized, unique names, in the same order.
+    """
+    repeats: Dict[str, int] = {}
+    normalized: List[str] = []
+    used = set()
+    for name in names:
+        repeat = repeats.get(name, 0)
+        repeats[name] = repeat + 1
+        col = normalize_column_name(name.strip(), max_length=sys.maxsize)
+        col = (col + str(repeat) if repeat else col)[:max_length]
+
+        suffix = 0
+        candidate = col
+        while candidate in used:
+            suffix += 1
+            candidate = col[:max_length - len(f"_{suffix}")] + f"_{suffix}"
+        used.add(candidate)
+        normalized.append(candidate)
+    return normalized
+
+
+# === Schemas ===
+@dataclass(frozen=True)
+class ColumnDef:
+    """Column of a CREATE TABLE statement."""
+    name: str
+    base_type: str
+    length: Optional[int] = None
+    # Accepted date formats, in order (empty: the default format)
+    formats: Tuple[str, ...] = ()
+
+    @property
+    def target(self) -> str:
+        """pandas type of the column ('string' for unknown SQL types)."""
+        return TYPE_MAPPING.get(self.base_type, "string")
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """Table parsed from a CREATE TABLE file."""
+    name: str
+    columns: Tuple[ColumnDef, ...]
+    ddl: str
+    ddl_path: Optional[str] = None
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column.name for column in self.columns]
+
+    def to_schema_df(self) -> "pd.DataFrame":
+        """Schema in the layout of ColumnsManagement.schema_df (for compile_plan)."""
+        import pandas as pd
+
+        return pd.DataFrame({
+            "column_name": [column.name for column in self.columns],
+            "column_base_type": [column.base_type for column in self.columns],
+            "column_length": [column.length for column in self.columns],
+            "column_formats": [column.formats for column in self.columns],
+        })
+
+
+def _split_columns(body: str) -> List[str]:
+    """Split the body of a CREATE TABLE on top-level commas."""
+    parts, depth, current = [], 0, []
+    for char in body:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_create_table(ddl: str, ddl_path: Optional[str] = None) -> TableSchema:
+    """
+    Parse a CREATE TABLE statement.
+
+    Parameters
+    ----------
+    ddl : str
+        Content of the .sql file.
+    ddl_path : Optional[str]
+        Path of the .sql file (kept for error messages and change detection).
+
+    Returns
+    -------
+    TableSchema
+        Table name and ordered columns.
+    """
+    declared_formats = {
+        name.lower(): tuple(f.strip() for f in formats.split(",") if f.strip())
+        for name, formats in FORMATS_COMMENT_PATTERN.findall(ddl)
+    }
+    body_without_comments = re.sub(r"--[^\n]*", "", ddl)
+    match = CREATE_TABLE_PATTERN.search(body_without_comments)
+    if not match:
+        raise ValueError(f"No CREATE TABLE statement found in {ddl_path or 'DDL'}")
+
+    columns = []
+    for definition in _split_columns(match.group(2)):
+        column_match = COLUMN_PATTERN.match(definition)
+        if not column_match or column_match.group(1).upper() in ("PRIMARY", "CONSTRAINT", "UNIQUE"):
+            continue
+        name, base_type, length = column_match.groups()
+        columns.append(ColumnDef(
+            name=name.lower(),
+            base_type=base_type.upper(),
+            length=int(length) if length and base_type.upper() in ("VARCHAR", "CHAR") else None,
+            formats=declared_formats.get(name.lower(), ()) if TYPE_MAPPING.get(base_type.upper()) == "datetime64" else (),
+        ))
+
+    return TableSchema(name=match.group(1).lower(), columns=tuple(columns), ddl=ddl, ddl_path=ddl_path)
+
+
+def load_table_schemas(create_table_directory: str) -> Dict[str, TableSchema]:
+    """
+    Parse every .sql file of the CREATE TABLE directory.
+
+    Returns
+    -------
+    Dict[str, TableSchema]
+        Table name -> schema.
+    """
+    schemas = {}
+    for filename in sorted(os.listdir(create_table_directory)):
+        if not filename.endswith(".sql"):
+            continue
+        path = os.path.join(create_table_directory, filename)
+        with open(path, "r", encoding="utf-8") as f:
+            schema = parse_create_table(f.read(), path)
+        schemas[schema.name] = schema
+    return schemas
+
+
+# === CSV conventions ===
+def detect_delimiter(header_line: str, table_name: Optional[str] = None) -> str:
+    """
+    Return the delimiter of a table: the expected one from DELIMITER_MAP, or the
+    most frequent candidate in the header line.
+    """
+    if table_name in DELIMITER_MAP:
+        return DELIMITER_MAP[table_name]
+    counts = {delimiter: header_line.count(delimiter) for delimiter in POTENTIAL_DELIMITERS}
+    detected, count = max(counts.items(), key=lambda x: x[1])
+    return detected if count > 0 else ","
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Encoding Normalization for ANAIS Staging
+
+This module makes every staging CSV file UTF-8 before it is parsed, so the loaders,
+the validator and DuckDB's native reader all read one encoding and never have to
+decode a file twice after a wrong guess.
+
+For each file:
+    - the encoding is detected from byte samples read through a memory map: the
+      first bytes (BOM, see file_inspection.sniff_encoding), then a few windows
+      spread over the rest of the file, so a CP1252 character far from the header
+      is not missed
+    - a file the samples show as UTF-8 (with or without BOM) is validated in one
+      read-only streaming pass and kept as it is when every byte is valid
+    - a CP1252 or UTF-16 file is transcoded to UTF-8 in one streaming pass, by
+      fixed-size blocks (constant memory), into a temporary file renamed over the
+      target
+    - a UTF-8 file holding invalid bytes the samples missed (stray CP1252
+      characters) is transcoded the same way, its valid UTF-8 kept as it is and its
+      invalid bytes decoded as CP1252 (the cp1252_fallback error handler)
+
+normalize_file() rewrites the file in place (for files the pipeline owns, such as
+SFTP downloads); normalize_directory() never modifies its input directory: it builds
+a UTF-8 view of it in a work directory, where UTF-8 files are linked and the others
+transcoded (and kept from one run to the next while their source does not change).
+
+The loaders therefore always read valid UTF-8 and never decode a file twice.
+
+The decision taken for each file (detected encoding, kept or transcoded, sizes and
+time) is logged and recorded in the run report.
+
+CP1252 leaves 5 byte values undefined: they are decoded as their Latin-1 code
+points instead of failing the file.
+
+Usage:
+    decision = normalize_file("input/staging/sa_sivss.csv")
+    decisions = normalize_directory("input/staging/", "data/staging/utf8_inputs/", logger, workers=4, report=report)
+"""
+
+# === Packages ===
+import codecs
+import hashlib
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from logging import Logger
+from typing import Dict, Iterable, Optional, Tuple
+
+# === Modules ===
+from file_inspection import FALLBACK_ENCODING, SNIFF_BYTES, sniff_encoding
+from run_report import Metrics, RunReport
+
+# === Constants ===
+UTF8_DIRECTORY = "utf8_inputs"
+UTF8_ENCODINGS = ("utf-8", "utf-8-sig")
+SAMPLE_WINDOWS = 8
+TRANSCODE_BLOCK_SIZE = 1024 * 1024
+TRANSCODE_SUFFIX = ".utf8.part"
+LATIN1_FALLBACK = "latin1_fallback"
+CP1252_FALLBACK = "cp1252_fallback"
+# Encoding of a UTF-8 file holding CP1252 bytes
+MIXED_ENCODING = "utf-8+cp1252"
+
+
+def _latin1_fallback(error: UnicodeDecodeError):
+    """Decode the bytes CP1252 leaves undefined (0x81, 0x8D, 0x8F, 0x90, 0x9D) as Latin-1."""
+    return error.object[error.start:error.end].decode("latin-1"), error.end
+
+
+def _cp1252_fallback(error: UnicodeDecodeError):
+    """Decode the bytes of a UTF-8 stream that are not valid UTF-8 as CP1252."""
+    return error.object[error.start:error.end].decode(FALLBACK_ENCODING, errors=LATIN1_FALLBACK), error.end
+
+
+codecs.register_error(LATIN1_FALLBACK, _latin1_fallback)
+codecs.register_error(CP1252_FALLBACK, _cp1252_fallback)
+
+
+@dataclass(frozen=True)
+class EncodingDecision:
+    """Encoding detected for a file and what was done with it."""
+    file: str
+    encoding: str
+    transcoded: bool
+    bytes_in: int
+    bytes_out: int
+    seconds: float = 0.0
+    # SHA-256 of the transcoded file
+    sha256: Optional[str] = None
+    # True if the transcoded copy of an earlier run was reused
+    reused: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "encoding": self.encoding,
+            "action": "reused" if self.reused else "transcoded" if self.transcoded else "kept",
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def is_utf8_window(window: bytes) -> bool:
+    """
+    Return True if a window read anywhere in a file decodes as UTF-8.
+
+    A character cut at either end of the window is accepted.
+    """
+    start = 0
+    # Skip the continuation bytes of a character started before the window
+    while start < min(len(window), 3) and 0x80 <= window[start] <= 0xBF:
+        start += 1
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(window[start:], final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(path: str) -> Tuple[str, bool]:
+    """
+    Return (encoding, has_bom) of a file from byte samples.
+
+    The first SNIFF_BYTES decide BOMs and UTF-16. A file they show as UTF-8 is
+    also sampled at SAMPLE_WINDOWS places spread over the rest of it: CP1252 as
+    soon as one of them is not UTF-8.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return "utf-8", False
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        encoding, bom = sniff_encoding(data[:SNIFF_BYTES])
+        if encoding not in UTF8_ENCODINGS or size <= SNIFF_BYTES:
+            return encoding, bom
+        step = (size - SNIFF_BYTES) // SAMPLE_WINDOWS
+        for index in range(1, SAMPLE_WINDOWS + 1):
+            start = min(SNIFF_BYTES + step * index, size - 1)
+            if not is_utf8_window(data[start:start + SNIFF_BYTES]):
+                return FALLBACK_ENCODING, bom
+    return encoding, bom
+
+
+def is_utf8_file(path: str, skip_bytes: int = 0) -> bool:
+    """Return True if a whole file decodes as UTF-8 (one read-only streaming pass, by blocks)."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as source:
+        source.seek(skip_bytes)
+        try:
+            for block in iter(lambda: source.read(TRANSCODE_BLOCK_SIZE), b""):
+                decoder.decode(block)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return False
+    return True
+
+
+def transcode_file(
+    path: str, encoding: str, skip_bytes: int = 0, output_path: Optional[str] = None
+) -> Tuple[int, str]:
+    """
+    Write a file as UTF-8 (without BOM) in one streaming pass.
+
+    The output is written to <output_path>.utf8.part, flushed to disk, then renamed
+    to output_path (default: over the original file). A MIXED_ENCODING file is
+    decoded as UTF-8, its invalid bytes as CP1252.
+
+    Returns
+    -------
+    Tuple[int, str]
+        Size and SHA-256 of the UTF-8 file.
+    """
+    output_path = output_path or path
+    tmp_path = output_path + TRANSCODE_SUFFIX
+    if encoding == MIXED_ENCODING:
+        encoding, errors = "utf-8", CP1252_FALLBACK
+    else:
+        errors = LATIN1_FALLBACK if encoding == FALLBACK_ENCODING else "strict"
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    sha = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "rb") as source, open(tmp_path, "wb") as target:
+            source.seek(skip_bytes)
+            for block in iter(lambda: source.read(TRANSCODE_BLOCK_SIZE), b""):
+                encoded = decoder.decode(block).encode("utf-8")
+                target.write(encoded)
+                sha.update(encoded)
+                size += len(encoded)
+            encoded = decoder.decode(b"", final=True).encode("utf-8")
+            target.write(encoded)
+            sha.update(encoded)
+            size += len(encoded)
+            target.flush()
+            os.fsync(target.fileno())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, output_path)
+    return size, sha.hexdigest()
+
+
+def normalize_file(path: str, name: Optional[str] = None, output_path: Optional[str] = None) -> EncodingDecision:
+    """
+    Detect the encoding of a file and transcode it to UTF-8 unless it already is.
+
+    A file the samples show as UTF-8 is validated in full: if a byte is invalid,
+    it is transcoded as MIXED_ENCODING instead of being kept.
+
+    Without output_path, the file is rewritten in place. With it, the original file
+    is left untouched: the UTF-8 copy is written to output_path, which takes the
+    modification time of the original, and a copy already made from the same
+    original (same modification time) is reused.
+
+    Raises
+    ------
+    UnicodeDecodeError
+        If a UTF-16 file holds invalid sequences (the original file is left as is).
+    """
+    name = name or os.path.basename(path)
+    start = time.perf_counter()
+    source = os.stat(path)
+    encoding, bom = detect_encoding(path)
+    if encoding in UTF8_ENCODINGS:
+        if is_utf8_file(path, len(codecs.BOM_UTF8) if bom else 0):
+            return EncodingDecision(name, encoding, False, source.st_size, source.st_size, time.perf_counter() - start)
+        encoding = MIXED_ENCODING
+
+    if output_path is not None and not os.path.islink(output_path) and os.path.exists(output_path):
+        if os.stat(output_path).st_mtime_ns == source.st_mtime_ns:
+            return EncodingDecision(
+                name, encoding, True, source.st_size, os.path.getsize(output_path),
+                time.perf_counter() - start, reused=True
+            )
+    if output_path is not None and os.path.islink(output_path):
+        os.remove(output_path)
+
+    # A UTF-16 BOM is consumed by the decoder, a UTF-8 one (before CP1252 bytes) is dropped
+    skip_bytes = len(codecs.BOM_UTF8) if bom and encoding in (FALLBACK_ENCODING, MIXED_ENCODING) else 0
+    bytes_out, sha256 = transcode_file(path, encoding, skip_bytes, output_path)
+    if output_path is not None:
+        os.utime(output_path, ns=(source.st_atime_ns, source.st_mtime_ns))
+    return EncodingDecision(name, encoding, True, source.st_size, bytes_out, time.perf_counter() - start, sha256)
+
+
+def link_file(path: str, link_path: str):
+    """Point link_path to path (replacing whatever link_path was)."""
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.symlink(os.path.abspath(path), link_path)
+
+
+def record_decision(decision: EncodingDecision, logger: Logger, report: Optional[RunReport] = None):
+    """Log the decision taken for a file and record it in the run report."""
+    if decision.reused:
+        logger.info(f"🔤 {decision.file}: {decision.encoding}, UTF-8 copy of an earlier run reused")
+    elif decision.transcoded:
+        logger.info(
+            f"🔤 {decision.file}: {decision.encoding} transcoded to UTF-8 "
+            f"({decision.bytes_in / 1_000_000:.1f} MB -> {decision.bytes_out / 1_000_000:.1f} MB "
+            f"in {decision.seconds:.1f}s)"
+        )
+    if report is not None:
+        report.add_encoding(decision.file, decision.to_dict())
+        if decision.transcoded and not decision.reused:
+            report.add_table(
+                "encoding_normalization", decision.file,
+                Metrics(wall_seconds=decision.seconds, cpu_seconds=None, bytes=decision.bytes_in)
+            )
+
+
+def normalize_directory(
+    directory: str,
+    output_directory: str,
+    logger: Logger,
+    workers: int = 1,
+    report: Optional[RunReport] = None,
+    extension: str = ".csv",
+    exclude: Iterable[str] = ()
+) -> Dict[str, EncodingDecision]:
+    """
+    Build in output_directory a UTF-8 view of the files of a directory with the
+    given extension, workers files at a time, without modifying them: UTF-8 files
+    are linked, the others transcoded. The excluded file names (e.g. files already
+    normalized on download) are linked without detection. Files of output_directory
+    whose source is gone are removed.
+
+    Returns
+    -------
+    Dict[str, EncodingDecision]
+        Decision taken for each detected file, by file name.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    filenames = [filename for filename in sorted(os.listdir(directory)) if filename.endswith(extension)]
+    for filename in set(os.listdir(output_directory)) - set(filenames):
+        os.remove(os.path.join(output_directory, filename))
+
+    def normalize(filename: str) -> Optional[EncodingDecision]:
+        path, output_path = os.path.join(directory, filename), os.path.join(output_directory, filename)
+        decision = None if filename in exclude else normalize_file(path, filename, output_path)
+        if decision is None or not decision.transcoded:
+            link_file(path, output_path)
+        return decision
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        decisions = {
+            decision.file: decision for decision in executor.map(normalize, filenames) if decision is not None
+        }
+    for decision in decisions.values():
+        record_decision(decision, logger, report)
+
+    transcoded = sum(1 for decision in decisions.values() if decision.transcoded)
+    logger.info(
+        f"🔤 {len(decisions) - transcoded} UTF-8 file(s) kept, {transcoded} transcoded to UTF-8 in {output_directory}"
+    )
+    return decisions
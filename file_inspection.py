@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+CSV File Inspection for ANAIS Staging
+
+This module inspects input files through a memory map instead of reading them as text:
+    - encoding and BOM sniffed from the first bytes (UTF-8 with or without BOM,
+      UTF-16, otherwise CP1252 for the Windows exports)
+    - header line and delimiter (including the multi-byte '¤' of SIVSS)
+    - row count, by counting newline bytes (newline code units for UTF-16)
+
+It is shared by the loaders, tests/validate_csv_schemas.py and the run report, so a
+file is sniffed once instead of being re-opened and scanned in text mode by each.
+
+Row counts are physical lines: a quoted field containing line breaks counts once
+per line.
+
+Usage:
+    inspection = inspect_file("input/staging/sa_sivss.csv", "sa_sivss")
+    inspection.delimiter, inspection.encoding, inspection.rows
+"""
+
+# === Packages ===
+import codecs
+import csv
+import mmap
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# === Modules ===
+from ddl_schema import detect_delimiter, normalize_column_names
+
+# === Constants ===
+SNIFF_BYTES = 64 * 1024
+COUNT_BLOCK_SIZE = 16 * 1024 * 1024
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+FALLBACK_ENCODING = "cp1252"
+
+
+@dataclass(frozen=True)
+class FileInspection:
+    """Format and size of a CSV file."""
+    path: str
+    size: int
+    encoding: str
+    bom: bool
+    delimiter: str
+    header_line: str
+    rows: int
+
+    @property
+    def columns(self) -> List[str]:
+        """Normalized column names of the header, duplicated names suffixed as the pipeline does."""
+        raw_columns = next(csv.reader([self.header_line], delimiter=self.delimiter), [])
+        return normalize_column_names(raw_columns)
+
+    def to_dict(self) -> dict:
+        return {
+            "size": self.size,
+            "rows": self.rows,
+            "encoding": self.encoding,
+            "bom": self.bom,
+            "delimiter": self.delimiter,
+        }
+
+
+def sniff_encoding(sample: bytes) -> tuple:
+    """
+    Return (encoding, has_bom) from the first bytes of a file.
+
+    Without BOM, the sample is UTF-8 if it decodes as UTF-8 (a multi-byte character
+    cut at the end of the sample is accepted), CP1252 otherwise.
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding, True
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8", False
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING, False
+
+
+def count_lines(data, start: int = 0) -> int:
+    """
+    Number of lines of a buffer from offset start (a last line without newline
+    counts), scanned by blocks so a memory map is never copied whole.
+    """
+    size = len(data)
+    lines = sum(
+        data[offset:min(offset + COUNT_BLOCK_SIZE, size)].count(b"\n")
+        for offset in range(start, size, COUNT_BLOCK_SIZE)
+    )
+    if size > start and data[size - 1:size] != b"\n":
+        lines += 1
+    return lines
+
+
+def count_utf16_lines(data) -> int:
+    """
+    Number of lines of a UTF-16 buffer with BOM (a last line without newline counts).
+
+    A 0x0A byte is not a newline in UTF-16: it can be either byte of any code unit.
+    The buffer is decoded by blocks and its newline characters counted instead.
+    """
+    decoder = codecs.getincrementaldecoder("utf-16")(errors="replace")
+    size = len(data)
+    lines, last = 0, ""
+    for offset in range(0, size, COUNT_BLOCK_SIZE):
+        text = decoder.decode(data[offset:min(offset + COUNT_BLOCK_SIZE, size)], final=offset + COUNT_BLOCK_SIZE >= size)
+        lines += text.count("\n")
+        last = text[-1:] or last
+    if last and last != "\n":
+        lines += 1
+    return lines
+
+
+def inspect_file(path: str, table_name: Optional[str] = None) -> FileInspection:
+    """
+    Inspect a CSV file through a memory map.
+
+    Parameters
+    ----------
+    path : str
+        CSV file.
+    table_name : Optional[str]
+        Table of the file, to use its expected delimiter (see ddl_schema.DELIMITER_MAP).
+
+    Returns
+    -------
+    FileInspection
+        Size, encoding, BOM, delimiter, header line and number of data rows.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return FileInspection(path, 0, "utf-8", False, detect_delimiter("", table_name), "", 0)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        sample = data[:SNIFF_BYTES]
+        encoding, bom = sniff_encoding(sample)
+        if encoding == "utf-16":
+            # Newline bytes do not delimit lines in UTF-16: decode the sample and the file instead
+            text = sample.decode("utf-16", errors="ignore")
+            header_line = next((line for line in text.splitlines() if line.strip()), "")
+            rows = max(count_utf16_lines(data) - 1, 0)
+        else:
+            start = len(codecs.BOM_UTF8) if bom else 0
+            header_line = ""
+            # First non-empty line
+            while start < size and not header_line.strip():
+                end = data.find(b"\n", start)
+                end = size if end == -1 else end + 1
+                header_line = data[start:end].decode(encoding, errors="replace").rstrip("\r\n")
+                start = end
+            rows = count_lines(data, start)
+
+    return FileInspection(
+        path=path,
+        size=size,
+        encoding=encoding,
+        bom=bom,
+        delimiter=detect_delimiter(header_line, table_name),
+        header_line=header_line,
+        rows=rows,
+    )
+
+
+def inspect_directory(directory: str, extension: str = ".csv") -> Dict[str, FileInspection]:
+    """Inspect every file of a directory with the given extension, by table name (file stem)."""
+    inspections = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(extension):
+            table_name = os.path.splitext(filename)[0]
+            inspections[table_name] = inspect_file(os.path.join(directory, filename), table_name)
+    return inspections
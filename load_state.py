@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Load State Store for ANAIS Staging
+
+This module records, next to the DuckDB database (e.g. data/staging/load_state.json),
+the content hash of the CSV file and of the CREATE TABLE file each table was last
+loaded from. A table whose inputs did not change since its last successful load
+does not need to be reloaded, and only the dbt models downstream of changed
+sources need to be rebuilt.
+
+A reloaded table stays "pending" until the dbt steps succeed, so a failed dbt run
+is retried for the same tables on the next run. A change to the dbt project files
+themselves (models, macros, tests) triggers a full dbt run.
+
+Usage:
+    state = LoadStateStore.for_database("data/staging/duckdb_database.duckdb")
+    signature = state.signature("sa_sirec", csv_path, ddl_path)
+    if not state.is_unchanged("sa_sirec", signature):
+        ...
+        state.record("sa_sirec", signature)
+    state.pending_dbt()  # ['sa_sirec']
+"""
+
+# === Packages ===
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# === Modules ===
+from sftp_manifest import file_sha256
+
+# === Constants ===
+STATE_FILENAME = "load_state.json"
+DBT_PROJECT_EXTENSIONS = (".sql", ".yml", ".yaml", ".csv")
+DBT_IGNORED_DIRECTORIES = {"target", "dbt_packages", "logs"}
+
+
+def dbt_project_sha256(project_dir: str) -> str:
+    """SHA-256 of the files of a dbt project (models, macros, tests, seeds, configuration)."""
+    sha = hashlib.sha256()
+    for root, directories, filenames in os.walk(project_dir):
+        directories[:] = sorted(d for d in directories if d not in DBT_IGNORED_DIRECTORIES)
+        for filename in sorted(filenames):
+            if filename.endswith(DBT_PROJECT_EXTENSIONS):
+                path = os.path.join(root, filename)
+                sha.update(os.path.relpath(path, project_dir).encode("utf-8"))
+                with open(path, "rb") as f:
+                    sha.update(f.read())
+    return sha.hexdigest()
+
+
+def input_signature(csv_path: str, ddl_path: str, previous: Optional[dict] = None) -> dict:
+    """
+    Return the input signature of a table: SHA-256 of its CSV and DDL files.
+
+    Parameters
+    ----------
+    csv_path : str
+        CSV file of the table.
+    ddl_path : str
+        CREATE TABLE file of the table.
+    previous : Optional[dict]
+        Earlier signature of the same file: its CSV hash is reused when the file
+        size and modification time did not change.
+
+    Returns
+    -------
+    dict
+        csv_sha256, csv_size, csv_mtime_ns and ddl_sha256.
+    """
+    stat = os.stat(csv_path)
+    previous = previous or {}
+    if previous.get("csv_size") == stat.st_size and previous.get("csv_mtime_ns") == stat.st_mtime_ns:
+        csv_sha256 = previous["csv_sha256"]
+    else:
+        csv_sha256 = file_sha256(csv_path)
+
+    with open(ddl_path, "rb") as f:
+        ddl_sha256 = hashlib.sha256(f.read()).hexdigest()
+
+    return {
+        "csv_sha256": csv_sha256,
+        "csv_size": stat.st_size,
+        "csv_mtime_ns": stat.st_mtime_ns,
+        "ddl_sha256": ddl_sha256,
+    }
+
+
+class LoadStateStore:
+    """
+    Thread-safe JSON store of the input signatures of the loaded tables.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.tables: Dict[str, dict] = {}
+        self.dbt_project_sha256: Optional[str] = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.tables = state.get("tables", {})
+            self.dbt_project_sha256 = state.get("dbt_project_sha256")
+
+    @classmethod
+    def for_database(cls, db_path: str) -> "LoadStateStore":
+        """State stored next to the DuckDB file."""
+        return cls(os.path.join(os.path.dirname(db_path), STATE_FILENAME))
+
+    def signature(self, table_name: str, csv_path: str, ddl_path: str) -> dict:
+        """
+        Return the input signature of a table (see input_signature), reusing the CSV
+        hash of the previous load when the file size and modification time did not change.
+        """
+        return input_signature(csv_path, ddl_path, self.tables.get(table_name))
+
+    def is_unchanged(self, table_name: str, signature: dict) -> bool:
+        """Return True if the table was last loaded from the same CSV and DDL contents."""
+        previous = self.tables.get(table_name)
+        return previous is not None and all(
+            previous.get(key) == signature[key] for key in ("csv_sha256", "ddl_sha256")
+        )
+
+    def record(self, table_name: str, signature: dict, rows: Optional[int] = None):
+        """Record a successful load (pending dbt) and write the store atomically."""
+        with self._lock:
+            self.tables[table_name] = {
+                **signature,
+                "rows": rows,
+                "loaded_at": datetime.now().isoformat(timespec="seconds"),
+                "dbt_pending": True,
+            }
+            self._save()
+
+    def pending_dbt(self) -> List[str]:
+        """Tables loaded since the last successful dbt run."""
+        return sorted(table for table, entry in self.tables.items() if entry.get("dbt_pending"))
+
+    def dbt_project_changed(self, project_sha256: str) -> bool:
+        """Return True if the dbt project files changed since the last successful dbt run."""
+        return project_sha256 != self.dbt_project_sha256
+
+    def mark_dbt_done(self, tables: List[str], project_sha256: str):
+        """Record a successful dbt run over the given tables."""
+        with self._lock:
+            for table in tables:
+                if table in self.tables:
+                    self.tables[table]["dbt_pending"] = False
+            self.dbt_project_sha256 = project_sha256
+            self._save()
+
+    def _save(self):
+        """Write the store atomically (caller holds the lock)."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"dbt_project_sha256": self.dbt_project_sha256, "tables": dict(sorted(self.tables.items()))},
+                f,
+                indent=2
+            )
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+dbt Materialization Planner for ANAIS Staging
+
+Every model of dbtStaging is a view, so a model read by several downstream models
+(or by the business profiles and exports) is recomputed on each read. This script
+recommends a materialization for each model from:
+    - its query time, measured on the DuckDB database (count(*) over the view),
+      or its build time from target/run_results.json for models that are already tables
+    - the number of times it is read per run, from the manifest: each view child
+      reads it as often as the child is itself read, each table child once, plus
+      --external-reads reads by the downstream profiles
+
+A view read N times costs N queries; as a table it costs one build (and cheap scans).
+Models whose expected saving, query_seconds * (reads - 1), exceeds --min-savings are
+recommended as tables; cheap passthroughs stay views. A recommended model whose SQL
+already handles is_incremental() is recommended as incremental instead.
+
+With --apply, the materialized='...' argument of the config() block of each model
+file is rewritten (the in-file config takes precedence over dbt_project.yml).
+
+The plan and its expected savings are written as logs/materialization_plan_<timestamp>.json.
+
+Usage:
+    # After a dbt run (target/manifest.json) on the local DuckDB database
+    python materialization_planner.py --profile Staging
+    python materialization_planner.py --profile Staging --min-savings 0.5 --apply
+"""
+
+# === Packages ===
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import duckdb
+import yaml
+
+# === Constants ===
+METADATA_YML = "metadata.yml"
+PROFILE_YML = "profiles.yml"
+PLAN_PREFIX = "materialization_plan"
+MATERIALIZED_PATTERN = re.compile(r"materialized\s*=\s*['\"](\w+)['\"]")
+INCREMENTAL_PATTERN = re.compile(r"is_incremental\s*\(\s*\)")
+
+
+@dataclass
+class ModelPlan:
+    """Current and recommended materialization of a model, with its cost figures."""
+    name: str
+    path: str
+    current: str
+    recommended: str
+    query_seconds: float
+    children: int
+    reads: int
+    expected_savings_seconds: float
+    reason: str
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def load_artifacts(project_dir: str) -> tuple:
+    """manifest.json and (if any) run_results.json of the last dbt command."""
+    target = os.path.join(project_dir, "target")
+    with open(os.path.join(target, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    run_results = {}
+    path = os.path.join(target, "run_results.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            run_results = json.load(f)
+    return manifest, run_results
+
+
+def build_seconds(run_results: dict) -> Dict[str, float]:
+    """Execution time of each model node of a 'dbt run' / 'dbt build' result."""
+    if run_results.get("args", {}).get("which") not in ("run", "build"):
+        return {}
+    return {
+        result["unique_id"]: result["execution_time"]
+        for result in run_results.get("results", [])
+        if result["unique_id"].startswith("model.") and result["status"] == "success"
+    }
+
+
+def read_counts(models: Dict[str, dict], child_map: Dict[str, List[str]], external_reads: int) -> Dict[str, int]:
+    """
+    Reads of each model per run: external_reads, plus, for each child model, the
+    reads of the child if it is a view (each read recomputes its parents) or 1 if
+    it is materialized.
+    """
+    reads: Dict[str, int] = {}
+
+    def count(unique_id: str) -> int:
+        if unique_id not in reads:
+            reads[unique_id] = external_reads + sum(
+                count(child) if models[child]["config"]["materialized"] == "view" else 1
+                for child in child_map.get(unique_id, [])
+                if child in models
+            )
+        return reads[unique_id]
+
+    for unique_id in models:
+        count(unique_id)
+    return reads
+
+
+def query_seconds(connection: duckdb.DuckDBPyConnection, relation: str, repeat: int) -> Optional[float]:
+    """Best time of repeat count(*) queries over a relation (None if it cannot be queried)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            connection.execute(f"SELECT count(*) FROM {relation}").fetchall()
+        except duckdb.Error:
+            return None
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def plan_materializations(
+    manifest: dict,
+    run_results: dict,
+    connection: duckdb.DuckDBPyConnection,
+    external_reads: int = 1,
+    min_savings: float = 1.0,
+    repeat: int = 3
+) -> List[ModelPlan]:
+    """
+    Recommend a materialization for each model of the manifest.
+
+    Parameters
+    ----------
+    manifest : dict
+        target/manifest.json.
+    run_results : dict
+        target/run_results.json (build times of models that are already tables).
+    connection : duckdb.DuckDBPyConnection
+        Connection to the database the models were built in.
+    external_reads : int
+        Reads of each model per run from outside the project (downstream profiles, exports).
+    min_savings : float
+        Minimum expected saving per run, in seconds, to recommend a table.
+    repeat : int
+        Timed queries per view (the best one is kept).
+
+    Returns
+    -------
+    List[ModelPlan]
+        One plan per model, largest expected saving first.
+    """
+    models = {uid: node for uid, node in manifest["nodes"].items() if node["resource_type"] == "model"}
+    reads = read_counts(models, manifest.get("child_map", {}), external_reads)
+    builds = build_seconds(run_results)
+
+    plans = []
+    for unique_id, node in models.items():
+        current = node["config"]["materialized"]
+        children = sum(1 for child in manifest.get("child_map", {}).get(unique_id, []) if child in models)
+        if current == "view":
+            seconds = query_seconds(connection, node["relation_name"], repeat)
+        else:
+            seconds = builds.get(unique_id)
+
+        if seconds is None:
+            plans.append(ModelPlan(
+                node["name"], node["original_file_path"], current, current, 0.0, children, reads[unique_id], 0.0,
+                "no timing (model not built or not queryable)"
+            ))
+            continue
+
+        savings = seconds * (reads[unique_id] - 1)
+        if savings >= min_savings:
+            recommended = "incremental" if INCREMENTAL_PATTERN.search(node.get("raw_code", "")) else "table"
+            reason = f"read {reads[unique_id]} times per run at {seconds:.2f}s per query"
+        else:
+            recommended = "view"
+            reason = "cheap or rarely read"
+        plans.append(ModelPlan(
+            node["name"], node["original_file_path"], current, recommended, round(seconds, 4),
+            children, reads[unique_id], round(savings if recommended != "view" else 0.0, 4), reason
+        ))
+    return sorted(plans, key=lambda plan: (-plan.expected_savings_seconds, plan.name))
+
+
+def apply_plan(plans: List[ModelPlan], project_dir: str) -> List[str]:
+    """Rewrite the materialized='...' config of the models whose recommendation changed."""
+    changed = []
+    for plan in plans:
+        if plan.recommended == plan.current:
+            continue
+        path = os.path.join(project_dir, plan.path)
+        with open(path, "r", encoding="utf-8") as f:
+            sql = f.read()
+        if not MATERIALIZED_PATTERN.search(sql):
+            print(f"⚠️  {plan.name}: no materialized='...' in its config() block, not changed")
+            continue
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(MATERIALIZED_PATTERN.sub(f"materialized='{plan.recommended}'", sql, count=1))
+        changed.append(plan.name)
+    return changed
+
+
+def write_plan(plans: List[ModelPlan], directory: str, started_at: datetime, options: dict) -> str:
+    """Write the plan as logs/materialization_plan_<timestamp>.json and return its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{PLAN_PREFIX}_{started_at:%Y%m%d_%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": started_at.isoformat(timespec="seconds"),
+            "options": options,
+            "expected_savings_seconds": round(sum(plan.expected_savings_seconds for plan in plans), 3),
+            "models": [plan.to_dict() for plan in plans],
+        }, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Recommend (or apply) dbt materializations from query timings")
+    parser.add_argument("--profile", default="Staging", help="Profile of metadata.yml / profiles.yml")
+    parser.add_argument("--env", default="local", help="Output of profiles.yml holding the DuckDB database")
+    parser.add_argument("--external-reads", type=int, default=1,
+                        help="Reads of each model per run by downstream profiles and exports (default: 1)")
+    parser.add_argument("--min-savings", type=float, default=1.0,
+                        help="Minimum expected saving per run, in seconds, to recommend a table (default: 1.0)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed queries per view (default: 3)")
+    parser.add_argument("--apply", action="store_true", help="Rewrite the config() block of the model files")
+    args = parser.parse_args()
+
+    started_at = datetime.now()
+    with open(METADATA_YML, "r", encoding="utf-8") as f:
+        project_dir = yaml.safe_load(f)[args.profile]["models_directory"]
+    with open(PROFILE_YML, "r", encoding="utf-8") as f:
+        db_path = yaml.safe_load(f)[args.profile]["outputs"][args.env]["path"]
+
+    try:
+        manifest, run_results = load_artifacts(project_dir)
+    except FileNotFoundError:
+        print(f"❌ No manifest in {project_dir}/target: run the pipeline (or dbt run) first")
+        return 1
+
+    connection = duckdb.connect(db_path, read_only=True)
+    try:
+        plans = plan_materializations(
+            manifest, run_results, connection, args.external_reads, args.min_savings, args.repeat
+        )
+    finally:
+        connection.close()
+
+    print(f"{'Model':<45} {'Current':<12} {'Plan':<12} {'Query':>8} {'Reads':>6} {'Saving':>8}")
+    for plan in plans:
+        print(
+            f"{plan.name:<45} {plan.current:<12} {plan.recommended:<12} "
+            f"{plan.query_seconds:>7.3f}s {plan.reads:>6} {plan.expected_savings_seconds:>7.2f}s"
+        )
+    total = sum(plan.expected_savings_seconds for plan in plans)
+    print(f"\n📊 Expected saving: {total:.2f}s per run - plan: {write_plan(plans, 'logs', started_at, vars(args))}")
+
+    if args.apply:
+        changed = apply_plan(plans, project_dir)
+        print(f"✅ {len(changed)} model(s) changed: {', '.join(changed) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Parquet Cache for ANAIS Staging
+
+This module keeps each cleaned, typed staging table as a zstd-compressed Parquet file
+keyed by the SHA-256 of its CSV file and of its CREATE TABLE file. When a table is
+rebuilt from the same inputs (new DuckDB database, another profile, --full-load...),
+it is read back from Parquet instead of parsing and converting the CSV again.
+
+Entries are named <table>-<key>.parquet; storing a new version of a table removes
+the previous ones.
+
+Usage:
+    cache = ParquetCache("data/parquet_cache")
+    path = cache.lookup("sa_sirec", signature)
+    if path is None:
+        ...  # load the CSV
+        cache.store("sa_sirec", signature, write=lambda tmp_path: ...)
+"""
+
+# === Packages ===
+import glob
+import hashlib
+import os
+from typing import Callable, Optional
+
+# === Constants ===
+DEFAULT_CACHE_DIRECTORY = "data/parquet_cache"
+KEY_LENGTH = 16
+
+
+class ParquetCache:
+    """
+    Directory of Parquet files, one per table and input signature.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIRECTORY):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(signature: dict) -> str:
+        """Cache key of an input signature (see load_state.input_signature)."""
+        content = f"{signature['csv_sha256']}:{signature['ddl_sha256']}".encode("utf-8")
+        return hashlib.sha256(content).hexdigest()[:KEY_LENGTH]
+
+    def path(self, table_name: str, signature: dict) -> str:
+        return os.path.join(self.directory, f"{table_name}-{self.key(signature)}.parquet")
+
+    def lookup(self, table_name: str, signature: dict) -> Optional[str]:
+        """Return the Parquet file of the table for these inputs, or None if not cached."""
+        path = self.path(table_name, signature)
+        return path if os.path.exists(path) else None
+
+    def store(self, table_name: str, signature: dict, write: Callable[[str], None]) -> int:
+        """
+        Write a table to the cache with write(path) and remove its previous entries.
+
+        The file is written under a temporary name and renamed once complete, so a
+        cache entry is never partial.
+
+        Returns
+        -------
+        int
+            Size of the Parquet file in bytes.
+        """
+        path = self.path(table_name, signature)
+        tmp_path = f"{path}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+        for old_path in glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(table_name)}-*.parquet")):
+            if old_path != path:
+                os.remove(old_path)
+        return os.path.getsize(path)
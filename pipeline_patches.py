@@ -5,16 +5,79 @@ Pipeline Patches for ANAIS Staging
 This module contains monkey patches for the installed pipeline package to fix bugs
 that cannot be fixed directly in the installed package.
 
+Patches are not applied on import: run_local_with_sftp.py applies them before
+building the 'pipeline' loader (the only one going through ColumnsManagement).
+Applying them again is a no-op.
+
+With record_conversions(), the patched conversion of each table is also timed in
+a run report (type_conversion step) and its coerced values are counted.
+
 Usage:
-    Import this module at the beginning of run_local_with_sftp.py:
-        from pipeline_patches import apply_all_patches
-        apply_all_patches()
+    from pipeline_patches import apply_all_patches, record_conversions
+    apply_all_patches()
+    record_conversions(report, load_table_schemas("output_sql/staging/"))
 """
 
-import pandas as pd
 import logging
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from ddl_schema import TableSchema
+from run_report import Metrics, RunReport
+from type_conversion import compile_plan
 
 logger = logging.getLogger(__name__)
+_applied = False
+
+
+class ConversionRecorder:
+    """
+    Record the conversions ColumnsManagement runs for DuckDBPipeline in a run report.
+
+    ColumnsManagement does not know its table: it is found from the columns of its
+    schema. Tables sharing the same columns are attributed in name order, each
+    table being converted once per run.
+    """
+
+    def __init__(self, report: RunReport, schemas: Dict[str, TableSchema]):
+        self.report = report
+        self.tables_by_columns: Dict[Tuple[str, ...], List[str]] = {}
+        for table_name in sorted(schemas):
+            self.tables_by_columns.setdefault(tuple(schemas[table_name].column_names), []).append(table_name)
+
+    def table_name(self, schema_df: pd.DataFrame) -> Optional[str]:
+        """Table of a ColumnsManagement schema, or None if no staging table has its columns."""
+        candidates = self.tables_by_columns.get(tuple(schema_df["column_name"]), [])
+        recorded = self.report.tables.get("type_conversion", {})
+        return next((name for name in candidates if name not in recorded), candidates[-1] if candidates else None)
+
+    @contextmanager
+    def measure(self, schema_df: pd.DataFrame, coerced: Dict[str, int]) -> Iterator[Metrics]:
+        """Time a conversion under type_conversion and record the values it coerced."""
+        table_name = self.table_name(schema_df)
+        if table_name is None:
+            yield Metrics()
+            return
+        with self.report.table("type_conversion", table_name) as metrics:
+            yield metrics
+        if coerced:
+            self.report.add_coerced(table_name, coerced)
+
+
+_recorder: Optional[ConversionRecorder] = None
+
+
+def record_conversions(report: Optional[RunReport], schemas: Optional[Dict[str, TableSchema]] = None):
+    """Record the patched conversions in report (None stops recording)."""
+    global _recorder
+    _recorder = ConversionRecorder(report, schemas or {}) if report is not None else None
+
+
+def measure_conversion(schema_df: pd.DataFrame, coerced: Dict[str, int]):
+    """Measure a patched conversion when record_conversions() is active (no-op otherwise)."""
+    return _recorder.measure(schema_df, coerced) if _recorder is not None else nullcontext(Metrics())
 
 
 def patch_boolean_conversion():
@@ -25,7 +88,9 @@ def patch_boolean_conversion():
         pandas .astype(bool) converts any non-empty string to True, including "false"
 
     Solution:
-        Replace the boolean conversion logic with explicit string mapping
+        Replace the boolean conversion logic with explicit string mapping, applied
+        through the compiled conversion plans of type_conversion.py. Empty and
+        unmapped values become False; unmapped values are logged.
 
     Note on SIVSS boolean columns:
         The SIVSS table previously had 4 BOOLEAN columns (est_eigs, reclamation,
@@ -49,79 +114,16 @@ def patch_boolean_conversion():
         def patched_convert_columns_type(self):
             """
             Patched version of convert_columns_type that correctly handles boolean values.
+
+            The table schema is compiled once into a conversion plan (see
+            type_conversion.py), then applied to all columns in a single pass.
             """
             logger.debug("🔧 Using patched boolean conversion logic")
-
-            for _, row in self.schema_df.iterrows():
-                col_name = row["column_name"]
-                col_type = str(row["column_base_type"])
-                col_length = row["column_length"]
-
-                if col_name in self.df.columns and col_type in self.type_mapping:
-                    try:
-                        if self.type_mapping[col_type] in ["int", "float"]:
-                            self.df[col_name] = self.df[col_name].replace(
-                                {None: 0, "": 0, pd.NA: 0, "nan": 0}
-                            ).astype(float).astype(self.type_mapping[col_type])
-
-                        elif self.type_mapping[col_type] == "bool":
-                            # === PATCHED BOOLEAN CONVERSION ===
-                            # Create comprehensive mapping for string boolean values
-                            bool_map = {
-                                # String representations
-                                'true': True, 'True': True, 'TRUE': True,
-                                'false': False, 'False': False, 'FALSE': False,
-                                # Numeric representations
-                                '1': True, 1: True, 1.0: True,
-                                '0': False, 0: False, 0.0: False,
-                                # NULL/empty representations
-                                None: False, '': False, pd.NA: False,
-                                'nan': False, 'NaN': False, 'NAN': False,
-                                # Additional common formats
-                                'yes': True, 'Yes': True, 'YES': True,
-                                'no': False, 'No': False, 'NO': False,
-                                'y': True, 'Y': True,
-                                'n': False, 'N': False,
-                                't': True, 'T': True,
-                                'f': False, 'F': False,
-                            }
-
-                            # Map values using the dictionary
-                            mapped_values = self.df[col_name].map(bool_map)
-
-                            # Check for unmapped values and log warnings
-                            unmapped_mask = mapped_values.isna() & self.df[col_name].notna()
-                            if unmapped_mask.any():
-                                unmapped_values = self.df.loc[unmapped_mask, col_name].unique()
-                                logger.warning(
-                                    f"⚠️  Column '{col_name}': Found unmapped boolean values: {list(unmapped_values)}. "
-                                    f"These will be converted to False."
-                                )
-
-                            # Fill unmapped values with False and convert to boolean
-                            self.df[col_name] = mapped_values.fillna(False).astype(bool)
-                            logger.debug(f"✅ Column '{col_name}': Boolean conversion successful")
-                            # === END PATCHED BOOLEAN CONVERSION ===
-
-                        elif self.type_mapping[col_type] == "datetime64":
-                            self.df[col_name] = pd.to_datetime(
-                                self.df[col_name], format="%d-%m-%Y", errors="coerce"
-                            )
-
-                        elif self.type_mapping[col_type] == "string":
-                            self.df[col_name] = self.df[col_name].astype(
-                                self.type_mapping[col_type]
-                            ).fillna('')
-                            if not pd.isna(col_length):
-                                self.df[col_name] = self.df[col_name].str[:col_length]
-
-                        else:
-                            self.df[col_name] = self.df[col_name].astype(
-                                self.type_mapping[col_type]
-                            )
-
-                    except ValueError as e:
-                        logger.warning(f"Erreur de conversion pour {col_name}: {e}")
+            plan = compile_plan(self.schema_df, self.type_mapping)
+            coerced = {}
+            with measure_conversion(self.schema_df, coerced) as metrics:
+                plan.apply(self.df, coerced)
+                metrics.rows = len(self.df)
 
         # Apply the patch
         csv_management.ColumnsManagement.convert_columns_type = patched_convert_columns_type
@@ -140,15 +142,19 @@ def apply_all_patches():
     """
     Apply all monkey patches to the pipeline package.
 
-    This function should be called at the start of run_local_with_sftp.py
-    before any pipeline operations are performed.
+    This function should be called before any pipeline operation converting CSV
+    data (DuckDBPipeline); calls after the first one do nothing.
     """
+    global _applied
+    if _applied:
+        return
     logger.info("=" * 80)
     logger.info("🔧 Applying pipeline patches...")
     logger.info("=" * 80)
 
     # Apply boolean conversion patch
     patch_boolean_conversion()
+    _applied = True
 
     logger.info("✅ All patches applied successfully")
     logger.info("")
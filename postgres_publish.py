@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Postgres Publish for ANAIS Staging
+
+This module copies the tables of the local DuckDB staging database to the Postgres
+database of a profile (the 'anais' output of profiles.yml) with COPY instead of
+row-by-row inserts:
+    - DuckDB streams each table as Arrow record batches, encoded to CSV batch by
+      batch (ArrowCsvStream) and read by COPY ... FROM STDIN (FORMAT csv) into a
+      shadow table <table>__shadow created from the CREATE TABLE file; nothing is
+      written to disk (without pyarrow, DuckDB writes a temporary CSV file instead)
+    - in the same transaction, the shadow table replaces the published table
+      (rename + drop), so readers see either the previous or the new data
+
+Tables are published in parallel (largest first), each worker using its own
+connection from a psycopg2 pool and its own DuckDB cursor. The rows, bytes and
+rows/s of each table are logged and recorded in the run report.
+
+The views built on a published table (e.g. by dbt) are dropped and recreated from
+their definitions around the swap, in the same transaction; the previous table is
+dropped without CASCADE, so any other dependent object fails the table instead of
+being silently dropped. The owner and privileges (GRANTs) of the table and of its
+views are read before the swap and applied again to the new objects. Swaps run one
+at a time to keep view recreation free of lock cycles between workers.
+
+The password of profiles.yml ("{{ env_var('STAGING_PASSWORD') }}") is read from
+the environment.
+
+Usage:
+    publisher = PostgresPublisher(pg_config, "data/staging/duckdb_database.duckdb", schemas, logger, workers=4)
+    rows = publisher.publish()
+
+    # Against a local Postgres: add an output (e.g. 'pg_local') to the profile in profiles.yml
+    python postgres_publish.py --profile Staging --output pg_local --workers 4
+"""
+
+# === Packages ===
+import argparse
+import io
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging import Logger
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import duckdb
+import psycopg2
+import yaml
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # optional: tables go through a temporary CSV file
+    pa = None
+
+# === Modules ===
+from ddl_schema import TableSchema, load_table_schemas
+from run_report import RunReport, measure
+
+# === Constants ===
+DEFAULT_PUBLISH_WORKERS = 4
+COPY_BUFFER_SIZE = 1024 * 1024
+ARROW_BATCH_ROWS = 100_000
+SHADOW_SUFFIX = "__shadow"
+PREVIOUS_SUFFIX = "__previous"
+ENV_VAR_PATTERN = re.compile(r"\{\{\s*env_var\(\s*'(\w+)'\s*(?:,\s*'([^']*)'\s*)?\)\s*\}\}")
+# Views and materialized views depending (directly or through other views) on a table,
+# with their definitions, dependencies first
+DEPENDENT_VIEWS_QUERY = """
+WITH RECURSIVE dependents(oid, depth) AS (
+    SELECT rewrite.ev_class, 1
+    FROM pg_depend dep
+    JOIN pg_rewrite rewrite ON rewrite.oid = dep.objid
+    WHERE dep.classid = 'pg_rewrite'::regclass AND dep.refclassid = 'pg_class'::regclass
+      AND rewrite.ev_class <> dep.refobjid
+      AND dep.refobjid = (
+          SELECT c.oid FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+          WHERE n.nspname = %s AND c.relname = %s
+      )
+    UNION
+    SELECT rewrite.ev_class, dependents.depth + 1
+    FROM dependents
+    JOIN pg_depend dep ON dep.refobjid = dependents.oid
+    JOIN pg_rewrite rewrite ON rewrite.oid = dep.objid
+    WHERE dep.classid = 'pg_rewrite'::regclass AND dep.refclassid = 'pg_class'::regclass
+      AND rewrite.ev_class <> dep.refobjid
+)
+SELECT n.nspname, c.relname, c.relkind, pg_get_viewdef(c.oid), max(dependents.depth) AS depth
+FROM dependents
+JOIN pg_class c ON c.oid = dependents.oid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+GROUP BY n.nspname, c.relname, c.relkind, c.oid
+ORDER BY depth, n.nspname, c.relname
+"""
+# Owner and privileges of a relation (none when it only has its default privileges)
+PRIVILEGES_QUERY = """
+SELECT pg_get_userbyid(c.relowner), current_user,
+       CASE WHEN acl.grantee = 0 THEN NULL ELSE pg_get_userbyid(acl.grantee) END,
+       acl.privilege_type, acl.is_grantable
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN LATERAL aclexplode(c.relacl) acl ON true
+WHERE n.nspname = %s AND c.relname = %s
+"""
+RELATION_KEYWORDS = {"r": "TABLE", "v": "VIEW", "m": "MATERIALIZED VIEW"}
+
+
+def resolve_env_vars(value):
+    """Replace dbt's {{ env_var('NAME') }} / {{ env_var('NAME', 'default') }} by the environment value."""
+    if not isinstance(value, str):
+        return value
+
+    def replace(match):
+        name, default = match.group(1), match.group(2)
+        if name not in os.environ and default is None:
+            raise KeyError(f"Environment variable {name} is not set")
+        return os.environ.get(name, default)
+
+    return ENV_VAR_PATTERN.sub(replace, value)
+
+
+def connection_parameters(pg_config: dict) -> dict:
+    """psycopg2 connection parameters of a Postgres output of profiles.yml."""
+    return {
+        "host": pg_config["host"],
+        "port": int(pg_config.get("port", 5432)),
+        "user": resolve_env_vars(pg_config["user"]),
+        "password": resolve_env_vars(pg_config.get("password")),
+        "dbname": pg_config["dbname"],
+    }
+
+
+def column_definitions(schema: TableSchema) -> sql.Composed:
+    """Column list of a CREATE TABLE statement built from the parsed DDL."""
+    return sql.SQL(", ").join(
+        sql.SQL("{} {}").format(
+            sql.Identifier(column.name),
+            sql.SQL(f"{column.base_type}({column.length})" if column.length else column.base_type)
+        )
+        for column in schema.columns
+    )
+
+
+class ArrowCsvStream:
+    """
+    Readable file serving Arrow record batches as header-less CSV, one batch
+    encoded at a time (NULL unquoted, '' quoted, as COPY ... (FORMAT csv) reads them).
+    """
+
+    def __init__(self, batches: Iterator["pa.RecordBatch"]):
+        self.batches = iter(batches)
+        self.buffer = bytearray()
+        self.bytes = 0
+        self._options = pa_csv.WriteOptions(include_header=False, quoting_style="needed")
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            batch = next(self.batches, None)
+            if batch is None:
+                break
+            sink = io.BytesIO()
+            pa_csv.write_csv(batch, sink, self._options)
+            self.buffer += sink.getbuffer()
+        size = len(self.buffer) if size < 0 else min(size, len(self.buffer))
+        block = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.bytes += size
+        return block
+
+
+class PostgresPublisher:
+    """
+    Publish DuckDB staging tables to Postgres through COPY and shadow-table swaps.
+
+    Parameters
+    ----------
+    pg_config : dict
+        Postgres output of profiles.yml (host, port, user, password, dbname, schema).
+    duckdb_path : str
+        Local DuckDB database holding the staged tables.
+    schemas : Dict[str, TableSchema]
+        Parsed CREATE TABLE files, by table name.
+    logger : Logger
+        Log file.
+    workers : int
+        Tables published at the same time (and size of the connection pool).
+    report : Optional[RunReport]
+        Run report receiving the measurements of each table.
+    """
+
+    def __init__(
+        self,
+        pg_config: dict,
+        duckdb_path: str,
+        schemas: Dict[str, TableSchema],
+        logger: Logger,
+        workers: int = DEFAULT_PUBLISH_WORKERS,
+        report: Optional[RunReport] = None
+    ):
+        self.pg_config = pg_config
+        self.pg_schema = pg_config.get("schema", "public")
+        self.duckdb_path = duckdb_path
+        self.schemas = schemas
+        self.logger = logger
+        self.workers = max(1, workers)
+        self.report = report
+        self._local = threading.local()
+        self._swap_lock = threading.Lock()
+
+    def list_tables(self, connection: duckdb.DuckDBPyConnection) -> List[str]:
+        """Staged tables that have a CREATE TABLE file, largest first."""
+        rows = connection.execute(
+            "SELECT table_name, estimated_size FROM duckdb_tables() WHERE schema_name = 'main' AND NOT internal"
+        ).fetchall()
+        return [name for name, _ in sorted(rows, key=lambda row: -(row[1] or 0)) if name in self.schemas]
+
+    def export_csv(self, cursor: duckdb.DuckDBPyConnection, schema: TableSchema) -> str:
+        """Write a DuckDB table as a header-less CSV file (NULL unquoted, '' quoted) and return its path."""
+        handle, path = tempfile.mkstemp(prefix=f"{schema.name}_", suffix=".csv")
+        os.close(handle)
+        columns = ", ".join(f'"{name}"' for name in schema.column_names)
+        cursor.execute(
+            f"COPY (SELECT {columns} FROM main.\"{schema.name}\") TO '{path}' (FORMAT csv, HEADER false)"
+        )
+        return path
+
+    def export_arrow(self, cursor: duckdb.DuckDBPyConnection, schema: TableSchema) -> ArrowCsvStream:
+        """Stream a DuckDB table as CSV through Arrow record batches, without any file."""
+        columns = ", ".join(f'"{name}"' for name in schema.column_names)
+        batches = cursor.execute(f"SELECT {columns} FROM main.\"{schema.name}\"").fetch_record_batch(ARROW_BATCH_ROWS)
+        return ArrowCsvStream(batches)
+
+    def dependent_views(self, pg, table_name: str) -> List[Tuple[str, str, str, str]]:
+        """(schema, name, kind, definition) of the views built on a table, dependencies first."""
+        pg.execute(DEPENDENT_VIEWS_QUERY, (self.pg_schema, table_name))
+        return [(schema, name, kind, definition) for schema, name, kind, definition, _ in pg.fetchall()]
+
+    def privileges(self, pg, schema: str, name: str) -> Optional[Tuple[str, str, list]]:
+        """
+        (owner, current user, grants) of a relation, grants being (grantee, privilege,
+        grantable) with None for PUBLIC; None if the relation does not exist.
+        """
+        pg.execute(PRIVILEGES_QUERY, (schema, name))
+        rows = pg.fetchall()
+        if not rows:
+            return None
+        grants = [(grantee, privilege, grantable) for _, _, grantee, privilege, grantable in rows if privilege]
+        return rows[0][0], rows[0][1], grants
+
+    def restore_privileges(self, pg, schema: str, name: str, kind: str, privileges: Optional[Tuple[str, str, list]]):
+        """Give a recreated relation the owner and grants of the relation it replaces."""
+        if privileges is None:
+            return
+        owner, current_user, grants = privileges
+        relation = sql.Identifier(schema, name)
+        for grantee, privilege, grantable in grants:
+            pg.execute(sql.SQL("GRANT {} ON TABLE {} TO {}{}").format(
+                sql.SQL(privilege), relation,
+                sql.Identifier(grantee) if grantee is not None else sql.SQL("PUBLIC"),
+                sql.SQL(" WITH GRANT OPTION" if grantable else "")
+            ))
+        if owner != current_user:
+            pg.execute(sql.SQL("ALTER {} {} OWNER TO {}").format(
+                sql.SQL(RELATION_KEYWORDS[kind]), relation, sql.Identifier(owner)))
+
+    def swap(self, pg, table_name: str):
+        """
+        Replace a table by its shadow table, dropping and recreating the views built on
+        it from their definitions (taken while they still point to the current table).
+        The new table and views keep the owner and grants of the ones they replace.
+
+        Raises
+        ------
+        psycopg2.Error
+            If another object depends on the table, or a view no longer matches the
+            new table (the transaction is then rolled back).
+        """
+        table = sql.Identifier(self.pg_schema, table_name)
+        shadow = sql.Identifier(self.pg_schema, table_name + SHADOW_SUFFIX)
+        previous = sql.Identifier(self.pg_schema, table_name + PREVIOUS_SUFFIX)
+        views = self.dependent_views(pg, table_name)
+        table_privileges = self.privileges(pg, self.pg_schema, table_name)
+        view_privileges = [self.privileges(pg, schema, name) for schema, name, _, _ in views]
+        for schema, name, kind, _ in reversed(views):
+            drop = "DROP MATERIALIZED VIEW {}" if kind == "m" else "DROP VIEW {}"
+            pg.execute(sql.SQL(drop).format(sql.Identifier(schema, name)))
+
+        pg.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(previous))
+        pg.execute(sql.SQL("ALTER TABLE IF EXISTS {} RENAME TO {}").format(
+            table, sql.Identifier(table_name + PREVIOUS_SUFFIX)))
+        pg.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(shadow, sql.Identifier(table_name)))
+        pg.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(previous))
+        self.restore_privileges(pg, self.pg_schema, table_name, "r", table_privileges)
+
+        for (schema, name, kind, definition), privileges in zip(views, view_privileges):
+            create = "CREATE MATERIALIZED VIEW {} AS {}" if kind == "m" else "CREATE VIEW {} AS {}"
+            pg.execute(sql.SQL(create).format(sql.Identifier(schema, name), sql.SQL(definition.strip().rstrip(";"))))
+            self.restore_privileges(pg, schema, name, kind, privileges)
+        if views:
+            self.logger.info(f"🔁 {table_name}: {len(views)} dependent view(s) recreated")
+
+    def publish_table(self, table_name: str, cursor: duckdb.DuckDBPyConnection, pool: ThreadedConnectionPool) -> int:
+        """Copy a table into its shadow table and swap it in, in one transaction; return the row count."""
+        schema = self.schemas[table_name]
+        shadow = sql.Identifier(self.pg_schema, table_name + SHADOW_SUFFIX)
+        columns = sql.SQL(", ").join(sql.Identifier(name) for name in schema.column_names)
+
+        with self.measure(table_name) as metrics:
+            path = None if pa is not None else self.export_csv(cursor, schema)
+            try:
+                source = open(path, "rb") if path is not None else self.export_arrow(cursor, schema)
+                connection = pool.getconn()
+                try:
+                    with connection, connection.cursor() as pg:
+                        pg.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(shadow))
+                        pg.execute(sql.SQL("CREATE TABLE {} ({})").format(shadow, column_definitions(schema)))
+                        pg.copy_expert(
+                            sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(shadow, columns),
+                            source,
+                            size=COPY_BUFFER_SIZE
+                        )
+                        metrics.rows = pg.rowcount
+                        metrics.bytes = source.bytes if path is None else os.path.getsize(path)
+                        # Swap: readers see the previous table until commit
+                        with self._swap_lock:
+                            self.swap(pg, table_name)
+                            connection.commit()
+                finally:
+                    pool.putconn(connection)
+                    if path is not None:
+                        source.close()
+            finally:
+                if path is not None:
+                    os.remove(path)
+
+        self.logger.info(
+            f"✅ {table_name}: {metrics.rows} rows published in {metrics.wall_seconds:.1f}s "
+            f"({metrics.rows_per_second:,.0f} rows/s)"
+        )
+        return metrics.rows
+
+    def measure(self, table_name: str):
+        """Context manager measuring the publish of a table, recorded in the run report (if any)."""
+        if self.report is not None:
+            return self.report.table("postgres_publish", table_name)
+        return measure(cpu_clock=time.thread_time)
+
+    def _cursor(self, connection: duckdb.DuckDBPyConnection) -> duckdb.DuckDBPyConnection:
+        """DuckDB cursor of the current worker thread."""
+        if not hasattr(self._local, "cursor"):
+            self._local.cursor = connection.cursor()
+        return self._local.cursor
+
+    def publish(self, tables: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Publish the given tables (every staged table by default).
+
+        Returns
+        -------
+        Dict[str, int]
+            Rows published per table.
+
+        Raises
+        ------
+        RuntimeError
+            If at least one table failed (the others are still published).
+        """
+        params = connection_parameters(self.pg_config)
+        self.logger.info(f"🐘 Publishing to postgres://{params['host']}:{params['port']}/{params['dbname']} ({self.pg_schema})")
+
+        connection = duckdb.connect(self.duckdb_path, read_only=True)
+        pool = ThreadedConnectionPool(1, self.workers, **params)
+        rows, failures = {}, {}
+        try:
+            tables = tables or self.list_tables(connection)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {
+                    executor.submit(lambda t: self.publish_table(t, self._cursor(connection), pool), table): table
+                    for table in tables
+                }
+                for future in as_completed(futures):
+                    table_name = futures[future]
+                    try:
+                        rows[table_name] = future.result()
+                    except (duckdb.Error, psycopg2.Error, OSError) as e:
+                        failures[table_name] = e
+                        self.logger.error(f"❌ {table_name}: publishing failed: {str(e).strip()}")
+        finally:
+            pool.closeall()
+            connection.close()
+
+        if failures:
+            raise RuntimeError(f"{len(failures)} table(s) failed to publish: {', '.join(sorted(failures))}")
+        return rows
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Publish the DuckDB staging tables to Postgres with COPY")
+    parser.add_argument("--profile", default="Staging", help="Profile of metadata.yml / profiles.yml")
+    parser.add_argument("--output", default="anais", help="Postgres output of the profile in profiles.yml")
+    parser.add_argument("--workers", type=int, default=DEFAULT_PUBLISH_WORKERS, help="Tables published in parallel")
+    parser.add_argument("--tables", nargs="*", help="Tables to publish (default: every staged table)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger("postgres_publish")
+    with open("metadata.yml", "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)[args.profile]
+    with open("profiles.yml", "r", encoding="utf-8") as f:
+        outputs = yaml.safe_load(f)[args.profile]["outputs"]
+
+    publisher = PostgresPublisher(
+        outputs[args.output],
+        outputs["local"]["path"],
+        load_table_schemas(config["create_table_directory"]),
+        logger,
+        workers=args.workers
+    )
+    rows = publisher.publish(args.tables)
+    logger.info(f"📊 {len(rows)} table(s), {sum(rows.values())} rows published")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
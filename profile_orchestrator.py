@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Multi-Profile Orchestration for ANAIS
+
+Every business profile (CertDC, Helios, InspectionControlePA/PH, Matrice_PA/PH)
+is built on top of the Staging layer. This module runs several profiles in a single
+invocation:
+    - the requested profiles are resolved against metadata.yml and profiles.yml;
+      profiles missing from either file are reported instead of being run ('all'
+      stands for the profiles declared in profiles.yml, see declared_profiles)
+    - a dependency DAG is built: Staging first, every other profile after it
+    - each profile starts as soon as its dependencies succeeded, at most `workers`
+      at a time, each in its own process (dbt's in-process runner is not thread-safe)
+    - profiles whose output is the same database (e.g. InspectionControlePA/PH on
+      'inspection_controle') never run at the same time: their dbt runs and table
+      swaps would otherwise interleave across processes
+    - profiles whose dependencies failed are skipped
+    - the status and timings of all profiles are collected in one summary
+
+Usage:
+    dependencies = profile_dependencies(["Staging", "CertDC", "Helios"])
+    exclusive = shared_database_groups(list(dependencies), "anais")
+    orchestrator = ProfileOrchestrator(run_profile, dependencies, workers=2, logger=logger, exclusive=exclusive)
+    results = orchestrator.run()
+    write_summary(results, "logs", started_at)
+"""
+
+# === Packages ===
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from logging import Logger
+from typing import Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+# === Constants ===
+STAGING_PROFILE = "Staging"
+SUMMARY_PREFIX = "profiles_summary"
+
+
+@dataclass
+class ProfileResult:
+    """Outcome of one profile: success, failed, skipped (failed dependency) or missing."""
+    profile: str
+    status: str
+    seconds: float = 0.0
+    error: Optional[str] = None
+    report: Optional[str] = None
+    stages: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def declared_profiles(profiles_path: str = "profiles.yml") -> List[str]:
+    """Profiles declared in profiles.yml, in file order."""
+    with open(profiles_path, "r", encoding="utf-8") as f:
+        return list(yaml.safe_load(f) or {})
+
+
+def resolve_profiles(
+    requested: List[str],
+    env: str,
+    metadata_path: str = "metadata.yml",
+    profiles_path: str = "profiles.yml"
+) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Split the requested profiles into runnable and missing ones.
+
+    Returns
+    -------
+    Tuple[List[str], Dict[str, str]]
+        Runnable profiles (in the requested order) and, for each missing profile,
+        the reason it cannot run.
+    """
+    with open(metadata_path, "r", encoding="utf-8") as f:
+        metadata = yaml.safe_load(f) or {}
+    with open(profiles_path, "r", encoding="utf-8") as f:
+        profiles = yaml.safe_load(f) or {}
+
+    runnable, missing = [], {}
+    for profile in requested:
+        if profile not in metadata:
+            missing[profile] = f"no '{profile}' entry in {metadata_path}"
+        elif env not in (profiles.get(profile) or {}).get("outputs", {}):
+            missing[profile] = f"no '{env}' output for '{profile}' in {profiles_path}"
+        else:
+            runnable.append(profile)
+    return runnable, missing
+
+
+def profile_dependencies(profiles: List[str]) -> Dict[str, List[str]]:
+    """
+    Dependency DAG of the profiles of a run: every business profile reads the
+    Staging layer, so it depends on Staging when Staging is part of the run.
+    """
+    return {
+        profile: [STAGING_PROFILE] if profile != STAGING_PROFILE and STAGING_PROFILE in profiles else []
+        for profile in profiles
+    }
+
+
+def shared_database_groups(
+    profiles: List[str], env: str, profiles_path: str = "profiles.yml"
+) -> List[List[str]]:
+    """
+    Groups of profiles whose env output is the same database: same Postgres host,
+    port and dbname, or same DuckDB file. Profiles alone on their database are left out.
+    """
+    with open(profiles_path, "r", encoding="utf-8") as f:
+        outputs = yaml.safe_load(f) or {}
+
+    groups: Dict[tuple, List[str]] = {}
+    for profile in profiles:
+        output = ((outputs.get(profile) or {}).get("outputs") or {}).get(env) or {}
+        if output.get("path"):
+            key = ("path", os.path.abspath(output["path"]))
+        else:
+            key = (output.get("host"), str(output.get("port", 5432)), output.get("dbname"))
+        groups.setdefault(key, []).append(profile)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+class ProfileOrchestrator:
+    """
+    Run profiles in dependency order with a bounded process pool.
+
+    Parameters
+    ----------
+    run_profile : Callable[[str], ProfileResult]
+        Runs one profile; must be picklable (module-level function or partial).
+    dependencies : Dict[str, List[str]]
+        Profiles to run and the profiles each one depends on.
+    workers : int
+        Maximum number of profiles running at the same time.
+    logger : Logger
+        Log file.
+    exclusive : Optional[List[List[str]]]
+        Groups of profiles that must not run at the same time (see
+        shared_database_groups), whatever the outcome of the others.
+    """
+
+    def __init__(
+        self,
+        run_profile: Callable[[str], ProfileResult],
+        dependencies: Dict[str, List[str]],
+        workers: int,
+        logger: Logger,
+        exclusive: Optional[List[List[str]]] = None
+    ):
+        self.run_profile = run_profile
+        self.dependencies = dependencies
+        self.workers = max(1, workers)
+        self.logger = logger
+        self.conflicts: Dict[str, set] = {}
+        for group in exclusive or []:
+            for profile in group:
+                self.conflicts.setdefault(profile, set()).update(set(group) - {profile})
+
+    def run(self) -> Dict[str, ProfileResult]:
+        """Run every profile whose dependencies succeed and return the result of each."""
+        results: Dict[str, ProfileResult] = {}
+        pending = dict(self.dependencies)
+        running: Dict[Future, str] = {}
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                for profile, dependencies in list(pending.items()):
+                    failed = [d for d in dependencies if d in results and results[d].status != "success"]
+                    if failed:
+                        del pending[profile]
+                        results[profile] = ProfileResult(
+                            profile, "skipped", error=f"dependency {', '.join(failed)} did not succeed"
+                        )
+                        self.logger.warning(f"⏭️  {profile}: skipped ({results[profile].error})")
+                    elif all(d in results for d in dependencies):
+                        if self.conflicts.get(profile, set()) & set(running.values()):
+                            # Another profile on the same database is running: wait for it
+                            continue
+                        del pending[profile]
+                        self.logger.info(f"▶️  {profile}: scheduled")
+                        running[executor.submit(self.run_profile, profile)] = profile
+
+                if not running:
+                    # Remaining profiles wait on a dependency that is not part of the run
+                    for profile in pending:
+                        results[profile] = ProfileResult(profile, "skipped", error="unresolvable dependency")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    profile = running.pop(future)
+                    try:
+                        results[profile] = future.result()
+                    except Exception as e:
+                        results[profile] = ProfileResult(profile, "failed", error=str(e))
+                    result = results[profile]
+                    if result.status == "success":
+                        self.logger.info(f"✅ {profile}: completed in {result.seconds:.1f}s")
+                    else:
+                        self.logger.error(f"❌ {profile}: failed after {result.seconds:.1f}s ({result.error})")
+        return results
+
+
+def write_summary(
+    results: Dict[str, ProfileResult],
+    directory: str,
+    started_at: datetime
+) -> str:
+    """Write the combined status and timings as logs/profiles_summary_<timestamp>.json and return its path."""
+    statuses = [result.status for result in results.values()]
+    summary = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "wall_seconds": round((datetime.now() - started_at).total_seconds(), 3),
+        "counts": {status: statuses.count(status) for status in sorted(set(statuses))},
+        "profiles": {profile: result.to_dict() for profile, result in results.items()},
+    }
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{SUMMARY_PREFIX}_{started_at:%Y%m%d_%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return path
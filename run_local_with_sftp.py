@@ -12,136 +12,559 @@ Usage:
 
     # With SFTP (automatic download)
     uv run run_local_with_sftp.py --env "local" --profile "Staging" --use-sftp
+
+    # With DuckDB's native CSV reader (bypasses pandas)
+    uv run run_local_with_sftp.py --env "local" --profile "Staging" --loader duckdb-native
+
+    # Keep parsed tables as Parquet files so rebuilds skip CSV parsing
+    uv run run_local_with_sftp.py --env "local" --profile "Staging" --loader duckdb-native --parquet-cache
+
+    # Also capture a sampling profile of the loader (logs/run_profile_<timestamp>_<profile>_<pid>.folded)
+    uv run run_local_with_sftp.py --env "local" --profile "Staging" --loader duckdb-native --profile-run
+
+    # Load each table as soon as its SFTP download finishes, while the others are transferring
+    uv run run_local_with_sftp.py --env "local" --profile "Staging" --use-sftp --loader duckdb-native --overlap --load-workers 4
+
+    # Reload every table and rebuild every dbt model, even if inputs did not change
+    uv run run_local_with_sftp.py --env "local" --profile "Staging" --full-load
+
+    # Load locally, then publish the tables to the Postgres 'anais' database and run DBT there
+    uv run run_local_with_sftp.py --env "anais" --profile "Staging" --loader duckdb-native
+
+    # Every profile: Staging first, then the business profiles 3 at a time
+    uv run run_local_with_sftp.py --env "local" --profiles all --profile-workers 3
 """
 
 # === Packages ===
 import argparse
 import os
+import queue
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+from functools import partial
 from logging import Logger
 from dotenv import load_dotenv
-from paramiko import Transport, SFTPClient, RSAKey, Ed25519Key, ECDSAKey
-from typing import Optional
-
-# === Apply Pipeline Patches (MUST BE BEFORE OTHER PIPELINE IMPORTS) ===
-from pipeline_patches import apply_all_patches
-apply_all_patches()
+from typing import Dict, List, Optional, Tuple
 
 # === Modules ===
-from pipeline.utils.config import setup_config
-from pipeline.utils.load_yml import load_metadata_YAML
-from pipeline.utils.logging_management import setup_logger
-from pipeline.utils.sftp_sync import SFTPSync
-from pipeline.database_management.duckdb_pipeline import DuckDBPipeline
-from pipeline.utils.dbt_tools import dbt_exec
+# Only light modules are imported here, so --help and argument errors return at
+# once. paramiko, pandas, DuckDB, dbt and the pipeline package are imported by the
+# stage that needs them, and the pipeline patches are applied before the
+# 'pipeline' loader is built (see build_loader).
+from ddl_schema import load_table_schemas
+from encoding_normalization import UTF8_DIRECTORY, normalize_directory
+from file_inspection import inspect_directory
+from load_state import LoadStateStore, dbt_project_sha256
+from parquet_cache import DEFAULT_CACHE_DIRECTORY, ParquetCache
+from profile_orchestrator import (
+    STAGING_PROFILE, ProfileOrchestrator, ProfileResult, declared_profiles, profile_dependencies, resolve_profiles,
+    shared_database_groups, write_summary
+)
+from run_report import LOAD_STEPS, READ_STEPS, Metrics, RunReport, SamplingProfiler
+from sftp_download import DEFAULT_MAX_CONNECTIONS
 
 # === Constants ===
-ENV_CHOICE = ["local"]  # Only local environment supported
+# 'anais': load into the local DuckDB database, then publish it to the Postgres output
+ENV_CHOICE = ["local", "anais"]
+# Downloaded files waiting for a loader worker (the download waits when it is full)
+OVERLAP_QUEUE_SIZE = 8
+# --chunk-rows without a value: small batches pay pandas' per-column costs once per batch
+DEFAULT_CHUNK_ROWS = 100_000
 PROFILE_CHOICE = ["Staging", "CertDC", "Helios", "InspectionControlePA", "InspectionControlePH", "MatricePreciblage"]
+LOADER_CHOICE = ["pipeline", "duckdb-native"]
 METADATA_YML = "metadata.yml"
 PROFILE_YML = "profiles.yml"
 
 
-# === Custom SFTP Class with Private Key Support ===
-class SFTPSyncWithKey(SFTPSync):
+@dataclass(frozen=True)
+class PipelineOptions:
+    """Command line options of a profile run: SFTP download, loader and Postgres publish."""
+    # SFTP download
+    use_sftp: bool = False
+    sftp_connections: int = DEFAULT_MAX_CONNECTIONS
+    full_sync: bool = False
+    overlap: bool = False
+    # Loader
+    loader_type: str = LOADER_CHOICE[0]
+    chunk_rows: Optional[int] = None
+    load_workers: int = 1
+    full_load: bool = False
+    parquet_cache: Optional[str] = None
+    # Postgres publish (default: postgres_publish.DEFAULT_PUBLISH_WORKERS)
+    publish_workers: Optional[int] = None
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "PipelineOptions":
+        """Options from the parsed arguments of main()."""
+        return cls(
+            use_sftp=args.use_sftp,
+            sftp_connections=args.sftp_connections,
+            full_sync=args.full_sync,
+            overlap=args.overlap,
+            loader_type=args.loader,
+            chunk_rows=args.chunk_rows,
+            load_workers=args.load_workers,
+            full_load=args.full_load,
+            parquet_cache=args.parquet_cache,
+            publish_workers=args.publish_workers,
+        )
+
+
+def build_loader(
+    options: PipelineOptions,
+    db_config: dict,
+    config: dict,
+    logger: Logger,
+    state: Optional[LoadStateStore] = None,
+    report: Optional[RunReport] = None,
+    shared_database: Optional[str] = None
+):
     """
-    Extended SFTPSync class that supports private key authentication.
+    Instantiate the DuckDB loader matching the --loader, --chunk-rows, --load-workers
+    and --parquet-cache options.
+
+    DuckDBPipeline loads tables sequentially and always reloads every table; the
+    other loaders load load_workers tables at a time, skip the tables whose inputs
+    did not change (with a state store) and read parsed tables from the Parquet cache.
+
+    With a shared_database (Staging DuckDB file), the tables it holds are copied from
+    it; the 'pipeline' loader is then replaced by StreamingDuckDBLoader, which reads
+    the remaining CSV files through pandas too.
+
+    Only DuckDBPipeline keeps the z<table> history tables: when the profile's dbt
+    project reads them, the other loaders are refused and the 'pipeline' loader does
+    not copy the tables of the shared_database.
+
+    Returns
+    -------
+    DuckDBPipeline | NativeDuckDBLoader | StreamingDuckDBLoader
+        Loader exposing connect / run / is_duckdb_empty / close.
+
+    Raises
+    ------
+    ValueError
+        If the selected loader is not DuckDBPipeline and the dbt project references
+        history tables.
+    """
+    from staging_loader import NativeDuckDBLoader, StreamingDuckDBLoader, history_table_references
+
+    loader_type, chunk_rows, load_workers = options.loader_type, options.chunk_rows, options.load_workers
+    cache = ParquetCache(options.parquet_cache) if options.parquet_cache else None
+
+    if loader_type == "duckdb-native" or chunk_rows or shared_database:
+        references = history_table_references(
+            config["models_directory"], load_table_schemas(config["create_table_directory"])
+        )
+        for table_name, paths in references.items():
+            logger.warning(f"⚠️  {table_name} (DuckDBPipeline history table) is read by {', '.join(paths)}")
+        if references and loader_type == "pipeline" and not chunk_rows:
+            logger.warning("⚠️  Staging tables are not shared: DuckDBPipeline loads every CSV file of the profile")
+            shared_database = None
+        elif references:
+            raise ValueError(
+                f"The dbt project {config['models_directory']} reads history tables only the 'pipeline' "
+                "loader keeps: use --loader pipeline without --chunk-rows"
+            )
 
-    Inherits from pipeline.utils.sftp_sync.SFTPSync and overrides the connect() method
-    to support both password and private key authentication.
+    if loader_type == "duckdb-native":
+        return NativeDuckDBLoader(
+            db_config=db_config, config=config, logger=logger, chunk_rows=chunk_rows, workers=load_workers,
+            state=state, cache=cache, report=report, shared_database=shared_database
+        )
+    if chunk_rows or shared_database:
+        if chunk_rows:
+            logger.info(f"Streaming CSV ingestion by batches of {chunk_rows} rows")
+        return StreamingDuckDBLoader(
+            db_config=db_config, config=config, logger=logger, chunk_rows=chunk_rows, workers=load_workers,
+            state=state, cache=cache, report=report, shared_database=shared_database
+        )
+    if load_workers > 1:
+        logger.warning("⚠️  --load-workers is ignored by the 'pipeline' loader (tables are loaded sequentially)")
+    if cache is not None:
+        logger.warning("⚠️  --parquet-cache is ignored by the 'pipeline' loader (use duckdb-native or --chunk-rows)")
+
+    # DuckDBPipeline converts types through the patched ColumnsManagement, timed per table
+    from pipeline_patches import apply_all_patches, record_conversions
+    from pipeline.database_management.duckdb_pipeline import DuckDBPipeline
+    apply_all_patches()
+    record_conversions(report, load_table_schemas(config["create_table_directory"]))
+    return DuckDBPipeline(db_config=db_config, config=config, logger=logger)
+
+
+def changed_table_signatures(state: LoadStateStore, config: dict) -> Dict[str, dict]:
     """
+    Input signatures of the tables (CSV file + CREATE TABLE file) that changed
+    since their last load.
+    """
+    changed = {}
+    for table_name, schema in load_table_schemas(config["create_table_directory"]).items():
+        csv_path = os.path.join(config["local_directory_input"], f"{table_name}.csv")
+        if os.path.exists(csv_path):
+            signature = state.signature(table_name, csv_path, schema.ddl_path)
+            if not state.is_unchanged(table_name, signature):
+                changed[table_name] = signature
+    return changed
 
-    def __init__(self, output_folder: str, logger: Logger):
-        """Initialize SFTP connection with support for private key."""
-        super().__init__(output_folder, logger)
-        # Load private key path from .env
-        self.private_key_path = os.getenv("SFTP_PRIVATE_KEY_PATH")
-        self.private_key_passphrase = os.getenv("SFTP_PRIVATE_KEY_PASSPHRASE")
-
-    def _load_private_key(self, key_path: str, passphrase: Optional[str] = None):
-        """
-        Load private key from file, trying different key types.
-
-        Parameters
-        ----------
-        key_path : str
-            Path to private key file
-        passphrase : Optional[str]
-            Passphrase for encrypted key (optional)
-
-        Returns
-        -------
-        paramiko.PKey
-            Loaded private key
-        """
-        # Expand user path (~/)
-        key_path = os.path.expanduser(key_path)
-
-        if not os.path.exists(key_path):
-            raise FileNotFoundError(f"Private key file not found: {key_path}")
-
-        # Try different key types
-        key_types = [
-            (RSAKey, "RSA"),
-            (Ed25519Key, "Ed25519"),
-            (ECDSAKey, "ECDSA"),
-        ]
-
-        for key_class, key_name in key_types:
-            try:
-                self.logger.info(f"Trying to load {key_name} private key from {key_path}")
-                if passphrase:
-                    return key_class.from_private_key_file(key_path, password=passphrase)
-                else:
-                    return key_class.from_private_key_file(key_path)
-            except Exception as e:
-                self.logger.debug(f"Failed to load as {key_name}: {e}")
+
+def drop_tables(db_path: str, table_names: List[str]):
+    """Drop tables before DuckDBPipeline reloads them, so a table it fails to load does not keep its old rows."""
+    import duckdb
+
+    if not table_names or not os.path.exists(db_path):
+        return
+    with duckdb.connect(db_path) as conn:
+        for table_name in table_names:
+            conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+
+
+def loaded_table_rows(db_path: str, table_names: List[str], inspections: dict) -> Dict[str, int]:
+    """
+    Rows of the tables DuckDBPipeline actually loaded (after drop_tables): tables it
+    created again, holding rows unless their CSV file has no data row. DuckDBPipeline
+    logs and skips a table that fails to load instead of raising.
+    """
+    import duckdb
+
+    with duckdb.connect(db_path) as conn:
+        existing = {
+            name for (name,) in conn.execute(
+                "SELECT table_name FROM information_schema.tables "
+                "WHERE table_schema = 'main' AND table_catalog = current_database()"
+            ).fetchall()
+        }
+        loaded = {}
+        for table_name in table_names:
+            if table_name not in existing:
                 continue
+            rows = conn.execute(f'SELECT count(*) FROM "{table_name}"').fetchone()[0]
+            inspection = inspections.get(table_name)
+            if rows or (inspection is not None and inspection.rows == 0):
+                loaded[table_name] = rows
+    return loaded
 
-        raise ValueError(f"Could not load private key from {key_path}. Tried RSA, Ed25519, and ECDSA formats.")
 
-    def connect(self):
-        """
-        Initialize SFTP connection using private key (if provided) or password.
+def record_dbt_nodes(report: RunReport, stage: str, result):
+    """Record the execution time (and affected rows) of each dbt node in the run report."""
+    for node_result in getattr(result.result, "results", None) or []:
+        rows = (getattr(node_result, "adapter_response", None) or {}).get("rows_affected") or 0
+        report.add_table(
+            stage,
+            node_result.node.name,
+            Metrics(wall_seconds=node_result.execution_time or 0.0, cpu_seconds=None, rows=max(rows, 0))
+        )
 
-        Priority:
-        1. Private key authentication (if SFTP_PRIVATE_KEY_PATH is set)
-        2. Password authentication (if SFTP_PASSWORD is set)
-        """
-        try:
-            self.transport = Transport((self.host, self.port))
-
-            # Try private key authentication first
-            if self.private_key_path:
-                self.logger.info("Connecting with private key authentication...")
-                try:
-                    private_key = self._load_private_key(
-                        self.private_key_path,
-                        self.private_key_passphrase
-                    )
-                    self.transport.connect(username=self.username, pkey=private_key)
-                    self.sftp = SFTPClient.from_transport(self.transport)
-                    self.logger.info("✅ SFTP connection established with private key")
-                    return
-                except Exception as e:
-                    self.logger.error(f"Private key authentication failed: {e}")
-                    raise
-
-            # Fallback to password authentication
-            elif self.password:
-                self.logger.info("Connecting with password authentication...")
-                self.transport.connect(username=self.username, password=self.password)
-                self.sftp = SFTPClient.from_transport(self.transport)
-                self.logger.info("✅ SFTP connection established with password")
 
-            else:
-                raise ValueError(
-                    "No authentication method available. "
-                    "Please set either SFTP_PRIVATE_KEY_PATH or SFTP_PASSWORD in .env file."
-                )
+def load_db_configs(profile: str, env: str, logger: Logger) -> Tuple[dict, Optional[dict]]:
+    """
+    DuckDB configuration of a profile (its 'local' output, where data is always
+    loaded) and, for another env, the Postgres output to publish to.
+    """
+    from pipeline.utils.load_yml import load_metadata_YAML
+
+    outputs = load_metadata_YAML(PROFILE_YML, profile, logger, ".")["outputs"]
+    return outputs["local"], (outputs[env] if env != "local" else None)
 
+
+def run_dbt_steps(
+    profile: str,
+    config: dict,
+    logger: Logger,
+    state: Optional[LoadStateStore] = None,
+    report: Optional[RunReport] = None,
+    target: str = "local"
+):
+    """
+    Create views and run tests via DBT, in-process, from a single parse of the project,
+    on the given output of the profile ('local' DuckDB or 'anais' Postgres). The
+    packages the project declares are installed first (dbt deps).
+
+    Without a state store, the whole project is run and tested. With one, only the
+    models downstream of the tables reloaded since the last successful dbt run are
+    selected (the whole project if the dbt project files changed), and nothing is
+    run when no table changed.
+    """
+    from dbt_runner import downstream_selectors, has_packages, parse_manifest, run_dbt
+
+    select = None
+    pending = []
+    if state is not None:
+        project_sha256 = dbt_project_sha256(config["models_directory"])
+        pending = state.pending_dbt()
+        if state.dbt_project_changed(project_sha256):
+            logger.info("dbt project files changed since the last run: running every model")
+        elif pending:
+            logger.info(f"Running dbt models downstream of {len(pending)} changed table(s): {', '.join(pending)}")
+            select = downstream_selectors(pending)
+        else:
+            logger.info("⏭️  No table changed since the last dbt run: skipping DBT")
+            return
+
+    report = report or RunReport()
+    # Install the project's packages, which parsing needs
+    if has_packages(config["models_directory"]):
+        with report.stage("dbt_deps"):
+            run_dbt("deps", profile, target, config["models_directory"], ".", logger)
+    # Parse the project once for both commands
+    with report.stage("dbt_parse"):
+        manifest = parse_manifest(profile, target, config["models_directory"], ".", logger)
+    # Create views
+    with report.stage("dbt_run"):
+        result = run_dbt("run", profile, target, config["models_directory"], ".", logger, select, manifest)
+    record_dbt_nodes(report, "dbt_run", result)
+    # Run tests
+    with report.stage("dbt_test"):
+        result = run_dbt("test", profile, target, config["models_directory"], ".", logger, select, manifest)
+    record_dbt_nodes(report, "dbt_test", result)
+
+    if state is not None:
+        state.mark_dbt_done(pending, project_sha256)
+
+
+def log_sftp_failure(logger: Logger, error: Exception):
+    """Log an SFTP download failure with the settings it usually comes from."""
+    logger.error(f"❌ SFTP download failed: {error}")
+    logger.error("Make sure .env file contains SFTP credentials:")
+    logger.error("  Required: SFTP_HOST, SFTP_PORT, SFTP_USERNAME")
+    logger.error("  Authentication: SFTP_PRIVATE_KEY_PATH or SFTP_PASSWORD")
+    logger.error("  Optional: SFTP_PRIVATE_KEY_PASSPHRASE (if key is encrypted)")
+
+
+def record_download(report: RunReport, result):
+    """Record the transfer of one file (its compression figures and encoding) in the run report."""
+    report.add_table(
+        "sftp_download", result.file,
+        Metrics(wall_seconds=result.seconds, cpu_seconds=None, bytes=result.bytes)
+    )
+    if result.encoding is not None:
+        report.add_encoding(result.file, result.encoding.to_dict())
+    if result.compression_ratio:
+        report.add_transfer(result.file, {
+            "remote": result.remote.name,
+            "compression": result.compression,
+            "transferred_bytes": result.bytes,
+            "written_bytes": result.written_bytes,
+            "ratio": round(result.compression_ratio, 2),
+            "saved_bytes": result.saved_bytes,
+        })
+
+
+def download_and_load(
+    loader,
+    config: dict,
+    logger: Logger,
+    sftp_connections: int,
+    full_sync: bool,
+    report: RunReport
+):
+    """
+    Download the SFTP files and load each table as soon as its file is ready.
+
+    A producer thread runs the pooled download and puts the name of each finished
+    file on a bounded queue, from which the loader workers create and fill the
+    tables while the remaining files are still transferring. A failure on either
+    side sets a shared cancel event: the download stops its remaining transfers
+    and the loader starts no new table.
+
+    Raises
+    ------
+    Exception
+        The first failure: the download error if the download failed, the loading
+        error otherwise.
+    """
+    from sftp_download import DownloadCancelled
+    from sftp_sync_with_key import SFTPSyncWithKey
+    from staging_loader import QUEUE_POLL_SECONDS
+
+    ready: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=OVERLAP_QUEUE_SIZE)
+    cancel = threading.Event()
+    download_errors: List[Exception] = []
+
+    def announce(filename: Optional[str]):
+        # Waits while the loader is behind, unless the run is cancelled
+        while not cancel.is_set():
+            try:
+                ready.put(filename, timeout=QUEUE_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def on_downloaded(result):
+        record_download(report, result)
+        announce(result.file)
+
+    def download():
+        try:
+            with report.stage("sftp_download"):
+                sftp = SFTPSyncWithKey(config["local_directory_input"], logger)
+                sftp.download_all_pooled(
+                    config["files_to_download"], sftp_connections, incremental=not full_sync,
+                    on_downloaded=on_downloaded, cancel=cancel
+                )
+        except DownloadCancelled as e:
+            # Cancelled by a loading failure, reported by the loader
+            logger.warning(f"⚠️  {e}")
         except Exception as e:
-            self.logger.error(f"❌ SFTP connection failed: {e}")
+            download_errors.append(e)
+            cancel.set()
+        finally:
+            announce(None)
+
+    producer = threading.Thread(target=download, name="sftp-download", daemon=True)
+    producer.start()
+    try:
+        loader.run_pipelined(ready, cancel)
+    except Exception:
+        cancel.set()
+        if not download_errors:
             raise
+    finally:
+        producer.join()
+
+    if download_errors:
+        log_sftp_failure(logger, download_errors[0])
+        raise download_errors[0]
+
+
+def download_inputs(config: dict, logger: Logger, options: PipelineOptions, report: RunReport):
+    """Step 1: download the SFTP files of the profile before loading them."""
+    from sftp_sync_with_key import SFTPSyncWithKey
+
+    logger.info("=" * 80)
+    logger.info("📥 STEP 1: Downloading files from SFTP...")
+    logger.info("=" * 80)
+    try:
+        sftp = SFTPSyncWithKey(config["local_directory_input"], logger)
+        with report.stage("sftp_download"):
+            results = sftp.download_all_pooled(
+                config["files_to_download"], options.sftp_connections, incremental=not options.full_sync
+            )
+            for result in results:
+                record_download(report, result)
+        logger.info("✅ SFTP download complete - files already renamed to sa_*.csv format!")
+        logger.info("")
+    except Exception as e:
+        log_sftp_failure(logger, e)
+        raise
+
+
+def prepare_inputs(
+    config: dict, db_config: dict, logger: Logger, load_workers: int, report: RunReport
+) -> Tuple[dict, dict]:
+    """
+    Step 1b: UTF-8 view of the inputs next to the database, read by the loaders instead
+    of the input directory, which is left untouched (downloaded files were normalized
+    on download). The encoding, delimiter and rows of each CSV file are then sniffed
+    once through a memory map.
+
+    Returns
+    -------
+    Tuple[dict, Dict[str, FileInspection]]
+        Profile metadata reading the UTF-8 directory, and the inspection of each table's file.
+    """
+    utf8_directory = os.path.join(os.path.dirname(db_config["path"]), UTF8_DIRECTORY)
+    with report.stage("encoding_normalization"):
+        normalize_directory(
+            config["local_directory_input"], utf8_directory, logger,
+            workers=load_workers, report=report, exclude=set(report.encodings)
+        )
+    config = {**config, "local_directory_input": utf8_directory}
+    inspections = inspect_directory(config['local_directory_input'])
+    report.inputs = {table: inspection.to_dict() for table, inspection in inspections.items()}
+    total_mb = sum(inspection.size for inspection in inspections.values()) / 1024 / 1024
+    total_rows = sum(inspection.rows for inspection in inspections.values())
+    logger.info(f"Found {len(inspections)} CSV files ({total_mb:.1f} MB, {total_rows} lines)")
+    for table, inspection in inspections.items():
+        if inspection.encoding not in ("utf-8", "utf-8-sig"):
+            logger.warning(f"⚠️  {table}: {inspection.encoding} encoding detected")
+    logger.info("")
+    return config, inspections
+
+
+def load_tables(
+    loader,
+    config: dict,
+    logger: Logger,
+    options: PipelineOptions,
+    report: RunReport,
+    profiler: Optional[SamplingProfiler],
+    overlapped: bool,
+    has_shared_tables: bool
+) -> Tuple[Metrics, bool]:
+    """
+    Step 3: create the tables and load the CSV data, downloading the files at the
+    same time when overlapped.
+
+    Returns
+    -------
+    Tuple[Metrics, bool]
+        Metrics of the duckdb_load stage, and whether the database is empty afterwards.
+
+    Raises
+    ------
+    FileNotFoundError
+        If there is no CSV file (nor file to download) or no CREATE TABLE file.
+    """
+    loader.connect()
+    try:
+        logger.info("=" * 80)
+        logger.info("📊 STEP 3: Loading CSV data into DuckDB...")
+        logger.info("=" * 80)
+        # Check if we have files (or files to download) and SQL schemas
+        has_inputs = overlapped or has_shared_tables or os.listdir(config["local_directory_input"])
+        if not (has_inputs and os.listdir(config["create_table_directory"])):
+            logger.error(
+                "❌ Cannot populate DuckDB database.\n"
+                f"- Empty directories:\n"
+                f"    > CSV files: {config['local_directory_input']}\n"
+                f"    > SQL schemas: {config['create_table_directory']}"
+            )
+            raise FileNotFoundError("Missing CSV files or SQL schemas")
+        if profiler is not None:
+            profiler.start()
+        try:
+            with report.stage("duckdb_load") as load_metrics:
+                if overlapped:
+                    download_and_load(loader, config, logger, options.sftp_connections, options.full_sync, report)
+                    report.inputs = {table: inspection.to_dict() for table, inspection in loader.inspections.items()}
+                else:
+                    loader.run()
+                load_metrics.rows = report.sum_tables(LOAD_STEPS, "rows")
+                load_metrics.bytes = report.sum_tables(READ_STEPS, "bytes")
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        logger.info("✅ Data loading complete")
+        logger.info("")
+    finally:
+        duckdb_empty = loader.is_duckdb_empty()
+        loader.close()
+    return load_metrics, duckdb_empty
+
+
+def publish_tables(
+    publish_config: dict, db_config: dict, config: dict, logger: Logger, workers: Optional[int], report: RunReport
+):
+    """Step 3b: publish the tables of the DuckDB database to the Postgres output."""
+    from postgres_publish import DEFAULT_PUBLISH_WORKERS, PostgresPublisher
+
+    logger.info("=" * 80)
+    logger.info("🐘 STEP 3b: Publishing tables to Postgres with COPY...")
+    logger.info("=" * 80)
+    publisher = PostgresPublisher(
+        publish_config,
+        db_config["path"],
+        load_table_schemas(config["create_table_directory"]),
+        logger,
+        workers=workers or DEFAULT_PUBLISH_WORKERS,
+        report=report
+    )
+    with report.stage("postgres_publish"):
+        publisher.publish()
+    logger.info("✅ Publish complete")
+    logger.info("")
 
 
 def local_staging_pipeline_with_sftp(
@@ -149,16 +572,29 @@ def local_staging_pipeline_with_sftp(
     config: dict,
     db_config: dict,
     logger: Logger,
-    use_sftp: bool = False
+    options: PipelineOptions = PipelineOptions(),
+    report: Optional[RunReport] = None,
+    profiler: Optional[SamplingProfiler] = None,
+    publish_config: Optional[dict] = None,
+    shared_database: Optional[str] = None
 ):
     """
     Pipeline for Staging in local environment with optional SFTP download.
 
     Steps:
         1. (Optional) Download files from SFTP
+        1b. Transcode the CSV files that are not UTF-8 into a work directory (see encoding_normalization.py)
         2. Connect to DuckDB Staging database
         3. Create tables and inject data
-        4. Create views via DBT
+        3b. (Optional) Publish the tables to Postgres
+        4. Create views via DBT (on Postgres when publishing)
+
+    Unless options.full_load, a state store next to the database (see load_state.py)
+    records the content hash of each CSV file and CREATE TABLE file: unchanged tables
+    are not reloaded, and DBT only rebuilds and tests the models downstream of changed tables.
+
+    With options.overlap (and use_sftp), steps 1 and 3 run together: each table is
+    loaded as soon as its file is downloaded (see download_and_load).
 
     Parameters
     ----------
@@ -170,88 +606,221 @@ def local_staging_pipeline_with_sftp(
         DuckDB configuration parameters (from 'profiles.yml').
     logger : Logger
         Log file.
-    use_sftp : bool
-        If True, download files from SFTP before processing.
+    options : PipelineOptions
+        SFTP, loader and publish options of the run.
+    report : Optional[RunReport]
+        Run report receiving the measurements of each stage and table.
+    profiler : Optional[SamplingProfiler]
+        If set, sampling profiler running while the CSV data is loaded.
+    publish_config : Optional[dict]
+        If set, Postgres output of 'profiles.yml' ('anais') the loaded tables are
+        published to (see postgres_publish.py); DBT then runs on that output.
+    shared_database : Optional[str]
+        If set, DuckDB file of the Staging profile of the same run: the tables it
+        holds are copied from it instead of being loaded from CSV again.
     """
+    from staging_loader import NativeDuckDBLoader
+
+    report = report or RunReport()
+    overlapped = options.use_sftp and options.overlap
+    if overlapped and options.loader_type == "pipeline" and not options.chunk_rows:
+        logger.warning("⚠️  --overlap is ignored by the 'pipeline' loader (use duckdb-native or --chunk-rows)")
+        overlapped = False
+
     # Step 1: SFTP Download (optional)
-    if use_sftp:
+    if overlapped:
         logger.info("=" * 80)
-        logger.info("📥 STEP 1: Downloading files from SFTP...")
+        logger.info("📥 STEP 1: SFTP download overlapped with loading (see step 3)")
         logger.info("=" * 80)
-        try:
-            sftp = SFTPSyncWithKey(config["local_directory_input"], logger)
-            sftp.download_all(config["files_to_download"])
-            logger.info("✅ SFTP download complete - files already renamed to sa_*.csv format!")
-            logger.info("")
-        except Exception as e:
-            logger.error(f"❌ SFTP download failed: {e}")
-            logger.error("Make sure .env file contains SFTP credentials:")
-            logger.error("  Required: SFTP_HOST, SFTP_PORT, SFTP_USERNAME")
-            logger.error("  Authentication: SFTP_PRIVATE_KEY_PATH or SFTP_PASSWORD")
-            logger.error("  Optional: SFTP_PRIVATE_KEY_PASSPHRASE (if key is encrypted)")
-            raise
+    elif options.use_sftp:
+        download_inputs(config, logger, options, report)
     else:
         logger.info("=" * 80)
         logger.info("📂 STEP 1: Using manual CSV files (no SFTP download)")
         logger.info("=" * 80)
         logger.info(f"Looking for files in: {config['local_directory_input']}")
-        csv_count = len([f for f in os.listdir(config['local_directory_input']) if f.endswith('.csv')])
-        logger.info(f"Found {csv_count} CSV files")
-        logger.info("")
+
+    # Step 1b (when overlapped, the files do not exist yet: the loader records them as it reads them)
+    if not overlapped:
+        config, inspections = prepare_inputs(config, db_config, logger, options.load_workers, report)
 
     # Step 2: Initialize DuckDB loader
     logger.info("=" * 80)
     logger.info("🦆 STEP 2: Initializing DuckDB connection...")
     logger.info("=" * 80)
-    loader = DuckDBPipeline(
-        db_config=db_config,
-        config=config,
-        logger=logger
-    )
+    state = None if options.full_load else LoadStateStore.for_database(db_config["path"])
+    loader = build_loader(options, db_config, config, logger, state, report, shared_database)
+
+    # DuckDBPipeline reloads every table: only the changed ones it actually loads are recorded for DBT
+    # (checked once its connection is closed)
+    pipeline_changed = None
+    if state is not None and not overlapped and not isinstance(loader, NativeDuckDBLoader):
+        pipeline_changed = changed_table_signatures(state, config)
+        drop_tables(db_config["path"], list(pipeline_changed))
 
     # Step 3: Load data into DuckDB
-    loader.connect()
-    try:
-        logger.info("=" * 80)
-        logger.info("📊 STEP 3: Loading CSV data into DuckDB...")
-        logger.info("=" * 80)
-        # Check if we have files and SQL schemas
-        if os.listdir(config["local_directory_input"]) and os.listdir(config["create_table_directory"]):
-            loader.run()
-            logger.info("✅ Data loading complete")
-            logger.info("")
-        else:
-            logger.error(
-                "❌ Cannot populate DuckDB database.\n"
-                f"- Empty directories:\n"
-                f"    > CSV files: {config['local_directory_input']}\n"
-                f"    > SQL schemas: {config['create_table_directory']}"
+    load_metrics, duckdb_empty = load_tables(
+        loader, config, logger, options, report, profiler, overlapped, shared_database is not None
+    )
+
+    # DuckDBPipeline does not expose its per-table read and insert: the rows of each table
+    # it loaded are counted in DuckDB (its conversions are timed under type_conversion)
+    if not overlapped and not isinstance(loader, NativeDuckDBLoader):
+        loaded = loaded_table_rows(db_config["path"], sorted(inspections), inspections)
+        for table_name, rows in loaded.items():
+            report.add_table(
+                "pipeline_load", table_name, Metrics(cpu_seconds=None, rows=rows, bytes=inspections[table_name].size)
             )
-            raise FileNotFoundError("Missing CSV files or SQL schemas")
-    finally:
-        duckdb_empty = loader.is_duckdb_empty()
-        loader.close()
+        load_metrics.rows = report.sum_tables(LOAD_STEPS, "rows")
+        load_metrics.bytes = report.sum_tables(READ_STEPS, "bytes")
 
-    # Step 4: Run DBT models (if database is not empty)
-    if not duckdb_empty:
-        logger.info("=" * 80)
-        logger.info("🔄 STEP 4: Running DBT transformations...")
-        logger.info("=" * 80)
-        # Create views
-        dbt_exec("run", profile, "local", config["models_directory"], ".", logger, install_deps=False)
-        # Run tests
-        dbt_exec("test", profile, "local", config["models_directory"], ".", logger)
-        logger.info("")
-        logger.info("=" * 80)
-        logger.info("✅ Pipeline completed successfully!")
-        logger.info("=" * 80)
-    else:
+    if pipeline_changed:
+        for table_name, signature in pipeline_changed.items():
+            if table_name in loaded:
+                state.record(table_name, signature, loaded[table_name])
+            else:
+                logger.warning(f"⚠️  {table_name} was not loaded: it will be reloaded on the next run")
+
+    if duckdb_empty:
         logger.error(f"❌ Database {db_config['path']} is empty")
         raise RuntimeError("DuckDB database is empty after loading")
 
+    # Step 3b: Publish to Postgres (optional)
+    if publish_config is not None:
+        publish_tables(publish_config, db_config, config, logger, options.publish_workers, report)
+
+    # Step 4: Run DBT models
+    logger.info("=" * 80)
+    logger.info("🔄 STEP 4: Running DBT transformations...")
+    logger.info("=" * 80)
+    if publish_config is None:
+        run_dbt_steps(profile, config, logger, state, report)
+    else:
+        # Every table was published again: rebuild the whole project on Postgres
+        run_dbt_steps(profile, config, logger, None, report, target="anais")
+    logger.info("")
+    logger.info("=" * 80)
+    logger.info("✅ Pipeline completed successfully!")
+    logger.info("=" * 80)
+
+
+def run_profile_job(
+    profile: str,
+    env: str,
+    options: PipelineOptions,
+    staging_profiles: List[str],
+    shared_database: Optional[str] = None
+) -> ProfileResult:
+    """
+    Run the pipeline of one profile in a worker process of the orchestrator.
+
+    Only the profiles of staging_profiles download from SFTP: the others read the
+    inputs they staged, copying the tables of shared_database (the Staging DuckDB
+    file) instead of parsing their CSV files again. The profile's run report is
+    written to logs/ as usual.
+    """
+    from pipeline.utils.load_yml import load_metadata_YAML
+    from pipeline.utils.logging_management import setup_logger
+
+    logger = setup_logger(env, f"logs/log_{env}_{profile.lower()}_sftp.log")
+    report = RunReport(options={**asdict(options), "profile": profile})
+    result = ProfileResult(profile, "running")
+    start = time.perf_counter()
+    try:
+        config = load_metadata_YAML(METADATA_YML, profile, logger, ".")
+        db_config, publish_config = load_db_configs(profile, env, logger)
+        local_staging_pipeline_with_sftp(
+            profile=profile,
+            config=config,
+            db_config=db_config,
+            logger=logger,
+            options=replace(options, use_sftp=options.use_sftp and profile in staging_profiles),
+            report=report,
+            publish_config=publish_config,
+            shared_database=None if profile in staging_profiles else shared_database
+        )
+        report.status = result.status = "success"
+    except Exception as e:
+        logger.error(f"❌ {profile} pipeline failed: {e}")
+        report.status = result.status = "failed"
+        report.error = result.error = str(e)
+    finally:
+        result.seconds = round(time.perf_counter() - start, 3)
+        result.report = report.write("logs")
+        result.stages = {stage: round(metrics.wall_seconds, 3) for stage, metrics in report.stages.items()}
+    return result
+
+
+def run_profiles(requested: List[str], env: str, options: PipelineOptions, workers: int, logger: Logger) -> int:
+    """
+    Run several profiles with the orchestrator (Staging first, the others
+    concurrently) and write the combined summary.
+
+    'all' runs every profile declared in both metadata.yml and profiles.yml (the
+    others are listed). A profile requested by name that cannot run fails the
+    command before any work starts.
+
+    Staging loads the shared input tables once: the other profiles copy them from
+    the Staging DuckDB database. Profiles whose env output is the same database
+    never run at the same time.
+
+    Returns
+    -------
+    int
+        0 if every requested profile succeeded, 1 if one of them failed, 2 if a
+        requested profile cannot run.
+    """
+    started_at = datetime.now()
+    if "all" in requested:
+        profiles, missing = resolve_profiles(declared_profiles(PROFILE_YML), env, METADATA_YML, PROFILE_YML)
+        for profile, reason in missing.items():
+            logger.warning(f"⚠️  {profile}: not part of 'all', {reason}")
+    else:
+        profiles, missing = resolve_profiles(requested, env, METADATA_YML, PROFILE_YML)
+        for profile, reason in missing.items():
+            logger.error(f"❌ {profile}: cannot run, {reason}")
+    if not profiles or ("all" not in requested and missing):
+        logger.error("❌ Nothing was run: fix the profile names, metadata.yml or profiles.yml")
+        return 2
+
+    logger.info(f"Profiles: {', '.join(profiles)}")
+    dependencies = profile_dependencies(profiles)
+    # Profiles writing to the same database run one after the other
+    exclusive = shared_database_groups(profiles, env, PROFILE_YML)
+    for group in exclusive:
+        logger.info(f"Same {env} database, run one at a time: {', '.join(group)}")
+    staging_profiles = [profile for profile, parents in dependencies.items() if not parents]
+    shared_database = (
+        load_db_configs(STAGING_PROFILE, env, logger)[0]["path"] if STAGING_PROFILE in staging_profiles else None
+    )
+    orchestrator = ProfileOrchestrator(
+        partial(
+            run_profile_job,
+            env=env,
+            options=options,
+            staging_profiles=staging_profiles,
+            shared_database=shared_database
+        ),
+        dependencies,
+        workers,
+        logger,
+        exclusive=exclusive
+    )
+    results = orchestrator.run()
+
+    logger.info("=" * 80)
+    logger.info(f"📊 Profiles summary: {write_summary(results, 'logs', started_at)}")
+    for profile in profiles:
+        result = results[profile]
+        logger.info(f"   {profile:<22} {result.status:<8} {result.seconds:>8.1f}s" + (f"  {result.error}" if result.error else ""))
+    logger.info("=" * 80)
+    return 0 if all(result.status == "success" for result in results.values()) else 1
+
 
 def main():
     """Main execution function."""
+    load_dotenv()
+
     # Parse command line arguments
     parser = argparse.ArgumentParser(
         description="Local Staging Pipeline with optional SFTP download"
@@ -260,7 +829,7 @@ def main():
         "--env",
         choices=ENV_CHOICE,
         default=ENV_CHOICE[0],
-        help="Execution environment (only 'local' supported)"
+        help="Execution environment: 'local' (DuckDB) or 'anais' (load locally, publish to Postgres)"
     )
     parser.add_argument(
         "--profile",
@@ -268,11 +837,87 @@ def main():
         default=PROFILE_CHOICE[0],
         help="DBT profile to execute"
     )
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=None,
+        metavar="PROFILE",
+        help="Run several profiles of profiles.yml ('all' for every profile also in metadata.yml): "
+             "Staging first, then the others concurrently"
+    )
+    parser.add_argument(
+        "--profile-workers",
+        type=int,
+        default=2,
+        help="With --profiles, maximum number of profiles running at the same time (default: 2)"
+    )
     parser.add_argument(
         "--use-sftp",
         action="store_true",
         help="Download files from SFTP before running pipeline (requires .env with SFTP credentials)"
     )
+    parser.add_argument(
+        "--loader",
+        choices=LOADER_CHOICE,
+        default=LOADER_CHOICE[0],
+        help="CSV loader: 'pipeline' (pandas) or 'duckdb-native' (DuckDB CSV reader, pandas fallback per file)"
+    )
+    parser.add_argument(
+        "--sftp-connections",
+        type=int,
+        default=int(os.getenv("SFTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+        help="Number of parallel SFTP connections for downloads (default: SFTP_MAX_CONNECTIONS or 4)"
+    )
+    parser.add_argument(
+        "--full-sync",
+        action="store_true",
+        help="With --use-sftp, download every file again instead of skipping unchanged ones"
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        nargs="?",
+        const=DEFAULT_CHUNK_ROWS,
+        default=None,
+        metavar="N",
+        help=f"Load CSV files read by pandas by batches of N rows (bounded memory, default N: {DEFAULT_CHUNK_ROWS}); "
+             "slower than whole files, more so below ~10000 rows"
+    )
+    parser.add_argument(
+        "--load-workers",
+        type=int,
+        default=1,
+        help="Number of tables loaded concurrently, largest files first (duckdb-native / --chunk-rows loaders)"
+    )
+    parser.add_argument(
+        "--full-load",
+        action="store_true",
+        help="Reload every table and run every DBT model, even if the input files did not change"
+    )
+    parser.add_argument(
+        "--parquet-cache",
+        nargs="?",
+        const=DEFAULT_CACHE_DIRECTORY,
+        default=None,
+        metavar="DIR",
+        help=f"Cache parsed tables as Parquet files keyed by input hashes (default directory: {DEFAULT_CACHE_DIRECTORY})"
+    )
+    parser.add_argument(
+        "--publish-workers",
+        type=int,
+        help="With --env anais, number of tables published to Postgres concurrently "
+             "(default: DEFAULT_PUBLISH_WORKERS of postgres_publish.py)"
+    )
+    parser.add_argument(
+        "--profile-run",
+        action="store_true",
+        help="Capture a sampling profile of the loader (logs/run_profile_<timestamp>_<profile>_<pid>.folded)"
+    )
+    parser.add_argument(
+        "--overlap",
+        action="store_true",
+        help="With --use-sftp, load each table as soon as its file is downloaded (duckdb-native / --chunk-rows loaders)"
+    )
     args = parser.parse_args()
 
     # Setup configuration
@@ -281,13 +926,27 @@ def main():
         "profile_choice": PROFILE_CHOICE,
         "env": args.env,
         "profile": args.profile,
-        "use_sftp": args.use_sftp
+        "use_sftp": args.use_sftp,
+        "loader": args.loader
     }
 
     # Load logger and config
+    from pipeline.utils.load_yml import load_metadata_YAML
+    from pipeline.utils.logging_management import setup_logger
     logger = setup_logger(args.env, f"logs/log_{args.env}_sftp.log")
+
+    # Several profiles: one orchestrated run with a combined summary
+    if args.profiles:
+        requested = ["all"] if "all" in args.profiles else list(dict.fromkeys(args.profiles))
+        logger.info("=" * 80)
+        logger.info(f"🚀 MULTI-PROFILE RUN: {', '.join(requested)} ({args.profile_workers} at a time)")
+        logger.info("=" * 80)
+        if args.profile_run:
+            logger.warning("⚠️  --profile-run is ignored with --profiles")
+        return run_profiles(requested, args.env, PipelineOptions.from_args(args), args.profile_workers, logger)
+
     config = load_metadata_YAML(METADATA_YML, args.profile, logger, ".")
-    db_config = load_metadata_YAML(PROFILE_YML, args.profile, logger, ".")["outputs"][args.env]
+    db_config, publish_config = load_db_configs(args.profile, args.env, logger)
 
     # Print execution info
     logger.info("=" * 80)
@@ -296,18 +955,46 @@ def main():
     logger.info(f"Environment: {args.env}")
     logger.info(f"Profile: {args.profile}")
     logger.info(f"SFTP Download: {'✅ Enabled' if args.use_sftp else '❌ Disabled (using manual files)'}")
+    if args.use_sftp:
+        logger.info(f"SFTP connections: {args.sftp_connections}")
+        logger.info(f"Overlapped download and load: {'✅ Enabled' if args.overlap else '❌ Disabled'}")
+    logger.info(f"Loader: {args.loader}")
+    if args.parquet_cache:
+        logger.info(f"Parquet cache: {args.parquet_cache}")
+    logger.info(f"Change detection: {'❌ Disabled (full load)' if args.full_load else '✅ Enabled'}")
     logger.info(f"Database: {db_config['path']}")
+    if publish_config is not None:
+        logger.info(f"Publish to: postgres://{publish_config['host']}:{publish_config.get('port', 5432)}/{publish_config['dbname']}")
     logger.info("")
 
-    # Run pipeline
-    local_staging_pipeline_with_sftp(
-        profile=args.profile,
-        config=config,
-        db_config=db_config,
-        logger=logger,
-        use_sftp=args.use_sftp
-    )
+    # Run pipeline (the run report is written even if it fails)
+    report = RunReport(options=vars(args))
+    profiler = SamplingProfiler() if args.profile_run else None
+    try:
+        local_staging_pipeline_with_sftp(
+            profile=args.profile,
+            config=config,
+            db_config=db_config,
+            logger=logger,
+            options=PipelineOptions.from_args(args),
+            report=report,
+            profiler=profiler,
+            publish_config=publish_config
+        )
+        report.status = "success"
+    except Exception as e:
+        report.status = "failed"
+        report.error = str(e)
+        raise
+    finally:
+        logger.info(f"📊 Run report: {report.write('logs')}")
+        for stage, metrics in report.stages.items():
+            logger.info(f"   {stage}: {metrics.wall_seconds:.1f}s wall, {metrics.rows} rows")
+        if profiler is not None:
+            logger.info(f"🔬 Loader profile: {profiler.write('logs', report.started_at, args.profile)} ({profiler.samples} samples)")
+            for function, samples in profiler.top_functions(10):
+                logger.info(f"   {samples:>6}  {function}")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
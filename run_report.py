@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Run Report for ANAIS Staging
+
+This module measures where time and memory go during a pipeline run. For each stage
+(SFTP download, DuckDB load, dbt run, dbt test), and for each table inside a stage
+(CSV parse, type conversion, DuckDB insert...), it records wall time, CPU time, the
+process peak RSS, rows, bytes and rows/s, then writes everything as a JSON file under
+logs/ so runs can be compared over time.
+
+SamplingProfiler periodically samples the stacks of every thread (loader workers
+included) and writes them in the "folded stacks" format read by flamegraph tools.
+
+Usage:
+    report = RunReport(options={"loader": "duckdb-native"})
+    with report.stage("duckdb_load") as stage:
+        with report.table("csv_parse", "sa_sirec") as metrics:
+            metrics.rows = ...
+    report.write("logs")
+"""
+
+# === Packages ===
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# === Constants ===
+REPORT_PREFIX = "run_report"
+PROFILE_PREFIX = "run_profile"
+PROFILE_INTERVAL = 0.005
+PROFILE_TOP_FUNCTIONS = 20
+# Steps whose rows (LOAD_STEPS) and bytes (READ_STEPS) add up to those of the load stage;
+# pipeline_load holds the rows and CSV bytes of each table loaded by DuckDBPipeline
+LOAD_STEPS = ("native_load", "duckdb_insert", "parquet_cache_read", "pipeline_load")
+READ_STEPS = ("native_load", "csv_parse", "parquet_cache_read", "pipeline_load")
+
+
+def run_file_name(prefix: str, started_at: datetime, label: Optional[str] = None, extension: str = "json") -> str:
+    """
+    File name of a run output: <prefix>_<timestamp>[_<label>]_<pid>.<extension>.
+
+    The microseconds and the process id keep the names of concurrent runs (e.g. one
+    worker process per dbt profile) apart.
+    """
+    parts = [prefix, f"{started_at:%Y%m%d_%H%M%S_%f}"]
+    if label:
+        parts.append(label)
+    parts.append(str(os.getpid()))
+    return f"{'_'.join(parts)}.{extension}"
+
+
+def process_peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of the whole process so far, in MB: a high-water mark
+    shared by every thread, not the memory used by the measured block.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class Metrics:
+    """Measurements of a stage, or of a table inside a stage."""
+    wall_seconds: float = 0.0
+    cpu_seconds: Optional[float] = 0.0
+    process_peak_rss_mb: Optional[float] = None
+    rows: int = 0
+    bytes: int = 0
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        return self.rows / self.wall_seconds if self.wall_seconds and self.rows else None
+
+    def add(self, other: "Metrics"):
+        """Accumulate another measurement of the same table (e.g. one more batch)."""
+        self.wall_seconds += other.wall_seconds
+        if self.cpu_seconds is not None and other.cpu_seconds is not None:
+            self.cpu_seconds += other.cpu_seconds
+        else:
+            self.cpu_seconds = None
+        self.process_peak_rss_mb = max(
+            filter(None, (self.process_peak_rss_mb, other.process_peak_rss_mb)), default=None
+        )
+        self.rows += other.rows
+        self.bytes += other.bytes
+
+    def to_dict(self) -> dict:
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3) if self.cpu_seconds is not None else None,
+            "process_peak_rss_mb": round(self.process_peak_rss_mb, 1) if self.process_peak_rss_mb is not None else None,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "rows_per_second": round(self.rows_per_second, 1) if self.rows_per_second else None,
+        }
+
+
+@contextmanager
+def measure(cpu_clock=time.process_time) -> Iterator[Metrics]:
+    """
+    Measure the enclosed block. rows and bytes are left to the caller.
+
+    Use cpu_clock=time.thread_time to measure the CPU time of the current thread only
+    (per-table measurements taken by concurrent workers). process_peak_rss_mb is the
+    process high-water mark when the block ends: concurrent tables share it.
+    """
+    metrics = Metrics()
+    wall_start, cpu_start = time.perf_counter(), cpu_clock()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_seconds = time.perf_counter() - wall_start
+        metrics.cpu_seconds = cpu_clock() - cpu_start
+        metrics.process_peak_rss_mb = process_peak_rss_mb()
+
+
+class RunReport:
+    """
+    Thread-safe collection of stage and per-table measurements of one run.
+    """
+
+    def __init__(self, options: Optional[dict] = None):
+        self.started_at = datetime.now()
+        self.options = options or {}
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.stages: Dict[str, Metrics] = {}
+        self.tables: Dict[str, Dict[str, Metrics]] = {}
+        # Size, rows, encoding and delimiter of each input file (see file_inspection.py)
+        self.inputs: Dict[str, dict] = {}
+        # Values of each table column set to NULL because no date format matched
+        self.coerced: Dict[str, Dict[str, int]] = {}
+        # Compression, transferred and written bytes of each compressed download
+        self.transfers: Dict[str, dict] = {}
+        # Detected encoding of each input file, and whether it was transcoded to UTF-8
+        self.encodings: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Metrics]:
+        """
+        Measure a pipeline stage (process CPU time). When the caller does not set
+        rows and bytes, they are summed from the tables recorded under this stage.
+        """
+        try:
+            with measure() as metrics:
+                yield metrics
+        finally:
+            with self._lock:
+                tables = self.tables.get(name, {}).values()
+                metrics.rows = metrics.rows or sum(table.rows for table in tables)
+                metrics.bytes = metrics.bytes or sum(table.bytes for table in tables)
+                self.stages[name] = metrics
+
+    @contextmanager
+    def table(self, stage: str, table_name: str) -> Iterator[Metrics]:
+        """Measure the work done on a table inside a stage (current thread CPU time)."""
+        with measure(cpu_clock=time.thread_time) as metrics:
+            yield metrics
+        self.add_table(stage, table_name, metrics)
+
+    def add_table(self, stage: str, table_name: str, metrics: Metrics):
+        """Record (or accumulate) a table measurement taken elsewhere."""
+        with self._lock:
+            stage_tables = self.tables.setdefault(stage, {})
+            if table_name in stage_tables:
+                stage_tables[table_name].add(metrics)
+            else:
+                stage_tables[table_name] = metrics
+
+    def add_coerced(self, table_name: str, counts: Dict[str, int]):
+        """Add up the values of a table coerced to NULL during type conversion, by column."""
+        with self._lock:
+            table = self.coerced.setdefault(table_name, {})
+            for column, count in counts.items():
+                table[column] = table.get(column, 0) + count
+
+    def add_transfer(self, file: str, transfer: dict):
+        """Record the compression figures of a downloaded file."""
+        with self._lock:
+            self.transfers[file] = transfer
+
+    def add_encoding(self, file: str, decision: dict):
+        """Record the encoding decision taken for an input file."""
+        with self._lock:
+            self.encodings[file] = decision
+
+    def sum_tables(self, stages: tuple, field: str = "rows") -> int:
+        """Sum a field (rows or bytes) over the tables recorded under the given stages."""
+        with self._lock:
+            return sum(
+                getattr(metrics, field)
+                for stage in stages
+                for metrics in self.tables.get(stage, {}).values()
+            )
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "finished_at": datetime.now().isoformat(timespec="seconds"),
+                "status": self.status,
+                "error": self.error,
+                "options": self.options,
+                "process_peak_rss_mb": process_peak_rss_mb(),
+                "inputs": dict(sorted(self.inputs.items())),
+                "coerced_values": dict(sorted(self.coerced.items())),
+                "compressed_transfers": dict(sorted(self.transfers.items())),
+                "encodings": dict(sorted(self.encodings.items())),
+                "stages": {name: metrics.to_dict() for name, metrics in self.stages.items()},
+                "tables": {
+                    stage: {table: metrics.to_dict() for table, metrics in sorted(tables.items())}
+                    for stage, tables in self.tables.items()
+                },
+            }
+
+    def write(self, directory: str = "logs") -> str:
+        """Write the report as logs/run_report_<timestamp>_<profile>_<pid>.json and return its path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, run_file_name(REPORT_PREFIX, self.started_at, self.options.get("profile")))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
+
+
+class SamplingProfiler:
+    """
+    Sample the Python stacks of every thread at a fixed interval.
+
+    Unlike cProfile, which only sees the thread that enabled it, sampling also covers
+    the loader worker threads, at a low and constant overhead.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top_functions(self, limit: int = PROFILE_TOP_FUNCTIONS) -> list:
+        """Functions with the most samples at the top of the stack (self time)."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
+
+    def write(self, directory: str, started_at: datetime, label: Optional[str] = None) -> str:
+        """Write the folded stacks as logs/run_profile_<timestamp>_<label>_<pid>.folded and return its path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, run_file_name(PROFILE_PREFIX, started_at, label, "folded"))
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
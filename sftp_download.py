@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Pooled SFTP Downloader for ANAIS Staging
+
+This module downloads the files_to_download entries of metadata.yml in parallel over
+a pool of authenticated SFTP connections (one paramiko Transport each). For every
+entry, the newest remote file containing the keyword is fetched and saved under its
+target name (sa_*.csv) in the input directory, as SFTPSync.download_all() does.
+
+The pool only needs a connection factory returning (transport, sftp_client), so it
+can run against any paramiko SFTP server, including a local stand-in.
+
+Remote directories are listed once each (RemoteListingIndex) before any download,
+and missing or ambiguous keyword matches are reported up front.
+
+When a SyncManifest is given, files whose newest remote version was already
+downloaded are skipped, and interrupted transfers (left as <file>.part) resume from
+the last byte received.
+
+When a gzip or zstd variant of the selected file sits next to it (same name plus
+.gz / .zst), the compressed variant is downloaded and decompressed on the fly (see
+transfer_compression.py): the link carries the compressed bytes, the input directory
+receives the plain CSV. Per-file compression ratios and saved bytes are logged.
+
+A downloaded CSV file that is not UTF-8 is transcoded once its .part file is renamed
+(see encoding_normalization.py), so the manifest records the checksum of the UTF-8
+copy, and a .part file left by an interrupted transfer only holds remote bytes.
+
+Each transfer is one pipelined stream: read requests are prefetched ahead of the
+reader (at most max_concurrent_requests in flight) over a channel with a widened
+SSH window, with the sizes read from .env (TransferSettings.from_env). The file is
+written to <file>.part, checked, flushed to disk and only then renamed: its size
+must match the remote size, and a sidecar checksum (<remote file>.sha256), when
+the server provides one, must match the SHA-256 of the received bytes. A truncated
+or corrupted file therefore never reaches the input directory.
+
+download_all() can hand each finished file to a callback (on_downloaded) as soon as
+its transfer completes, and stops early when its cancel event is set: the overlapped
+download-and-load mode of run_local_with_sftp.py loads tables while the remaining
+files are still transferring.
+
+Usage:
+    downloader = PooledSFTPDownloader(sftp.open_connection, "input/staging/", logger, max_connections=4)
+    downloader.download_all(config["files_to_download"])
+"""
+
+# === Packages ===
+import hashlib
+import os
+import re
+import posixpath
+import queue
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from logging import Logger
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from paramiko import SFTPAttributes, SFTPClient, Transport
+
+# === Modules ===
+from encoding_normalization import EncodingDecision, normalize_file, record_decision
+from sftp_manifest import SyncManifest, file_sha256
+from transfer_compression import (
+    compression_of,
+    is_supported,
+    missing_decompressor,
+    open_decompressed,
+    preference,
+    strip_compression,
+)
+
+# === Constants ===
+DEFAULT_MAX_CONNECTIONS = 4
+CHECKSUM_SUFFIX = ".sha256"
+EXCLUDED_EXTENSIONS = (".gpg", CHECKSUM_SUFFIX)
+EXCEL_EXTENSIONS = (".xlsx",)
+PART_SUFFIX = ".part"
+READ_BLOCK_SIZE = 1024 * 1024
+# SSH channel window (paramiko's default of 2 MB stalls long, high-latency transfers)
+DEFAULT_WINDOW_SIZE = 64 * 1024 * 1024
+DEFAULT_MAX_PACKET_SIZE = 32 * 1024
+DEFAULT_MAX_CONCURRENT_REQUESTS = 128
+SHA256_PATTERN = re.compile(r"\b[0-9a-fA-F]{64}\b")
+
+ConnectionFactory = Callable[[], Tuple[Optional["Transport"], "SFTPClient"]]
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+@dataclass(frozen=True)
+class TransferSettings:
+    """SSH channel and read pipelining settings of a transfer, and the checksum policy."""
+    window_size: int = DEFAULT_WINDOW_SIZE
+    max_packet_size: int = DEFAULT_MAX_PACKET_SIZE
+    read_block_size: int = READ_BLOCK_SIZE
+    max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS
+    require_checksum: bool = False
+
+    @classmethod
+    def from_env(cls) -> "TransferSettings":
+        """
+        Settings from SFTP_WINDOW_SIZE, SFTP_MAX_PACKET_SIZE, SFTP_READ_BUFFER_SIZE,
+        SFTP_MAX_CONCURRENT_REQUESTS and SFTP_REQUIRE_CHECKSUM (true / false).
+        """
+        return cls(
+            window_size=_env_int("SFTP_WINDOW_SIZE", DEFAULT_WINDOW_SIZE),
+            max_packet_size=_env_int("SFTP_MAX_PACKET_SIZE", DEFAULT_MAX_PACKET_SIZE),
+            read_block_size=_env_int("SFTP_READ_BUFFER_SIZE", READ_BLOCK_SIZE),
+            max_concurrent_requests=_env_int("SFTP_MAX_CONCURRENT_REQUESTS", DEFAULT_MAX_CONCURRENT_REQUESTS),
+            require_checksum=os.getenv("SFTP_REQUIRE_CHECKSUM", "false").lower() in ("1", "true", "yes"),
+        )
+
+
+@dataclass(frozen=True)
+class RemoteFile:
+    """File found on the SFTP server."""
+    path: str
+    name: str
+    size: int
+    mtime: int
+
+    @property
+    def full_path(self) -> str:
+        return posixpath.join(self.path, self.name)
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of one files_to_download entry."""
+    file: str
+    remote: Optional[RemoteFile] = None
+    bytes: int = 0
+    seconds: float = 0.0
+    skipped: bool = False
+    resumed_from: int = 0
+    error: Optional[str] = None
+    # Compression of the transferred file, and bytes written once decompressed
+    compression: Optional[str] = None
+    written_bytes: int = 0
+    encoding: Optional[EncodingDecision] = None
+
+    @property
+    def throughput(self) -> float:
+        """Throughput in MB/s."""
+        return self.bytes / 1_000_000 / self.seconds if self.seconds else 0.0
+
+    @property
+    def compression_ratio(self) -> Optional[float]:
+        """Written bytes per transferred byte, for a compressed transfer."""
+        return self.written_bytes / self.bytes if self.compression and self.bytes else None
+
+    @property
+    def saved_bytes(self) -> int:
+        """Bytes not transferred thanks to compression."""
+        return max(self.written_bytes - self.bytes, 0) if self.compression else 0
+
+
+class DownloadCancelled(Exception):
+    """Raised in a transfer when the downloader's cancel event is set."""
+
+
+class IntegrityError(Exception):
+    """Raised when a received file does not match the remote size or its sidecar checksum."""
+
+
+class HashingReader:
+    """Readable file counting (and, with a hash object, hashing) the bytes read through it."""
+
+    def __init__(self, fileobj, sha=None):
+        self.fileobj = fileobj
+        self.sha = sha
+        self.bytes = 0
+
+    def read(self, size: int = -1) -> bytes:
+        block = self.fileobj.read(size)
+        if self.sha is not None:
+            self.sha.update(block)
+        self.bytes += len(block)
+        return block
+
+
+def is_candidate(name: str, path: str, keyword: str) -> bool:
+    """
+    Return True if a remote file can be selected for a keyword.
+
+    .gpg files are always excluded, .xlsx files are excluded except for DIAMANT, and
+    compressed files are excluded when their decompressor is not installed.
+    """
+    lower_name = strip_compression(name).lower()
+    if keyword not in name or lower_name.endswith(EXCLUDED_EXTENSIONS) or not is_supported(name):
+        return False
+    if lower_name.endswith(EXCEL_EXTENSIONS) and "DIAMANT" not in path:
+        return False
+    return True
+
+
+class RemoteListingIndex:
+    """
+    Directory listings of the SFTP server, fetched once per distinct remote path.
+
+    Paths are normalized ('/SCN_BDD/SIICEA/' and '/SCN_BDD/SIICEA' share one listing),
+    and every keyword of files_to_download is resolved against the cached listings.
+    """
+
+    def __init__(self):
+        self.listings: Dict[str, List[RemoteFile]] = {}
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        return posixpath.normpath(path)
+
+    def add_listing(self, path: str, attrs: List["SFTPAttributes"]):
+        """Store the files (not directories) of a listdir_attr() result."""
+        path = self.normalize(path)
+        self.listings[path] = [
+            RemoteFile(path=path, name=attr.filename, size=attr.st_size or 0, mtime=attr.st_mtime or 0)
+            for attr in attrs
+            if not stat.S_ISDIR(attr.st_mode or 0)
+        ]
+
+    def build(self, pool: "SFTPConnectionPool", paths: List[str]):
+        """List every distinct path once, in parallel over the connection pool."""
+        def list_path(path: str):
+            with pool.connection() as sftp:
+                return path, sftp.listdir_attr(path)
+
+        distinct_paths = sorted({self.normalize(path) for path in paths} - set(self.listings))
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            for path, attrs in executor.map(list_path, distinct_paths):
+                self.add_listing(path, attrs)
+
+    def candidates(self, path: str, keyword: str) -> List[RemoteFile]:
+        """Files of path that can be selected for keyword."""
+        return [
+            remote for remote in self.listings.get(self.normalize(path), [])
+            if is_candidate(remote.name, remote.path, keyword)
+        ]
+
+    def not_found(self, path: str, keyword: str) -> str:
+        """
+        Why no file of path can be selected for keyword: none matches, or the matching
+        files are only published with a compression whose decompressor is not installed.
+        """
+        message = f"No file containing '{keyword}' in {path}"
+        for remote in self.listings.get(self.normalize(path), []):
+            hint = missing_decompressor(remote.name)
+            if hint and keyword in remote.name:
+                return f"{message}: {remote.name} is compressed and {hint}"
+        return message
+
+    def resolve(self, path: str, keyword: str) -> RemoteFile:
+        """
+        Return the most recent file of path whose name contains keyword, or its
+        compressed variant (same name plus .zst / .gz) when there is one.
+
+        Raises
+        ------
+        FileNotFoundError
+            If no file matches.
+        """
+        candidates = self.candidates(path, keyword)
+        if not candidates:
+            raise FileNotFoundError(self.not_found(path, keyword))
+        latest = strip_compression(max(candidates, key=lambda remote: remote.mtime).name)
+        variants = [remote for remote in candidates if strip_compression(remote.name) == latest]
+        return min(variants, key=lambda remote: (preference(remote.name), -remote.mtime))
+
+    def sidecar(self, remote: RemoteFile) -> Optional[RemoteFile]:
+        """Checksum file published next to a remote file (<name>.sha256), if any."""
+        name = remote.name + CHECKSUM_SUFFIX
+        return next((other for other in self.listings.get(remote.path, []) if other.name == name), None)
+
+    def check(self, files_to_download: List[Dict[str, str]]) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Report keyword matching problems before any download.
+
+        Returns
+        -------
+        Tuple[Dict[str, str], List[str]]
+            Missing entries (target file -> message) and ambiguous entries (a keyword whose
+            candidates also match another keyword of the same directory, or two
+            entries resolving to the same remote file).
+        """
+        missing, ambiguous = {}, []
+        resolved: Dict[str, str] = {}
+        for entry in files_to_download:
+            candidates = self.candidates(entry["path"], entry["keyword"])
+            if not candidates:
+                missing[entry["file"]] = self.not_found(entry["path"], entry["keyword"])
+                continue
+
+            overlapping = sorted({
+                other["keyword"] for other in files_to_download
+                if other is not entry
+                and other["keyword"] not in entry["keyword"]
+                and self.normalize(other["path"]) == self.normalize(entry["path"])
+                and any(other["keyword"] in remote.name for remote in candidates)
+            })
+            if overlapping:
+                ambiguous.append(
+                    f"{entry['file']}: files matching '{entry['keyword']}' also match {', '.join(overlapping)}"
+                )
+
+            latest = self.resolve(entry["path"], entry["keyword"]).full_path
+            if latest in resolved:
+                ambiguous.append(f"{entry['file']}: same remote file as {resolved[latest]} ({latest})")
+            resolved[latest] = entry["file"]
+        return missing, ambiguous
+
+
+class SFTPConnectionPool:
+    """
+    Fixed-size pool of SFTP connections, opened lazily.
+
+    Each connection is used by one thread at a time (acquire / release).
+    """
+
+    def __init__(self, connection_factory: ConnectionFactory, size: int):
+        self.connection_factory = connection_factory
+        self.size = max(1, size)
+        self._idle: "queue.Queue[Tuple[Optional[Transport], SFTPClient]]" = queue.Queue()
+        self._opened: List[Tuple[Optional["Transport"], "SFTPClient"]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """Borrow an SFTP client, opening a new connection if the pool is not full."""
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if len(self._opened) < self.size:
+                    conn = self.connection_factory()
+                    self._opened.append(conn)
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            yield conn[1]
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        """Close every opened connection."""
+        with self._lock:
+            for transport, sftp in self._opened:
+                sftp.close()
+                if transport is not None:
+                    transport.close()
+            self._opened.clear()
+            self._idle = queue.Queue()
+
+
+class PooledSFTPDownloader:
+    """
+    Download files_to_download entries in parallel over a pool of SFTP connections.
+    """
+
+    def __init__(
+        self,
+        connection_factory: ConnectionFactory,
+        output_folder: str,
+        logger: Logger,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        manifest: Optional[SyncManifest] = None,
+        cancel: Optional[threading.Event] = None,
+        settings: Optional[TransferSettings] = None
+    ):
+        self.output_folder = output_folder
+        self.logger = logger
+        self.pool = SFTPConnectionPool(connection_factory, max_connections)
+        self.manifest = manifest
+        self.cancel = cancel
+        self.settings = settings or TransferSettings()
+        self.index = RemoteListingIndex()
+
+    def check_cancelled(self):
+        """
+        Raises
+        ------
+        DownloadCancelled
+            If the cancel event is set.
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            raise DownloadCancelled("download cancelled")
+
+    def expected_sha256(self, sftp: "SFTPClient", remote: RemoteFile) -> Optional[str]:
+        """
+        SHA-256 announced by the sidecar checksum file of a remote file, if any
+        ('<hex digest>  <name>' as written by sha256sum, or the digest alone).
+
+        Raises
+        ------
+        IntegrityError
+            If the sidecar is missing while require_checksum is set, or unreadable.
+        """
+        sidecar = self.index.sidecar(remote)
+        if sidecar is None:
+            if self.settings.require_checksum:
+                raise IntegrityError(f"No checksum file {remote.name}{CHECKSUM_SUFFIX} on the server")
+            return None
+        with sftp.open(sidecar.full_path, "rb") as checksum_file:
+            match = SHA256_PATTERN.search(checksum_file.read(4096).decode("ascii", errors="replace"))
+        if match is None:
+            raise IntegrityError(f"No SHA-256 digest in {sidecar.full_path}")
+        return match.group(0).lower()
+
+    def transfer(
+        self, sftp: "SFTPClient", file: str, remote: RemoteFile, local_path: str
+    ) -> Tuple[int, Optional[EncodingDecision]]:
+        """
+        Copy a remote file to local_path through <local_path>.part, resuming the
+        .part file when the manifest records an interrupted transfer of the same
+        remote version. A compressed file is decompressed while it is read (and
+        its interrupted transfers start over, the .part offset being a plain one).
+
+        The .part file is renamed only once the bytes received add up to the remote
+        size and match the sidecar checksum (if any); otherwise it is deleted. A CSV
+        file is then transcoded to UTF-8 if needed, after the rename: a .part file
+        only ever holds remote bytes, so its size is always a valid resume offset.
+
+        Returns
+        -------
+        Tuple[int, Optional[EncodingDecision]]
+            Offset the transfer resumed from (0 for a full transfer), and the encoding
+            decision taken for a CSV file.
+
+        Raises
+        ------
+        IntegrityError
+            If the received file is truncated or does not match its checksum.
+        """
+        part_path = local_path + PART_SUFFIX
+        compression = compression_of(remote.name)
+        offset = 0
+        if compression is None and self.manifest is not None and self.manifest.can_resume(file, remote, part_path):
+            offset = os.path.getsize(part_path)
+
+        expected_sha256 = self.expected_sha256(sftp, remote)
+        sha = hashlib.sha256()
+        if offset:
+            file_sha256(part_path, sha)
+        if self.manifest is not None:
+            self.manifest.mark_pending(file, remote)
+
+        block_size = self.settings.read_block_size
+        with sftp.open(remote.full_path, "rb", bufsize=block_size) as remote_file, \
+                open(part_path, "ab" if offset else "wb") as local_file:
+            remote_file.seek(offset)
+            remote_file.prefetch(remote.size, max_concurrent_requests=self.settings.max_concurrent_requests)
+            # Compressed bytes are hashed apart from the plain ones written locally
+            received = HashingReader(remote_file, hashlib.sha256() if compression else None)
+            reader = open_decompressed(received, compression) if compression else received
+            for block in iter(lambda: reader.read(block_size), b""):
+                self.check_cancelled()
+                local_file.write(block)
+                sha.update(block)
+            local_file.flush()
+            os.fsync(local_file.fileno())
+
+        try:
+            if offset + received.bytes != remote.size:
+                raise IntegrityError(
+                    f"{remote.name}: received {offset + received.bytes} bytes, {remote.size} expected (truncated transfer)"
+                )
+            # The sidecar describes the remote bytes: the compressed file, or the whole plain file
+            actual_sha256 = received.sha.hexdigest() if compression else sha.hexdigest()
+            if expected_sha256 is not None and actual_sha256 != expected_sha256:
+                raise IntegrityError(f"{remote.name}: SHA-256 {actual_sha256} does not match its checksum file")
+        except IntegrityError:
+            os.remove(part_path)
+            raise
+
+        os.replace(part_path, local_path)
+        # The manifest stays pending until the local copy is UTF-8: an interrupted
+        # transcoding downloads the file again
+        decision = normalize_file(local_path, file) if file.endswith(".csv") else None
+        local_sha256 = decision.sha256 if decision is not None and decision.transcoded else sha.hexdigest()
+        if self.manifest is not None:
+            self.manifest.mark_complete(file, local_path, local_sha256)
+        return offset, decision
+
+    def download_one(self, entry: Dict[str, str]) -> DownloadResult:
+        """Find the newest file matching an entry and download it under its target name."""
+        result = DownloadResult(file=entry["file"])
+        local_path = os.path.join(self.output_folder, entry["file"])
+        start = time.perf_counter()
+        result.remote = self.index.resolve(entry["path"], entry["keyword"])
+        self.check_cancelled()
+        with self.pool.connection() as sftp:
+            if self.manifest is not None and self.manifest.is_up_to_date(entry["file"], result.remote, local_path):
+                result.skipped = True
+                self.logger.info(f"⏭️  {result.remote.name} -> {entry['file']}: unchanged, skipped")
+                return result
+            result.resumed_from, result.encoding = self.transfer(sftp, entry["file"], result.remote, local_path)
+        result.seconds = time.perf_counter() - start
+        result.compression = compression_of(result.remote.name)
+        result.written_bytes = (
+            result.encoding.bytes_in if result.encoding is not None else os.path.getsize(local_path)
+        ) - result.resumed_from
+        result.bytes = result.remote.size if result.compression else result.written_bytes
+        resumed = f" (resumed at {result.resumed_from / 1_000_000:.1f} MB)" if result.resumed_from else ""
+        if result.encoding is not None:
+            record_decision(result.encoding, self.logger)
+        verified = " ✔ checksum" if self.index.sidecar(result.remote) is not None else ""
+        compressed = (
+            f" ({result.compression}, ratio {result.compression_ratio:.1f}x, "
+            f"{result.saved_bytes / 1_000_000:.1f} MB saved)"
+        ) if result.compression_ratio else ""
+        self.logger.info(
+            f"📥 {result.remote.name} -> {entry['file']}: "
+            f"{result.bytes / 1_000_000:.1f} MB in {result.seconds:.1f}s ({result.throughput:.2f} MB/s){resumed}{compressed}{verified}"
+        )
+        return result
+
+    def download_all(
+        self,
+        files_to_download: List[Dict[str, str]],
+        on_downloaded: Optional[Callable[[DownloadResult], None]] = None
+    ) -> List[DownloadResult]:
+        """
+        Download every entry, max_connections at a time.
+
+        on_downloaded, if set, is called with the result of each entry as soon as its
+        file is ready (downloaded or unchanged). With a cancel event, the first failure
+        sets it, and once it is set the pending entries are not started and running
+        transfers stop at their next block.
+
+        Raises
+        ------
+        RuntimeError
+            If at least one entry failed (each failure is logged).
+        DownloadCancelled
+            If no entry failed but some were not downloaded because the cancel event
+            was set by someone else.
+        """
+        os.makedirs(self.output_folder, exist_ok=True)
+        self.logger.info(
+            f"Downloading {len(files_to_download)} files over {self.pool.size} SFTP connection(s)..."
+        )
+        results = []
+        cancelled = []
+        start = time.perf_counter()
+        try:
+            self.index.build(self.pool, [entry["path"] for entry in files_to_download])
+            self.logger.info(f"🔎 Listed {len(self.index.listings)} remote directories")
+            missing, ambiguous = self.index.check(files_to_download)
+            for message in ambiguous:
+                self.logger.warning(f"⚠️  Ambiguous keyword: {message}")
+            for file, message in missing.items():
+                self.logger.error(f"❌ {file}: {message}")
+                results.append(DownloadResult(file=file, error=message))
+            if missing and self.cancel is not None:
+                self.cancel.set()
+
+            with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+                futures = {
+                    executor.submit(self.download_one, entry): entry
+                    for entry in files_to_download
+                    if entry["file"] not in missing
+                }
+                for future in as_completed(futures):
+                    entry = futures[future]
+                    try:
+                        result = future.result()
+                    except DownloadCancelled:
+                        cancelled.append(entry["file"])
+                        continue
+                    except Exception as e:
+                        self.logger.error(f"❌ {entry['file']} ({entry['path']}, '{entry['keyword']}'): {e}")
+                        results.append(DownloadResult(file=entry["file"], error=str(e)))
+                        if self.cancel is not None:
+                            self.cancel.set()
+                        continue
+                    results.append(result)
+                    if on_downloaded is not None:
+                        on_downloaded(result)
+        finally:
+            self.pool.close()
+
+        elapsed = time.perf_counter() - start
+        total_bytes = sum(result.bytes for result in results)
+        skipped = sum(1 for result in results if result.skipped)
+        saved_bytes = sum(result.saved_bytes for result in results)
+        self.logger.info(
+            f"📊 Downloaded {total_bytes / 1_000_000:.1f} MB in {elapsed:.1f}s "
+            f"({total_bytes / 1_000_000 / elapsed if elapsed else 0:.2f} MB/s aggregate), "
+            f"{skipped} unchanged file(s) skipped"
+            + (f", {saved_bytes / 1_000_000:.1f} MB saved by compression" if saved_bytes else "")
+        )
+
+        failures = [result.file for result in results if result.error]
+        if failures:
+            raise RuntimeError(f"{len(failures)} file(s) failed to download: {', '.join(sorted(failures))}")
+        if cancelled:
+            raise DownloadCancelled(f"Download cancelled, {len(cancelled)} file(s) not downloaded: {', '.join(sorted(cancelled))}")
+        return results
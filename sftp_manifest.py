@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+SFTP Sync Manifest for ANAIS Staging
+
+This module keeps a JSON manifest next to the input directory (e.g.
+input/staging_sftp_manifest.json) recording, for each files_to_download entry,
+the remote file that was downloaded (name, size, mtime) and the SHA-256 of the
+local copy. It lets the downloader skip files that did not change on the SFTP
+server and resume interrupted transfers of the same remote version.
+
+Usage:
+    manifest = SyncManifest.for_directory("input/staging/")
+    if manifest.is_up_to_date("sa_sirec.csv", remote, "input/staging/sa_sirec.csv"):
+        ...
+"""
+
+# === Packages ===
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from sftp_download import RemoteFile
+
+# === Constants ===
+MANIFEST_SUFFIX = "_sftp_manifest.json"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str, sha=None) -> str:
+    """Return the SHA-256 of a file (optionally continuing an existing hash object)."""
+    sha = sha or hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    """Remote version and local checksum of one downloaded file."""
+    remote_path: str
+    remote_name: str
+    size: int
+    mtime: int
+    sha256: Optional[str] = None
+    local_mtime_ns: Optional[int] = None
+    # Size of the local copy, when it differs from the remote size (decompressed file)
+    local_size: Optional[int] = None
+    complete: bool = False
+    synced_at: Optional[str] = None
+
+    def same_remote(self, remote: "RemoteFile") -> bool:
+        """Return True if the entry describes the given remote file version."""
+        return (self.remote_path, self.remote_name, self.size, self.mtime) == \
+            (remote.path, remote.name, remote.size, remote.mtime)
+
+
+class SyncManifest:
+    """
+    Thread-safe JSON manifest of the files downloaded from the SFTP server.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, ManifestEntry] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = {
+                    file: ManifestEntry(**entry) for file, entry in json.load(f).get("files", {}).items()
+                }
+
+    @classmethod
+    def for_directory(cls, output_folder: str) -> "SyncManifest":
+        """Manifest stored next to output_folder: input/staging/ -> input/staging_sftp_manifest.json."""
+        folder = os.path.normpath(output_folder)
+        return cls(os.path.join(os.path.dirname(folder), os.path.basename(folder) + MANIFEST_SUFFIX))
+
+    def get(self, file: str) -> Optional[ManifestEntry]:
+        return self.entries.get(file)
+
+    def is_up_to_date(self, file: str, remote: "RemoteFile", local_path: str) -> bool:
+        """
+        Return True if local_path is a complete copy of the given remote file version.
+
+        The local checksum is recomputed only when the local file was modified since
+        the manifest was written.
+        """
+        entry = self.get(file)
+        if entry is None or not entry.complete or not entry.same_remote(remote):
+            return False
+        expected_size = entry.local_size if entry.local_size is not None else remote.size
+        if not os.path.exists(local_path) or os.path.getsize(local_path) != expected_size:
+            return False
+        if os.stat(local_path).st_mtime_ns == entry.local_mtime_ns:
+            return True
+        return file_sha256(local_path) == entry.sha256
+
+    def mark_pending(self, file: str, remote: "RemoteFile"):
+        """Record the remote version of a transfer in progress (so it can be resumed)."""
+        entry = self.get(file)
+        if entry is None or entry.complete or not entry.same_remote(remote):
+            self._set(file, ManifestEntry(remote.path, remote.name, remote.size, remote.mtime))
+
+    def can_resume(self, file: str, remote: "RemoteFile", part_path: str) -> bool:
+        """
+        Return True if an interrupted transfer of the same remote version is recorded
+        and its .part file can be resumed: it holds remote bytes only (files are
+        transcoded after the .part file is renamed), so it cannot exceed the remote size.
+        """
+        entry = self.get(file)
+        return (
+            entry is not None and not entry.complete and entry.same_remote(remote)
+            and os.path.exists(part_path) and os.path.getsize(part_path) <= remote.size
+        )
+
+    def mark_complete(self, file: str, local_path: str, sha256: str):
+        """Record a finished transfer with the checksum of the local copy."""
+        entry = self.get(file)
+        local_stat = os.stat(local_path)
+        entry.sha256 = sha256
+        entry.local_mtime_ns = local_stat.st_mtime_ns
+        entry.local_size = local_stat.st_size
+        entry.complete = True
+        entry.synced_at = datetime.now().isoformat(timespec="seconds")
+        self._set(file, entry)
+
+    def _set(self, file: str, entry: ManifestEntry):
+        """Update an entry and write the manifest atomically."""
+        with self._lock:
+            self.entries[file] = entry
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"files": {name: asdict(e) for name, e in sorted(self.entries.items())}}, f, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+SFTP Synchronization with Private Key Support
+
+SFTPSyncWithKey extends pipeline.utils.sftp_sync.SFTPSync with private key
+authentication (RSA, Ed25519 or ECDSA, from SFTP_PRIVATE_KEY_PATH) and parallel
+downloads over a pool of connections (see sftp_download.py). Connections use the
+SSH window and packet sizes of TransferSettings (SFTP_WINDOW_SIZE, SFTP_MAX_PACKET_SIZE).
+
+It is only imported by run_local_with_sftp.py when --use-sftp is set, so runs on
+manual files do not load paramiko nor the pipeline SFTP module.
+
+Usage:
+    sftp = SFTPSyncWithKey("input/staging/", logger)
+    results = sftp.download_all_pooled(config["files_to_download"], max_connections=4)
+"""
+
+# === Packages ===
+import os
+import threading
+from logging import Logger
+from typing import Callable, Dict, List, Optional, Tuple
+
+from paramiko import Transport, SFTPClient, RSAKey, Ed25519Key, ECDSAKey
+
+# === Modules ===
+from pipeline.utils.sftp_sync import SFTPSync
+from sftp_download import DownloadResult, PooledSFTPDownloader, TransferSettings
+from sftp_manifest import SyncManifest
+
+
+class SFTPSyncWithKey(SFTPSync):
+    """
+    Extended SFTPSync class that supports private key authentication.
+
+    Inherits from pipeline.utils.sftp_sync.SFTPSync and overrides the connect() method
+    to support both password and private key authentication.
+    """
+
+    def __init__(self, output_folder: str, logger: Logger):
+        """Initialize SFTP connection with support for private key."""
+        super().__init__(output_folder, logger)
+        # Load private key path from .env
+        self.private_key_path = os.getenv("SFTP_PRIVATE_KEY_PATH")
+        self.private_key_passphrase = os.getenv("SFTP_PRIVATE_KEY_PASSPHRASE")
+        self._private_key = None
+        # Window, packet, buffer and read pipelining sizes from .env
+        self.transfer_settings = TransferSettings.from_env()
+
+    def _load_private_key(self, key_path: str, passphrase: Optional[str] = None):
+        """
+        Load private key from file, trying different key types.
+
+        Parameters
+        ----------
+        key_path : str
+            Path to private key file
+        passphrase : Optional[str]
+            Passphrase for encrypted key (optional)
+
+        Returns
+        -------
+        paramiko.PKey
+            Loaded private key
+        """
+        # Expand user path (~/)
+        key_path = os.path.expanduser(key_path)
+
+        if not os.path.exists(key_path):
+            raise FileNotFoundError(f"Private key file not found: {key_path}")
+
+        # Try different key types
+        key_types = [
+            (RSAKey, "RSA"),
+            (Ed25519Key, "Ed25519"),
+            (ECDSAKey, "ECDSA"),
+        ]
+
+        for key_class, key_name in key_types:
+            try:
+                self.logger.info(f"Trying to load {key_name} private key from {key_path}")
+                if passphrase:
+                    return key_class.from_private_key_file(key_path, password=passphrase)
+                else:
+                    return key_class.from_private_key_file(key_path)
+            except Exception as e:
+                self.logger.debug(f"Failed to load as {key_name}: {e}")
+                continue
+
+        raise ValueError(f"Could not load private key from {key_path}. Tried RSA, Ed25519, and ECDSA formats.")
+
+    def open_connection(self) -> Tuple[Transport, SFTPClient]:
+        """
+        Open a new authenticated SFTP connection using private key (if provided) or password.
+
+        Priority:
+        1. Private key authentication (if SFTP_PRIVATE_KEY_PATH is set)
+        2. Password authentication (if SFTP_PASSWORD is set)
+
+        Returns
+        -------
+        Tuple[Transport, SFTPClient]
+            Authenticated transport and its SFTP client.
+        """
+        transport = Transport(
+            (self.host, self.port),
+            default_window_size=self.transfer_settings.window_size,
+            default_max_packet_size=self.transfer_settings.max_packet_size
+        )
+        try:
+            # Try private key authentication first
+            if self.private_key_path:
+                self.logger.info("Connecting with private key authentication...")
+                try:
+                    if self._private_key is None:
+                        self._private_key = self._load_private_key(
+                            self.private_key_path,
+                            self.private_key_passphrase
+                        )
+                    transport.connect(username=self.username, pkey=self._private_key)
+                    self.logger.info("✅ SFTP connection established with private key")
+                except Exception as e:
+                    self.logger.error(f"Private key authentication failed: {e}")
+                    raise
+
+            # Fallback to password authentication
+            elif self.password:
+                self.logger.info("Connecting with password authentication...")
+                transport.connect(username=self.username, password=self.password)
+                self.logger.info("✅ SFTP connection established with password")
+
+            else:
+                raise ValueError(
+                    "No authentication method available. "
+                    "Please set either SFTP_PRIVATE_KEY_PATH or SFTP_PASSWORD in .env file."
+                )
+
+            return transport, SFTPClient.from_transport(transport)
+
+        except Exception:
+            transport.close()
+            raise
+
+    def connect(self):
+        """Initialize the SFTP connection used by SFTPSync methods."""
+        try:
+            self.transport, self.sftp = self.open_connection()
+        except Exception as e:
+            self.logger.error(f"❌ SFTP connection failed: {e}")
+            raise
+
+    def download_all_pooled(
+        self,
+        files_to_download: List[Dict[str, str]],
+        max_connections: int,
+        incremental: bool = True,
+        on_downloaded: Optional[Callable[[DownloadResult], None]] = None,
+        cancel: Optional[threading.Event] = None
+    ):
+        """
+        Download every files_to_download entry in parallel over max_connections connections.
+
+        Files keep their target name (sa_*.csv) as with download_all(). When incremental,
+        files unchanged since the last sync (see sftp_manifest.py) are skipped and
+        interrupted transfers are resumed. on_downloaded receives each file as soon as
+        it is ready, and setting cancel stops the remaining transfers.
+        """
+        downloader = PooledSFTPDownloader(
+            self.open_connection,
+            self.output_folder,
+            self.logger,
+            max_connections=max_connections,
+            manifest=SyncManifest.for_directory(self.output_folder) if incremental else None,
+            cancel=cancel,
+            settings=self.transfer_settings
+        )
+        return downloader.download_all(files_to_download, on_downloaded)
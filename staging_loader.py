@@ -0,0 +1,719 @@
+#!/usr/bin/env python3
+"""
+Native DuckDB Loader for ANAIS Staging
+
+This module loads the CSV files of input/staging/ into DuckDB without going through
+pandas: each table is created from its CREATE TABLE file, then filled with DuckDB's
+own parallel CSV reader (read_csv). Type conversion follows the rules of the patched
+ColumnsManagement.convert_columns_type (see type_conversion.py), expressed in SQL.
+
+A file falls back to the pandas path (read_csv + conversion plan) only when the
+native reader rejects it (malformed rows, unexpected encoding, invalid numbers...).
+
+Tables are independent: with workers > 1 they are loaded concurrently (largest
+files first), each worker writing through its own DuckDB cursor.
+
+With a LoadStateStore (see load_state.py), tables whose CSV and CREATE TABLE files
+did not change since their last load are kept as they are instead of being reloaded.
+With a ParquetCache (see parquet_cache.py), each loaded table is also saved as a
+compressed Parquet file keyed by the same hashes, and later rebuilds from the same
+inputs read it back instead of parsing the CSV again.
+
+With a RunReport (see run_report.py), the time, CPU, memory and rows of each table
+are recorded per step: native load, CSV parse, type conversion, DuckDB insert and
+Parquet cache read.
+
+StreamingDuckDBLoader always uses the pandas path, reading, converting and appending
+fixed-size row batches (chunk_rows) so memory stays constant whatever the file size.
+
+run_pipelined() loads each table as soon as its file is announced on a queue (by
+the SFTP download, see run_local_with_sftp.py), so loading overlaps the transfers.
+
+On the pandas path, values are read as Arrow-backed strings when pyarrow is installed,
+and converted frames are registered in DuckDB as Arrow tables (no insert copy).
+
+With a shared_database (the Staging DuckDB file of the same run, see
+run_local_with_sftp.run_profiles), the tables already loaded there are attached
+read-only and copied into the profile's database instead of parsing their CSV files
+again; only the tables Staging does not hold are read from CSV.
+
+Unlike DuckDBPipeline, these loaders do not keep the z<table> history tables next
+to the staging tables: history_table_references() finds the dbt files that read
+them, so such profiles are refused (see run_local_with_sftp.build_loader).
+
+Usage:
+    loader = NativeDuckDBLoader(db_config=db_config, config=config, logger=logger)
+    loader.connect()
+    loader.run()
+    loader.close()
+"""
+
+# === Packages ===
+import hashlib
+import os
+import queue
+import re
+import threading
+from contextlib import nullcontext
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from logging import Logger
+from typing import Dict, Iterator, List, Optional
+
+import duckdb
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: frames are registered as pandas DataFrames
+    pa = None
+
+# === Modules ===
+from ddl_schema import ColumnDef, TableSchema, load_table_schemas
+from encoding_normalization import LATIN1_FALLBACK
+from file_inspection import FALLBACK_ENCODING, FileInspection, inspect_file
+from load_state import LoadStateStore, input_signature
+from parquet_cache import ParquetCache
+from run_report import Metrics, RunReport
+from type_conversion import BOOL_MAP, DATE_FORMATS, STRING_DTYPE, ConversionPlan, compile_plan
+
+# === Constants ===
+NATIVE_ENCODINGS = ("utf-8", "utf-8-sig")
+QUEUE_POLL_SECONDS = 0.5
+# Decoding error handler of each encoding read by pandas (UTF-8 stays strict)
+ENCODING_ERRORS = {FALLBACK_ENCODING: LATIN1_FALLBACK}
+SHARED_CATALOG = "shared_inputs"
+TRUE_VALUES = sorted(str(value) for value, flag in BOOL_MAP.items() if flag and isinstance(value, str))
+FALSE_VALUES = sorted(str(value) for value, flag in BOOL_MAP.items() if not flag and isinstance(value, str))
+# DuckDBPipeline keeps the previous rows of each staging table in z<table>
+HISTORY_PREFIX = "z"
+DBT_FILE_EXTENSIONS = (".sql", ".yml", ".yaml")
+DBT_SKIPPED_DIRECTORIES = {"target", "dbt_packages", "logs"}
+
+
+def _quote(identifier: str) -> str:
+    """Quote a SQL identifier."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _sql_literal(value: str) -> str:
+    """Quote a SQL string literal."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def history_table_references(models_directory: str, table_names) -> Dict[str, List[str]]:
+    """
+    Find the files of a dbt project that reference the history tables of
+    DuckDBPipeline (z<table>), which NativeDuckDBLoader does not create.
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        History table -> paths (relative to models_directory) of the files referencing it.
+    """
+    names = sorted((HISTORY_PREFIX + name for name in table_names), key=len, reverse=True)
+    if not names or not os.path.isdir(models_directory):
+        return {}
+    pattern = re.compile(r"\b(" + "|".join(re.escape(name) for name in names) + r")\b", re.IGNORECASE)
+    references: Dict[str, List[str]] = {}
+    for root, directories, files in os.walk(models_directory):
+        directories[:] = sorted(d for d in directories if d not in DBT_SKIPPED_DIRECTORIES)
+        for file in sorted(files):
+            if not file.endswith(DBT_FILE_EXTENSIONS):
+                continue
+            path = os.path.join(root, file)
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                found = {match.lower() for match in pattern.findall(f.read())}
+            for name in found:
+                references.setdefault(name, []).append(os.path.relpath(path, models_directory))
+    return dict(sorted(references.items()))
+
+
+def select_expression(column: ColumnDef, source: str) -> str:
+    """
+    SQL expression converting a VARCHAR CSV field to the column type.
+
+    Same rules as type_conversion.ConversionPlan:
+        - int / float : NULL, '' and 'nan' become 0 (int values are truncated)
+        - bool        : BOOL_MAP values, NULL and unmapped values become false
+        - datetime64  : the column's date formats, tried in order, invalid values become NULL
+        - string      : NULL becomes '', values are truncated to VARCHAR(n)
+    """
+    field = _quote(source)
+    if column.target in ("int", "float"):
+        number = f"CAST(COALESCE(NULLIF(NULLIF(TRIM({field}), ''), 'nan'), '0') AS DOUBLE)"
+        return f"TRUNC({number})" if column.target == "int" else number
+    if column.target == "bool":
+        true_values = ", ".join(_sql_literal(value) for value in TRUE_VALUES)
+        return f"COALESCE({field} IN ({true_values}), false)"
+    if column.target == "datetime64":
+        formats = ", ".join(_sql_literal(date_format) for date_format in column.formats or DATE_FORMATS)
+        return f"TRY_STRPTIME({field}, [{formats}])"
+    if column.length is not None:
+        return f"LEFT(COALESCE({field}, ''), {column.length})"
+    return f"COALESCE({field}, '')"
+
+
+class NativeDuckDBLoader:
+    """
+    Load staging CSV files into DuckDB with DuckDB's own CSV reader.
+
+    Exposes the same interface as pipeline.database_management.duckdb_pipeline.DuckDBPipeline
+    (connect / run / is_duckdb_empty / close) so both loaders are interchangeable.
+    """
+
+    def __init__(
+        self,
+        db_config: dict,
+        config: dict,
+        logger: Logger,
+        chunk_rows: Optional[int] = None,
+        workers: int = 1,
+        state: Optional[LoadStateStore] = None,
+        cache: Optional[ParquetCache] = None,
+        report: Optional[RunReport] = None,
+        shared_database: Optional[str] = None
+    ):
+        self.db_path = db_config["path"]
+        self.input_directory = config["local_directory_input"]
+        self.create_table_directory = config["create_table_directory"]
+        self.logger = logger
+        self.chunk_rows = chunk_rows
+        self.workers = max(1, workers)
+        self.state = state
+        self.cache = cache
+        self.report = report
+        self.shared_database = shared_database
+        # Load state of the shared database, and columns of each of its tables
+        self.shared_state: Optional[LoadStateStore] = None
+        self.shared_tables: Dict[str, List[str]] = {}
+        self.skipped_tables: List[str] = []
+        # Format of each CSV file read, by table
+        self.inspections: Dict[str, FileInspection] = {}
+        self._local = threading.local()
+        self._ddl_lock = threading.Lock()
+        self.conn: Optional[duckdb.DuckDBPyConnection] = None
+        self.schemas: Dict[str, TableSchema] = {}
+
+    def connect(self):
+        """Open (and create if needed) the DuckDB database."""
+        db_directory = os.path.dirname(self.db_path)
+        if db_directory:
+            os.makedirs(db_directory, exist_ok=True)
+        self.conn = duckdb.connect(self.db_path)
+        self.logger.info(f"✅ Connected to DuckDB: {self.db_path}")
+        if self.shared_database is not None:
+            self.conn.execute(f"ATTACH {_sql_literal(self.shared_database)} AS {SHARED_CATALOG} (READ_ONLY)")
+            self.shared_state = LoadStateStore.for_database(self.shared_database)
+            self.logger.info(f"✅ Attached Staging tables (read-only): {self.shared_database}")
+
+    @property
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        """DuckDB cursor of the current thread (each loader worker writes through its own)."""
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self.conn.cursor()
+        return cursor
+
+    def close(self):
+        """Close the DuckDB connection."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def is_duckdb_empty(self) -> bool:
+        """Return True if the database has no table."""
+        tables = self.conn.execute(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_catalog = current_database() AND table_schema = 'main'"
+        ).fetchone()[0]
+        return tables == 0
+
+    def measure(self, step: str, table_name: str):
+        """Context manager measuring a loading step of a table in the run report (if any)."""
+        return self.report.table(step, table_name) if self.report is not None else nullcontext(Metrics())
+
+    def table_exists(self, table_name: str) -> bool:
+        """Return True if the table exists in the database."""
+        return self.cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_catalog = current_database() AND table_schema = 'main' AND table_name = ?",
+            [table_name]
+        ).fetchone()[0] > 0
+
+    def list_shared_tables(self) -> Dict[str, List[str]]:
+        """Columns of each table of the shared database, in column order."""
+        rows = self.cursor.execute(
+            "SELECT table_name, column_name FROM duckdb_columns() "
+            "WHERE database_name = ? AND schema_name = 'main' ORDER BY table_name, column_index",
+            [SHARED_CATALOG]
+        ).fetchall()
+        tables: Dict[str, List[str]] = {}
+        for table_name, column_name in rows:
+            tables.setdefault(table_name, []).append(column_name)
+        return tables
+
+    def list_tables_to_load(self) -> List[str]:
+        """
+        Tables having a CREATE TABLE file and either a CSV file or a table in the
+        shared database, largest CSV file first.
+        """
+        csv_sizes = {
+            os.path.splitext(filename)[0]: os.path.getsize(os.path.join(self.input_directory, filename))
+            for filename in os.listdir(self.input_directory)
+            if filename.endswith(".csv")
+        }
+        if self.shared_database is not None:
+            self.shared_tables = self.list_shared_tables()
+        return sorted(
+            (set(csv_sizes) | set(self.shared_tables)) & set(self.schemas),
+            key=lambda table: (-csv_sizes.get(table, 0), table)
+        )
+
+    def inspect(self, table_name: str) -> FileInspection:
+        """
+        Sniff the format (encoding, delimiter, header) of a table's CSV file, and warn
+        about the table columns its header does not hold (they are left NULL).
+        """
+        inspection = self.inspections[table_name] = inspect_file(
+            os.path.join(self.input_directory, f"{table_name}.csv"), table_name
+        )
+        csv_column_set = set(inspection.columns)
+        missing = [name for name in self.schemas[table_name].column_names if name not in csv_column_set]
+        if missing and csv_column_set:
+            self.logger.warning(
+                f"⚠️  {table_name}: {len(missing)} column(s) not found in the CSV header, left NULL: "
+                f"{', '.join(missing)}"
+            )
+        return inspection
+
+    def create_table(self, schema: TableSchema):
+        """Drop and recreate a table from its CREATE TABLE file."""
+        with self._ddl_lock:
+            self.cursor.execute(f"DROP TABLE IF EXISTS {_quote(schema.name)}")
+            self.cursor.execute(schema.ddl)
+
+    def load_native(self, schema: TableSchema, inspection: FileInspection) -> int:
+        """
+        Fill a table with DuckDB's CSV reader.
+
+        Raises
+        ------
+        duckdb.Error
+            If the reader rejects the file or a value cannot be converted.
+        ValueError
+            If the file is not UTF-8 or no header column belongs to the table.
+        """
+        if inspection.encoding not in NATIVE_ENCODINGS:
+            raise ValueError(f"{inspection.encoding} file, the native reader only reads UTF-8")
+        csv_path, delimiter = inspection.path, inspection.delimiter
+        csv_columns = inspection.columns
+        csv_column_set = set(csv_columns)
+        columns = [column for column in schema.columns if column.name in csv_column_set]
+        if not columns:
+            raise ValueError(f"No column of {schema.name} found in {csv_path} header")
+
+        names = ", ".join(_sql_literal(name) for name in csv_columns)
+        target = ", ".join(_quote(column.name) for column in columns)
+        select = ", ".join(select_expression(column, column.name) for column in columns)
+        source = (
+            f"read_csv({_sql_literal(csv_path)}, "
+            f"delim = {_sql_literal(delimiter)}, header = true, all_varchar = true, "
+            f"names = [{names}], quote = '\"', escape = '\"')"
+        )
+        rows = self.cursor.execute(
+            f"INSERT INTO {_quote(schema.name)} ({target}) SELECT {select} FROM {source}"
+        ).fetchone()[0]
+        self.count_coerced_values(schema, columns, source)
+        return rows
+
+    def count_coerced_values(self, schema: TableSchema, columns: List[ColumnDef], source: str):
+        """
+        Count, per date or bool column, the non-empty values select_expression
+        coerced (dates matching none of the column's formats, set to NULL; values
+        BOOL_MAP does not map, set to false), and log and record them as the pandas
+        conversion plan does (one projected scan of those columns).
+        """
+        checked = [column for column in columns if column.target in ("datetime64", "bool")]
+        if not checked:
+            return
+        mapped_values = ", ".join(_sql_literal(value) for value in TRUE_VALUES + FALSE_VALUES)
+        counts = []
+        for column in checked:
+            field = _quote(column.name)
+            if column.target == "datetime64":
+                coerced_filter = f"TRIM({field}) <> '' AND {select_expression(column, column.name)} IS NULL"
+            else:
+                coerced_filter = f"{field} NOT IN ({mapped_values})"
+            counts.append(f"count(*) FILTER (WHERE {coerced_filter})")
+        row = self.cursor.execute(f"SELECT {', '.join(counts)} FROM {source}").fetchone()
+        coerced = {column.name: count for column, count in zip(checked, row) if count}
+        for column in checked:
+            if column.name not in coerced:
+                continue
+            if column.target == "datetime64":
+                self.logger.warning(
+                    f"⚠️  {schema.name}.{column.name}: {coerced[column.name]} value(s) matching none of the date "
+                    f"formats {list(column.formats or DATE_FORMATS)} were set to NULL"
+                )
+            else:
+                self.logger.warning(
+                    f"⚠️  {schema.name}.{column.name}: {coerced[column.name]} unmapped boolean value(s) were set to false"
+                )
+        if coerced and self.report is not None:
+            self.report.add_coerced(schema.name, coerced)
+
+    def iter_csv_batches(self, inspection: FileInspection) -> Iterator[pd.DataFrame]:
+        """
+        Read a CSV file with pandas, as a single DataFrame or as batches of
+        chunk_rows rows, with normalized column names and every value as string.
+        """
+        csv_columns = inspection.columns
+        reader = pd.read_csv(
+            inspection.path,
+            sep=inspection.delimiter,
+            dtype=STRING_DTYPE,
+            encoding=inspection.encoding,
+            encoding_errors=ENCODING_ERRORS.get(inspection.encoding, "strict"),
+            engine="python" if len(inspection.delimiter.encode("utf-8")) > 1 else "c",
+            on_bad_lines="warn",
+            chunksize=self.chunk_rows,
+        )
+        batches = reader if self.chunk_rows else [reader]
+        for df in batches:
+            df.columns = csv_columns[:len(df.columns)]
+            yield df
+
+    def insert_frame(self, schema: TableSchema, plan: ConversionPlan, df: pd.DataFrame) -> int:
+        """Convert a DataFrame with the table conversion plan and append it to the table."""
+        columns = [name for name in schema.column_names if name in df.columns]
+        with self.measure("type_conversion", schema.name) as metrics:
+            coerced = {}
+            plan.apply(df, coerced)
+            metrics.rows = len(df)
+        if coerced and self.report is not None:
+            self.report.add_coerced(schema.name, coerced)
+
+        frame_name = f"csv_frame_{schema.name}"
+        with self.measure("duckdb_insert", schema.name) as metrics:
+            # Arrow-backed columns are handed over without copy; DuckDB scans the Arrow table
+            frame = pa.Table.from_pandas(df[columns], preserve_index=False) if pa is not None else df
+            self.cursor.register(frame_name, frame)
+            try:
+                target = ", ".join(_quote(name) for name in columns)
+                self.cursor.execute(
+                    f"INSERT INTO {_quote(schema.name)} ({target}) SELECT {target} FROM {_quote(frame_name)}"
+                )
+            finally:
+                self.cursor.unregister(frame_name)
+            metrics.rows = len(df)
+        return len(df)
+
+    def load_pandas(self, schema: TableSchema, inspection: FileInspection) -> int:
+        """
+        Fill a table through pandas and the conversion plan.
+
+        With chunk_rows, the file is read, converted and appended by batches, so
+        memory use does not depend on the file size. The batches are appended in a
+        single transaction: committing each one would write the table to the WAL
+        batch by batch, which dominated the load of wide tables with small batches.
+
+        Input files are made valid UTF-8 before loading (see encoding_normalization.py),
+        so the file is read once, never decoded again after an encoding error.
+        """
+        rows = 0
+        plan = compile_plan(schema.to_schema_df(), {c.base_type: c.target for c in schema.columns})
+        batches = self.iter_csv_batches(inspection)
+        self.cursor.begin()
+        try:
+            while True:
+                with self.measure("csv_parse", schema.name) as metrics:
+                    df = next(batches, None)
+                    metrics.rows = len(df) if df is not None else 0
+                if df is None:
+                    break
+                rows += self.insert_frame(schema, plan, df)
+            self.cursor.commit()
+        except Exception:
+            self.cursor.rollback()
+            raise
+        if self.report is not None:
+            self.report.add_table("csv_parse", schema.name, Metrics(bytes=inspection.size))
+        return rows
+
+    def load_table(self, table_name: str) -> int:
+        """Create a table and fill it, natively or through the pandas fallback."""
+        schema = self.schemas[table_name]
+        inspection = self.inspect(table_name)
+
+        self.create_table(schema)
+        try:
+            with self.measure("native_load", table_name) as metrics:
+                rows = metrics.rows = self.load_native(schema, inspection)
+                metrics.bytes = inspection.size
+            self.logger.info(f"✅ {table_name}: {rows} rows loaded (native DuckDB reader)")
+        except (duckdb.Error, ValueError) as e:
+            self.logger.warning(f"⚠️  {table_name}: native reader rejected the file ({str(e).splitlines()[0]}), falling back to pandas")
+            self.create_table(schema)
+            rows = self.load_pandas(schema, inspection)
+            self.logger.info(f"✅ {table_name}: {rows} rows loaded (pandas fallback)")
+        return rows
+
+    def export_parquet(self, table_name: str, path: str):
+        """Write a table to a zstd-compressed Parquet file."""
+        self.cursor.execute(
+            f"COPY {_quote(table_name)} TO {_sql_literal(path)} (FORMAT parquet, COMPRESSION zstd)"
+        )
+
+    def load_parquet(self, table_name: str, path: str) -> int:
+        """Fill an empty table from a Parquet file written by export_parquet."""
+        return self.cursor.execute(
+            f"INSERT INTO {_quote(table_name)} SELECT * FROM read_parquet({_sql_literal(path)})"
+        ).fetchone()[0]
+
+    def load_from_cache(self, table_name: str, signature: dict) -> Optional[int]:
+        """
+        Create a table and fill it from the Parquet cache.
+
+        Returns
+        -------
+        Optional[int]
+            Number of rows loaded, or None if the table is not cached (or the cache
+            entry cannot be read).
+        """
+        path = self.cache.lookup(table_name, signature)
+        if path is None:
+            return None
+        self.create_table(self.schemas[table_name])
+        try:
+            with self.measure("parquet_cache_read", table_name) as metrics:
+                rows = metrics.rows = self.load_parquet(table_name, path)
+                metrics.bytes = os.path.getsize(path)
+        except duckdb.Error as e:
+            self.logger.warning(f"⚠️  {table_name}: unreadable Parquet cache entry ({str(e).splitlines()[0]}), loading the CSV")
+            self.create_table(self.schemas[table_name])
+            return None
+        self.logger.info(f"✅ {table_name}: {rows} rows loaded (Parquet cache)")
+        return rows
+
+    def store_in_cache(self, table_name: str, signature: dict):
+        """Save a loaded table in the Parquet cache (a failure only costs the next rebuild)."""
+        try:
+            size = self.cache.store(table_name, signature, lambda path: self.export_parquet(table_name, path))
+            self.logger.info(f"💾 {table_name}: cached as Parquet ({size / 1024 / 1024:.1f} MB)")
+        except (duckdb.Error, OSError) as e:
+            self.logger.warning(f"⚠️  {table_name}: could not write Parquet cache entry: {e}")
+
+    def shared_signature(self, table_name: str) -> dict:
+        """
+        Input signature of a table copied from the shared database: the CSV hash
+        Staging loaded it from, and the hash of both CREATE TABLE files.
+
+        csv_sha256 is None when the Staging load state does not know the table (e.g.
+        Staging ran with --full-load): the table is then always copied.
+        """
+        staged = (self.shared_state.tables if self.shared_state is not None else {}).get(table_name) or {}
+        sha = hashlib.sha256((staged.get("ddl_sha256") or "").encode("utf-8"))
+        with open(self.schemas[table_name].ddl_path, "rb") as f:
+            sha.update(f.read())
+        return {"csv_sha256": staged.get("csv_sha256"), "ddl_sha256": sha.hexdigest(), "source": SHARED_CATALOG}
+
+    def copy_shared(self, table_name: str) -> int:
+        """
+        Create a table and fill it with the columns it shares with the same table of
+        the shared database (DuckDB casts them to the profile's column types).
+
+        Raises
+        ------
+        ValueError
+            If no column of the table exists in the shared table.
+        """
+        schema = self.schemas[table_name]
+        shared_columns = set(self.shared_tables[table_name])
+        columns = [_quote(name) for name in schema.column_names if name in shared_columns]
+        if not columns:
+            raise ValueError(f"No column of {table_name} found in {SHARED_CATALOG}.{table_name}")
+
+        self.create_table(schema)
+        with self.measure("shared_copy", table_name) as metrics:
+            target = ", ".join(columns)
+            rows = metrics.rows = self.cursor.execute(
+                f"INSERT INTO {_quote(table_name)} ({target}) "
+                f"SELECT {target} FROM {SHARED_CATALOG}.main.{_quote(table_name)}"
+            ).fetchone()[0]
+        self.logger.info(f"✅ {table_name}: {rows} rows copied from the Staging database")
+        return rows
+
+    def load_shared_if_changed(self, table_name: str) -> int:
+        """Copy a table from the shared database unless it did not change since its last copy."""
+        signature = self.shared_signature(table_name)
+        known = signature["csv_sha256"] is not None
+        if self.state is not None and known:
+            if self.state.is_unchanged(table_name, signature) and self.table_exists(table_name):
+                self.logger.info(f"⏭️  {table_name}: unchanged in the Staging database, skipped")
+                self.skipped_tables.append(table_name)
+                return 0
+
+        rows = self.copy_shared(table_name)
+        if self.state is not None:
+            self.state.record(table_name, signature, rows)
+        return rows
+
+    def load_if_changed(self, table_name: str) -> int:
+        """
+        Load a table unless the state store shows its inputs did not change since
+        its last load (and the table is still in the database), reading it from the
+        Parquet cache when these inputs were already parsed once.
+
+        A table of the shared database is copied from it instead (see load_shared_if_changed).
+        """
+        if table_name in self.shared_tables:
+            return self.load_shared_if_changed(table_name)
+        if self.state is None and self.cache is None:
+            return self.load_table(table_name)
+
+        csv_path = os.path.join(self.input_directory, f"{table_name}.csv")
+        ddl_path = self.schemas[table_name].ddl_path
+        if self.state is not None:
+            signature = self.state.signature(table_name, csv_path, ddl_path)
+            if self.state.is_unchanged(table_name, signature) and self.table_exists(table_name):
+                self.logger.info(f"⏭️  {table_name}: unchanged since last load, skipped")
+                self.skipped_tables.append(table_name)
+                return 0
+        else:
+            signature = input_signature(csv_path, ddl_path)
+
+        rows = self.load_from_cache(table_name, signature) if self.cache is not None else None
+        if rows is None:
+            rows = self.load_table(table_name)
+            if self.cache is not None:
+                self.store_in_cache(table_name, signature)
+
+        if self.state is not None:
+            self.state.record(table_name, signature, rows)
+        return rows
+
+    def run(self):
+        """
+        Create and fill every table having a CSV file and a CREATE TABLE file
+        (only the changed ones when a state store is set).
+
+        Raises
+        ------
+        RuntimeError
+            If at least one table failed to load (each failure is logged).
+        """
+        self.schemas = load_table_schemas(self.create_table_directory)
+        tables = self.list_tables_to_load()
+        self.skipped_tables = []
+        if self.workers > 1:
+            self.logger.info(f"Loading {len(tables)} tables with {self.workers} workers (largest files first)")
+
+        failures = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.load_if_changed, table_name): table_name for table_name in tables}
+            for future in as_completed(futures):
+                table_name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    self.logger.error(f"❌ {table_name}: loading failed: {e}")
+                    failures[table_name] = str(e)
+
+        if self.skipped_tables:
+            self.logger.info(f"⏭️  {len(self.skipped_tables)}/{len(tables)} tables unchanged, not reloaded")
+        if failures:
+            raise RuntimeError(f"{len(failures)} table(s) failed to load: {', '.join(sorted(failures))}")
+
+    def run_pipelined(self, ready: "queue.Queue[Optional[str]]", cancel: threading.Event):
+        """
+        Create and fill each table as soon as the name of its CSV file arrives on
+        ready, while the producer (the SFTP download) is still writing the others.
+
+        None on ready marks the end of the production: the tables of the input
+        directory that were not announced are then loaded too. A table that fails
+        sets cancel and the tables not started yet are dropped. Once cancel is set
+        (here or by the producer), no new table is started.
+
+        Raises
+        ------
+        RuntimeError
+            If at least one table failed to load, or the run was cancelled.
+        """
+        self.schemas = load_table_schemas(self.create_table_directory)
+        self.skipped_tables = []
+        failures = {}
+        futures = {}
+        pending = set()
+
+        def collect(done):
+            for future in done:
+                table_name = futures[future]
+                try:
+                    future.result()
+                except CancelledError:
+                    continue
+                except Exception as e:
+                    self.logger.error(f"❌ {table_name}: loading failed: {e}")
+                    failures[table_name] = str(e)
+                    cancel.set()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            def submit(table_name: str):
+                if table_name in self.schemas and table_name not in futures.values():
+                    future = executor.submit(self.load_if_changed, table_name)
+                    futures[future] = table_name
+                    pending.add(future)
+
+            while not cancel.is_set():
+                done = {future for future in pending if future.done()}
+                pending.difference_update(done)
+                collect(done)
+                try:
+                    filename = ready.get(timeout=QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if filename is None:
+                    break
+                table_name, extension = os.path.splitext(filename)
+                if extension == ".csv":
+                    submit(table_name)
+
+            # Tables not started yet are dropped as soon as the run is cancelled
+            if cancel.is_set():
+                for future in pending:
+                    future.cancel()
+            else:
+                for table_name in self.list_tables_to_load():
+                    submit(table_name)
+            for future in as_completed(pending):
+                collect([future])
+                if cancel.is_set():
+                    for other in pending:
+                        other.cancel()
+
+        if self.skipped_tables:
+            self.logger.info(f"⏭️  {len(self.skipped_tables)}/{len(futures)} tables unchanged, not reloaded")
+        if failures:
+            raise RuntimeError(f"{len(failures)} table(s) failed to load: {', '.join(sorted(failures))}")
+        if cancel.is_set():
+            raise RuntimeError("Loading cancelled")
+
+
+class StreamingDuckDBLoader(NativeDuckDBLoader):
+    """
+    Load staging CSV files through pandas by batches of chunk_rows rows.
+
+    Each batch is converted with the same rules as the patched convert_columns_type
+    and appended to the DuckDB table, so peak memory stays bounded by the batch size
+    whatever the size of the file.
+    """
+
+    def load_table(self, table_name: str) -> int:
+        """Create a table and fill it batch by batch."""
+        schema = self.schemas[table_name]
+        inspection = self.inspect(table_name)
+
+        self.create_table(schema)
+        rows = self.load_pandas(schema, inspection)
+        self.logger.info(f"✅ {table_name}: {rows} rows loaded (pandas, {self.chunk_rows or 'all'} rows per batch)")
+        return rows
@@ -0,0 +1,23 @@
+"""Shared pytest configuration: the pipeline modules live at the repository root."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_PATH))
+sys.path.insert(0, str(BASE_PATH / "tests"))
+
+
+@pytest.fixture
+def sftp_server(tmp_path):
+    """Stub SFTP server (see sftp_stub.py) whose remote root is tmp_path / 'remote'."""
+    pytest.importorskip("paramiko")
+    from sftp_stub import StubSFTP
+
+    root = tmp_path / "remote"
+    root.mkdir()
+    server = StubSFTP(str(root))
+    yield server
+    server.close()
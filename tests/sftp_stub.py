@@ -0,0 +1,102 @@
+"""
+In-process SFTP server for the downloader tests: a paramiko SSH server speaking
+SFTP over socket pairs, serving a local directory read-only.
+"""
+
+import os
+import socket
+import threading
+
+import paramiko
+
+
+class StubServer(paramiko.ServerInterface):
+    """SSH server accepting any password and the sftp subsystem."""
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class StubSFTPHandle(paramiko.SFTPHandle):
+    """Read-only handle over a local file."""
+
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+
+class StubSFTPServer(paramiko.SFTPServerInterface):
+    """Read-only SFTP server exposing a local directory as the remote root."""
+
+    ROOT = None
+
+    def _local(self, path):
+        return os.path.join(self.ROOT, self.canonicalize(path).lstrip("/"))
+
+    def list_folder(self, path):
+        local = self._local(path)
+        try:
+            return [
+                paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(local, name)), name)
+                for name in sorted(os.listdir(local))
+            ]
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        try:
+            handle = StubSFTPHandle(flags)
+            handle.readfile = open(self._local(path), "rb")
+            handle.filename = path
+            return handle
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+
+class StubSFTP:
+    """
+    In-process SFTP server over socket pairs: each connection opened by
+    connection_factory gets its own SSH transport served from a thread.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.host_key = paramiko.RSAKey.generate(1024)
+        self.connections = 0
+        self._transports = []
+
+    def connection_factory(self):
+        server_socket, client_socket = socket.socketpair()
+        server_root = self.root
+
+        class Server(StubSFTPServer):
+            ROOT = server_root
+
+        server = paramiko.Transport(server_socket)
+        server.add_server_key(self.host_key)
+        server.set_subsystem_handler("sftp", paramiko.SFTPServer, Server)
+        started = threading.Thread(target=server.start_server, kwargs={"server": StubServer()}, daemon=True)
+        started.start()
+
+        client = paramiko.Transport(client_socket)
+        client.connect(username="anais", password="anais")
+        self._transports += [server, client]
+        self.connections += 1
+        return client, paramiko.SFTPClient.from_transport(client)
+
+    def close(self):
+        for transport in self._transports:
+            transport.close()
@@ -0,0 +1,33 @@
+"""Tests of encoding_normalization.py: UTF-8 validation and transcoding of mixed files."""
+
+from encoding_normalization import MIXED_ENCODING, detect_encoding, normalize_file
+from file_inspection import SNIFF_BYTES
+
+LINE = "1;établissement de santé\n"
+
+
+def test_valid_utf8_file_is_kept(tmp_path):
+    path = tmp_path / "sa_sivss.csv"
+    path.write_text("id;libellé\n" + LINE * 100_000, encoding="utf-8")
+
+    decision = normalize_file(str(path))
+
+    assert not decision.transcoded
+    assert decision.encoding == "utf-8"
+
+
+def test_cp1252_byte_missed_by_the_samples_is_transcoded_once(tmp_path):
+    path = tmp_path / "sa_sivss.csv"
+    body = ("id;libellé\n" + LINE * 100_000).encode("utf-8")
+    # Between the header sample and the first window spread over the file
+    position = body.index(b"\n", SNIFF_BYTES + 100) + 1
+    path.write_bytes(body[:position] + "2;côté\n".encode("cp1252") + body[position:])
+    assert detect_encoding(str(path)) == ("utf-8", False)
+
+    decision = normalize_file(str(path))
+
+    assert decision.transcoded
+    assert decision.encoding == MIXED_ENCODING
+    text = path.read_text(encoding="utf-8")
+    assert "2;côté\n" in text
+    assert text.count("établissement de santé") == 100_000
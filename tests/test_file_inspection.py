@@ -0,0 +1,31 @@
+"""Tests of file_inspection.py: row counts of UTF-8 and UTF-16 files."""
+
+import pytest
+
+from file_inspection import inspect_file
+
+# 'Ċ' (U+010A) and 'ਊ' (U+0A0A) hold 0x0A bytes in UTF-16 without being newlines
+ROWS = ["1;Ċ", "2;ਊਊ", "3;x"]
+
+
+@pytest.mark.parametrize("encoding", ["utf-16-le", "utf-16-be"])
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_utf16_rows_are_counted_by_newline_characters(tmp_path, encoding, trailing_newline):
+    path = tmp_path / "sa_test.csv"
+    text = "﻿" + "\n".join(["id;nom"] + ROWS) + ("\n" if trailing_newline else "")
+    path.write_bytes(text.encode(encoding))
+
+    inspection = inspect_file(str(path), "sa_test")
+
+    assert (inspection.encoding, inspection.bom) == ("utf-16", True)
+    assert inspection.header_line == "id;nom"
+    assert inspection.rows == len(ROWS)
+
+
+def test_utf8_rows_exclude_the_header_and_count_a_last_line_without_newline(tmp_path):
+    path = tmp_path / "sa_test.csv"
+    path.write_bytes(("\n".join(["id;nom"] + ROWS)).encode("utf-8"))
+
+    inspection = inspect_file(str(path), "sa_test")
+
+    assert (inspection.encoding, inspection.header_line, inspection.rows) == ("utf-8", "id;nom", len(ROWS))
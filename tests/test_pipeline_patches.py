@@ -0,0 +1,31 @@
+"""Tests of pipeline_patches.py: per-table recording of the patched conversions."""
+
+import pandas as pd
+
+from ddl_schema import ColumnDef, TableSchema
+from pipeline_patches import measure_conversion, record_conversions
+from run_report import RunReport
+
+
+def schema(name: str) -> TableSchema:
+    return TableSchema(name=name, columns=(ColumnDef("id", "INTEGER"), ColumnDef("flag", "BOOLEAN")), ddl="")
+
+
+def test_conversions_are_recorded_per_table_in_name_order_for_identical_schemas():
+    report = RunReport()
+    schemas = {name: schema(name) for name in ("sa_siicea_missions_real", "sa_siicea_missions_prog")}
+    schema_df = schemas["sa_siicea_missions_prog"].to_schema_df()
+    record_conversions(report, schemas)
+    try:
+        for rows in (10, 20):
+            with measure_conversion(schema_df, {"flag": rows // 10}) as metrics:
+                metrics.rows = rows
+        with measure_conversion(pd.DataFrame({"column_name": ["other"]}), {}) as metrics:
+            metrics.rows = 99
+    finally:
+        record_conversions(None)
+
+    assert {name: m.rows for name, m in report.tables["type_conversion"].items()} == {
+        "sa_siicea_missions_prog": 10, "sa_siicea_missions_real": 20
+    }
+    assert report.coerced == {"sa_siicea_missions_prog": {"flag": 1}, "sa_siicea_missions_real": {"flag": 2}}
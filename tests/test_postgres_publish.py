@@ -0,0 +1,166 @@
+"""
+Tests of postgres_publish.py.
+
+ArrowCsvStream is tested on its own. The publish tests need a Postgres server: set
+ANAIS_TEST_POSTGRES_DSN (e.g. "host=localhost port=5432 user=postgres password=postgres
+dbname=postgres") to run them, for instance against a throwaway container:
+
+    docker run --rm -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:16
+"""
+
+import logging
+import os
+import uuid
+
+import duckdb
+import pytest
+
+pytest.importorskip("pyarrow")
+psycopg2 = pytest.importorskip("psycopg2")
+
+from ddl_schema import load_table_schemas
+from postgres_publish import ArrowCsvStream, PostgresPublisher
+
+POSTGRES_DSN = os.getenv("ANAIS_TEST_POSTGRES_DSN")
+requires_postgres = pytest.mark.skipif(POSTGRES_DSN is None, reason="ANAIS_TEST_POSTGRES_DSN is not set")
+
+
+def read_all(stream: ArrowCsvStream, size: int) -> bytes:
+    blocks = []
+    for block in iter(lambda: stream.read(size), b""):
+        blocks.append(block)
+    return b"".join(blocks)
+
+
+def test_arrow_csv_stream_quotes_empty_strings_but_not_nulls():
+    connection = duckdb.connect()
+    batches = connection.execute(
+        "SELECT * FROM (VALUES (1, 'a'), (2, ''), (3, NULL), (4, 'x,\"y')) t(id, label)"
+    ).fetch_record_batch(2)
+
+    assert read_all(ArrowCsvStream(batches), 5) == b'1,"a"\n2,""\n3,\n4,"x,""y"\n'
+
+
+def test_arrow_csv_stream_serves_every_batch_and_counts_bytes():
+    connection = duckdb.connect()
+    batches = connection.execute("SELECT range AS id FROM range(10000)").fetch_record_batch(1000)
+    stream = ArrowCsvStream(batches)
+
+    data = read_all(stream, 4096)
+
+    assert data.splitlines() == [str(i).encode() for i in range(10000)]
+    assert stream.bytes == len(data)
+
+
+@pytest.fixture
+def postgres():
+    """Postgres connection parameters and a fresh schema, dropped afterwards."""
+    schema = f"anais_test_{uuid.uuid4().hex[:8]}"
+    connection = psycopg2.connect(POSTGRES_DSN)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE SCHEMA "{schema}"')
+    params = connection.get_dsn_parameters()
+    config = {
+        "host": params["host"],
+        "port": params["port"],
+        "user": params["user"],
+        "password": connection.info.password,
+        "dbname": params["dbname"],
+        "schema": schema,
+    }
+    yield connection, config
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA "{schema}" CASCADE')
+    connection.close()
+
+
+@pytest.fixture
+def staging(tmp_path):
+    """DuckDB staging database holding sa_example, and its CREATE TABLE file."""
+    ddl_directory = tmp_path / "ddl"
+    ddl_directory.mkdir()
+    (ddl_directory / "sa_example.sql").write_text(
+        'CREATE TABLE IF NOT EXISTS "sa_example" (\n    id INTEGER,\n    label VARCHAR(20)\n);\n'
+    )
+    db_path = str(tmp_path / "staging.duckdb")
+    with duckdb.connect(db_path) as connection:
+        connection.execute("CREATE TABLE sa_example (id INTEGER, label VARCHAR)")
+        connection.execute("INSERT INTO sa_example VALUES (1, 'a'), (2, ''), (3, NULL)")
+    return db_path, load_table_schemas(str(ddl_directory))
+
+
+def publish(config, staging):
+    db_path, schemas = staging
+    return PostgresPublisher(config, db_path, schemas, logging.getLogger("test"), workers=2).publish()
+
+
+@requires_postgres
+def test_publish_copies_rows_keeping_nulls_apart_from_empty_strings(postgres, staging):
+    connection, config = postgres
+
+    assert publish(config, staging) == {"sa_example": 3}
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT id, label FROM "{config["schema"]}".sa_example ORDER BY id')
+        assert cursor.fetchall() == [(1, "a"), (2, ""), (3, None)]
+
+
+@requires_postgres
+def test_publish_recreates_dependent_views(postgres, staging):
+    connection, config = postgres
+    schema = config["schema"]
+    publish(config, staging)
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE VIEW "{schema}".v_example AS SELECT id FROM "{schema}".sa_example WHERE id > 1')
+        cursor.execute(f'CREATE VIEW "{schema}".v_example_count AS SELECT count(*) AS n FROM "{schema}".v_example')
+
+    publish(config, staging)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT n FROM "{schema}".v_example_count')
+        assert cursor.fetchone() == (2,)
+        cursor.execute(
+            "SELECT count(*) FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = %s AND c.relname LIKE '%%previous'",
+            (schema,)
+        )
+        assert cursor.fetchone() == (0,)
+
+
+@requires_postgres
+def test_publish_keeps_the_grants_of_the_table_and_its_views(postgres, staging):
+    connection, config = postgres
+    schema = config["schema"]
+    publish(config, staging)
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE VIEW "{schema}".v_example AS SELECT id FROM "{schema}".sa_example')
+        cursor.execute(f'GRANT SELECT ON "{schema}".sa_example TO PUBLIC')
+        cursor.execute(f'GRANT SELECT, UPDATE ON "{schema}".v_example TO PUBLIC')
+
+    publish(config, staging)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT table_name, privilege_type FROM information_schema.role_table_grants "
+            "WHERE table_schema = %s AND grantee = 'PUBLIC' ORDER BY 1, 2",
+            (schema,)
+        )
+        assert cursor.fetchall() == [("sa_example", "SELECT"), ("v_example", "SELECT"), ("v_example", "UPDATE")]
+
+
+@requires_postgres
+def test_publish_fails_instead_of_dropping_other_dependents(postgres, staging):
+    connection, config = postgres
+    schema = config["schema"]
+    publish(config, staging)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{schema}".sa_example ADD PRIMARY KEY (id)')
+        cursor.execute(
+            f'CREATE TABLE "{schema}".child (id INTEGER REFERENCES "{schema}".sa_example (id))'
+        )
+
+    with pytest.raises(RuntimeError, match="sa_example"):
+        publish(config, staging)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM "{schema}".sa_example')
+        assert cursor.fetchone() == (3,)
@@ -0,0 +1,43 @@
+"""Tests of profile_orchestrator.py: profiles sharing a database never run at the same time."""
+
+import logging
+import os
+import time
+
+from conftest import BASE_PATH
+from profile_orchestrator import ProfileOrchestrator, ProfileResult, shared_database_groups
+
+
+def test_profiles_of_the_repository_sharing_a_database_are_grouped():
+    profiles = ["Staging", "CertDC", "InspectionControlePA", "InspectionControlePH", "Helios", "Matrice_PA", "Matrice_PH"]
+
+    groups = shared_database_groups(profiles, "anais", str(BASE_PATH / "profiles.yml"))
+
+    assert groups == [["InspectionControlePA", "InspectionControlePH"], ["Matrice_PA", "Matrice_PH"]]
+    assert shared_database_groups(profiles, "local", str(BASE_PATH / "profiles.yml")) == []
+
+
+def record_run(directory: str, profile: str) -> ProfileResult:
+    """Profile job writing when it started and ended (module-level: run in another process)."""
+    started = time.time()
+    time.sleep(0.3)
+    with open(os.path.join(directory, profile), "w") as f:
+        f.write(f"{started} {time.time()}")
+    return ProfileResult(profile, "failed" if profile == "A" else "success")
+
+
+def test_profiles_of_an_exclusive_group_run_one_after_the_other(tmp_path):
+    from functools import partial
+
+    orchestrator = ProfileOrchestrator(
+        partial(record_run, str(tmp_path)), {"A": [], "B": [], "C": []}, workers=3,
+        logger=logging.getLogger("test_profile_orchestrator"), exclusive=[["A", "B"]]
+    )
+
+    results = orchestrator.run()
+
+    windows = {profile: tuple(map(float, (tmp_path / profile).read_text().split())) for profile in "ABC"}
+    (a_start, a_end), (b_start, b_end) = windows["A"], windows["B"]
+    assert a_end <= b_start or b_end <= a_start
+    # A failed: B still runs, the group only orders the profiles
+    assert results["B"].status == "success"
@@ -0,0 +1,71 @@
+"""Tests of run_report.py: report file names, stage and table measurements."""
+
+import time
+from datetime import datetime
+
+from run_report import LOAD_STEPS, Metrics, RunReport, measure, run_file_name
+
+
+def test_run_file_names_carry_microseconds_label_and_pid():
+    started_at = datetime(2025, 10, 26, 8, 30, 0, 123456)
+
+    name = run_file_name("run_report", started_at, "Helios")
+
+    assert name.startswith("run_report_20251026_083000_123456_Helios_")
+    assert name.endswith(".json")
+
+
+def test_memory_is_reported_as_the_process_peak():
+    report = RunReport()
+    with report.table("csv_parse", "sa_sirec") as metrics:
+        metrics.rows = 10
+    with measure() as metrics:
+        pass
+
+    report_dict = report.to_dict()
+
+    assert "process_peak_rss_mb" in report_dict
+    assert "process_peak_rss_mb" in report_dict["tables"]["csv_parse"]["sa_sirec"]
+    assert "peak_rss_mb" not in metrics.to_dict()
+
+
+def test_table_measures_wall_and_thread_cpu_time():
+    report = RunReport()
+    with report.table("type_conversion", "sa_sirec") as metrics:
+        metrics.rows = 1000
+        time.sleep(0.05)
+        deadline = time.thread_time() + 0.02
+        while time.thread_time() < deadline:
+            pass
+
+    recorded = report.tables["type_conversion"]["sa_sirec"]
+
+    assert recorded.rows == 1000
+    assert recorded.wall_seconds >= 0.07
+    assert 0.02 <= recorded.cpu_seconds < recorded.wall_seconds
+    assert recorded.to_dict()["rows_per_second"] == round(1000 / recorded.wall_seconds, 1)
+
+
+def test_measurements_of_the_same_table_add_up():
+    report = RunReport()
+    report.add_table("duckdb_insert", "sa_sirec", Metrics(wall_seconds=1.0, cpu_seconds=0.5, rows=10, bytes=100))
+    report.add_table("duckdb_insert", "sa_sirec", Metrics(wall_seconds=2.0, cpu_seconds=None, rows=5, bytes=50))
+
+    recorded = report.tables["duckdb_insert"]["sa_sirec"]
+
+    assert (recorded.wall_seconds, recorded.cpu_seconds, recorded.rows, recorded.bytes) == (3.0, None, 15, 150)
+
+
+def test_stage_sums_the_rows_and_bytes_of_its_tables_unless_set():
+    report = RunReport()
+    with report.stage("sftp_download"):
+        report.add_table("sftp_download", "sa_sirec", Metrics(rows=10, bytes=100))
+        report.add_table("sftp_download", "sa_sivss", Metrics(rows=5, bytes=50))
+    with report.stage("duckdb_load") as metrics:
+        report.add_table("pipeline_load", "sa_sirec", Metrics(cpu_seconds=None, rows=7, bytes=70))
+        report.add_table("native_load", "sa_sivss", Metrics(rows=3, bytes=30))
+        metrics.rows = report.sum_tables(LOAD_STEPS, "rows")
+
+    assert (report.stages["sftp_download"].rows, report.stages["sftp_download"].bytes) == (15, 150)
+    assert report.stages["duckdb_load"].rows == 10
+    assert report.stages["duckdb_load"].cpu_seconds >= 0
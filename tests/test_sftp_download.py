@@ -0,0 +1,331 @@
+"""
+Tests of sftp_download.py against the in-process SFTP server of sftp_stub.py:
+connection pool, listing index, incremental sync and resume, compressed variants,
+size and sidecar checksum checks, cancellation.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("paramiko")
+
+from sftp_download import (
+    DownloadCancelled,
+    IntegrityError,
+    PooledSFTPDownloader,
+    RemoteFile,
+    RemoteListingIndex,
+    TransferSettings,
+)
+import transfer_compression
+from sftp_manifest import SyncManifest
+from transfer_compression import SUPPORTED_COMPRESSIONS
+
+LOGGER = logging.getLogger("test_sftp_download")
+CSV = "".join(f"{i};value_{i}\n" for i in range(200_000)).encode("ascii")
+
+
+def write_remote(server, path: str, name: str, data: bytes, mtime: int = 1_700_000_000) -> str:
+    """Write a file on the stub server and return its local path."""
+    directory = os.path.join(server.root, path.strip("/"))
+    os.makedirs(directory, exist_ok=True)
+    local_path = os.path.join(directory, name)
+    with open(local_path, "wb") as f:
+        f.write(data)
+    os.utime(local_path, (mtime, mtime))
+    return local_path
+
+
+def downloader(server, tmp_path, connections: int = 2, manifest: bool = True, **kwargs) -> PooledSFTPDownloader:
+    output = str(tmp_path / "input")
+    return PooledSFTPDownloader(
+        server.connection_factory,
+        output,
+        LOGGER,
+        max_connections=connections,
+        manifest=SyncManifest.for_directory(output) if manifest else None,
+        **kwargs
+    )
+
+
+def entry(path: str, keyword: str, file: str) -> dict:
+    return {"path": path, "keyword": keyword, "file": file}
+
+
+def attrs(name: str, size: int = 10, mtime: int = 0, directory: bool = False):
+    import paramiko
+
+    attr = paramiko.SFTPAttributes()
+    attr.filename, attr.st_size, attr.st_mtime = name, size, mtime
+    attr.st_mode = 0o040755 if directory else 0o100644
+    return attr
+
+
+# === RemoteListingIndex ===
+
+def test_index_shares_listings_of_equivalent_paths_and_skips_directories():
+    index = RemoteListingIndex()
+    index.add_listing("/SCN_BDD/SIICEA/", [attrs("DECISIONS_SCN_1.csv"), attrs("archive", directory=True)])
+
+    assert [remote.name for remote in index.candidates("/SCN_BDD/SIICEA", "DECISIONS")] == ["DECISIONS_SCN_1.csv"]
+    assert index.candidates("/SCN_BDD/SIICEA", "archive") == []
+
+
+def test_index_resolves_the_newest_candidate_and_excludes_other_files():
+    index = RemoteListingIndex()
+    index.add_listing("/SCN_BDD/SIREC", [
+        attrs("sirec_20250101.csv", mtime=1),
+        attrs("sirec_20250201.csv", mtime=2),
+        attrs("sirec_20250301.csv.gpg", mtime=3),
+        attrs("sirec_20250301.csv.sha256", mtime=3),
+        attrs("sirec_20250301.xlsx", mtime=3),
+    ])
+
+    assert index.resolve("/SCN_BDD/SIREC", "sirec").name == "sirec_20250201.csv"
+    with pytest.raises(FileNotFoundError):
+        index.resolve("/SCN_BDD/SIREC", "sivss")
+
+
+def test_index_prefers_the_compressed_variant_of_the_newest_file():
+    index = RemoteListingIndex()
+    index.add_listing("/SCN_BDD/SIREC", [
+        attrs("sirec_1.csv", mtime=1),
+        attrs("sirec_1.csv.gz", mtime=1),
+        attrs("sirec_2.csv", mtime=2),
+        attrs("sirec_2.csv.gz", mtime=2),
+    ])
+
+    assert index.resolve("/SCN_BDD/SIREC", "sirec").name == "sirec_2.csv.gz"
+
+
+def test_index_fails_clearly_on_a_zst_only_file_without_zstandard(monkeypatch):
+    monkeypatch.setattr(transfer_compression, "SUPPORTED_COMPRESSIONS", ("gzip",))
+    index = RemoteListingIndex()
+    index.add_listing("/SCN_BDD/SIREC", [attrs("sirec_2.csv.zst", mtime=2)])
+
+    with pytest.raises(FileNotFoundError, match="sirec_2.csv.zst is compressed and zstd decompression needs the 'zstandard'"):
+        index.resolve("/SCN_BDD/SIREC", "sirec")
+    missing, _ = index.check([entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")])
+    assert "zstandard" in missing["sa_sirec.csv"]
+
+
+def test_index_check_reports_missing_and_ambiguous_keywords():
+    index = RemoteListingIndex()
+    index.add_listing("/SCN_BDD/INSEE", [attrs("v_commune_2024.csv"), attrs("v_commune_comer_2024.csv")])
+
+    missing, ambiguous = index.check([
+        entry("/SCN_BDD/INSEE", "v_commune", "v_commune.csv"),
+        entry("/SCN_BDD/INSEE", "v_commune_comer", "v_commune_comer.csv"),
+        entry("/SCN_BDD/INSEE", "v_region", "v_region.csv"),
+    ])
+
+    assert list(missing) == ["v_region.csv"]
+    assert len(ambiguous) == 1 and ambiguous[0].startswith("v_commune.csv")
+
+
+def test_index_build_lists_each_distinct_path_once(sftp_server, tmp_path):
+    write_remote(sftp_server, "/SCN_BDD/SIICEA", "DECISIONS_SCN.csv", b"a\n")
+    write_remote(sftp_server, "/SCN_BDD/SIICEA", "MISSIONSREAL_SCN.csv", b"a\n")
+    load = downloader(sftp_server, tmp_path)
+
+    load.index.build(load.pool, ["/SCN_BDD/SIICEA", "/SCN_BDD/SIICEA/"])
+    load.pool.close()
+
+    assert list(load.index.listings) == ["/SCN_BDD/SIICEA"]
+    assert len(load.index.listings["/SCN_BDD/SIICEA"]) == 2
+
+
+# === Pool and incremental sync ===
+
+def test_download_all_fetches_every_entry_over_the_pool(sftp_server, tmp_path):
+    files = []
+    for index in range(5):
+        write_remote(sftp_server, f"/SCN_BDD/T{index % 2}", f"extract_{index}_2025.csv", CSV[:10_000 * (index + 1)])
+        files.append(entry(f"/SCN_BDD/T{index % 2}", f"extract_{index}", f"sa_{index}.csv"))
+    ready = []
+
+    results = downloader(sftp_server, tmp_path, connections=2).download_all(files, on_downloaded=ready.append)
+
+    assert sftp_server.connections <= 2
+    assert sorted(result.file for result in results) == sorted(result.file for result in ready)
+    for index in range(5):
+        assert (tmp_path / "input" / f"sa_{index}.csv").read_bytes() == CSV[:10_000 * (index + 1)]
+
+
+def test_unchanged_files_are_skipped_and_changed_files_downloaded_again(sftp_server, tmp_path):
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    files = [entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")]
+    downloader(sftp_server, tmp_path).download_all(files)
+
+    second = downloader(sftp_server, tmp_path).download_all(files)
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV[:1000], mtime=1_800_000_000)
+    third = downloader(sftp_server, tmp_path).download_all(files)
+
+    assert second[0].skipped
+    assert not third[0].skipped
+    assert (tmp_path / "input" / "sa_sirec.csv").read_bytes() == CSV[:1000]
+
+
+def test_interrupted_transfer_resumes_from_the_part_file(sftp_server, tmp_path):
+    remote_path = write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    load = downloader(sftp_server, tmp_path)
+    os.makedirs(load.output_folder)
+    stat = os.stat(remote_path)
+    remote = RemoteFile("/SCN_BDD/SIREC", "sirec_2025.csv", stat.st_size, int(stat.st_mtime))
+    load.manifest.mark_pending("sa_sirec.csv", remote)
+    (tmp_path / "input" / "sa_sirec.csv.part").write_bytes(CSV[:500_000])
+
+    result = load.download_all([entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")])[0]
+
+    assert result.resumed_from == 500_000
+    assert result.bytes == len(CSV) - 500_000
+    assert (tmp_path / "input" / "sa_sirec.csv").read_bytes() == CSV
+    assert not (tmp_path / "input" / "sa_sirec.csv.part").exists()
+    assert SyncManifest.for_directory(load.output_folder).get("sa_sirec.csv").complete
+
+
+def test_part_file_of_another_remote_version_is_not_resumed(sftp_server, tmp_path):
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    load = downloader(sftp_server, tmp_path)
+    os.makedirs(load.output_folder)
+    load.manifest.mark_pending("sa_sirec.csv", RemoteFile("/SCN_BDD/SIREC", "sirec_2024.csv", len(CSV), 1))
+    (tmp_path / "input" / "sa_sirec.csv.part").write_bytes(b"stale bytes")
+
+    result = load.download_all([entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")])[0]
+
+    assert result.resumed_from == 0
+    assert (tmp_path / "input" / "sa_sirec.csv").read_bytes() == CSV
+
+
+def test_non_utf8_csv_is_transcoded_after_download_and_then_skipped(sftp_server, tmp_path):
+    text = "id;libellé\n" + "".join(f"{i};côté\n" for i in range(1000))
+    write_remote(sftp_server, "/SCN_BDD/SIVSS", "SIVSS_SCN.csv", text.encode("cp1252"))
+    files = [entry("/SCN_BDD/SIVSS", "SIVSS_SCN", "sa_sivss.csv")]
+
+    first = downloader(sftp_server, tmp_path).download_all(files)[0]
+    second = downloader(sftp_server, tmp_path).download_all(files)[0]
+
+    assert first.encoding.transcoded
+    assert (tmp_path / "input" / "sa_sivss.csv").read_text(encoding="utf-8") == text
+    assert second.skipped
+
+
+# === Compressed variants ===
+
+@pytest.mark.parametrize("compression", SUPPORTED_COMPRESSIONS)
+def test_compressed_variant_is_downloaded_and_decompressed(sftp_server, tmp_path, compression):
+    if compression == "gzip":
+        extension, data = ".gz", gzip.compress(CSV[:100_000]) + gzip.compress(CSV[100_000:])
+    else:
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor()
+        extension, data = ".zst", compressor.compress(CSV[:100_000]) + compressor.compress(CSV[100_000:])
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    write_remote(sftp_server, "/SCN_BDD/SIREC", f"sirec_2025.csv{extension}", data)
+
+    result = downloader(sftp_server, tmp_path).download_all([entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")])[0]
+
+    assert result.compression == compression
+    assert result.bytes == len(data)
+    assert result.written_bytes == len(CSV)
+    assert (tmp_path / "input" / "sa_sirec.csv").read_bytes() == CSV
+
+
+def test_compressed_transfer_never_resumes(sftp_server, tmp_path):
+    remote_path = write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv.gz", gzip.compress(CSV))
+    load = downloader(sftp_server, tmp_path)
+    os.makedirs(load.output_folder)
+    stat = os.stat(remote_path)
+    load.manifest.mark_pending(
+        "sa_sirec.csv", RemoteFile("/SCN_BDD/SIREC", "sirec_2025.csv.gz", stat.st_size, int(stat.st_mtime))
+    )
+    (tmp_path / "input" / "sa_sirec.csv.part").write_bytes(CSV[:100])
+
+    result = load.download_all([entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")])[0]
+
+    assert result.resumed_from == 0
+    assert (tmp_path / "input" / "sa_sirec.csv").read_bytes() == CSV
+
+
+# === Integrity checks ===
+
+def test_matching_sidecar_checksum_is_accepted(sftp_server, tmp_path):
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    digest = hashlib.sha256(CSV).hexdigest()
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv.sha256", f"{digest}  sirec_2025.csv\n".encode())
+
+    downloader(sftp_server, tmp_path).download_all([entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")])
+
+    assert (tmp_path / "input" / "sa_sirec.csv").read_bytes() == CSV
+
+
+def test_checksum_mismatch_rejects_the_file(sftp_server, tmp_path):
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv.sha256", ("0" * 64).encode())
+
+    with pytest.raises(RuntimeError, match="sa_sirec.csv"):
+        downloader(sftp_server, tmp_path).download_all([entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")])
+
+    assert not (tmp_path / "input" / "sa_sirec.csv").exists()
+    assert not (tmp_path / "input" / "sa_sirec.csv.part").exists()
+
+
+def test_missing_sidecar_fails_when_checksums_are_required(sftp_server, tmp_path):
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    load = downloader(sftp_server, tmp_path, settings=TransferSettings(require_checksum=True))
+
+    with pytest.raises(RuntimeError, match="sa_sirec.csv"):
+        load.download_all([entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")])
+
+
+def test_truncated_transfer_is_rejected(sftp_server, tmp_path):
+    remote_path = write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    load = downloader(sftp_server, tmp_path, connections=1)
+    # The listing announces the full size, the server then serves fewer bytes
+    load.index.build(load.pool, ["/SCN_BDD/SIREC"])
+    with open(remote_path, "r+b") as f:
+        f.truncate(len(CSV) // 2)
+    remote = load.index.resolve("/SCN_BDD/SIREC", "sirec")
+
+    with load.pool.connection() as sftp, pytest.raises(IntegrityError, match="truncated"):
+        load.transfer(sftp, "sa_sirec.csv", remote, str(tmp_path / "sa_sirec.csv"))
+    load.pool.close()
+
+    assert not (tmp_path / "sa_sirec.csv").exists()
+    assert not (tmp_path / "sa_sirec.csv.part").exists()
+
+
+# === Cancellation ===
+
+def test_first_failure_cancels_the_pending_entries(sftp_server, tmp_path):
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv.sha256", ("0" * 64).encode())
+    write_remote(sftp_server, "/SCN_BDD/SIVSS", "SIVSS_SCN.csv", CSV)
+    cancel = threading.Event()
+    load = downloader(sftp_server, tmp_path, connections=1, cancel=cancel)
+
+    with pytest.raises(RuntimeError, match="1 file"):
+        load.download_all([
+            entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv"),
+            entry("/SCN_BDD/SIVSS", "SIVSS_SCN", "sa_sivss.csv"),
+        ])
+
+    assert cancel.is_set()
+    assert not (tmp_path / "input" / "sa_sivss.csv").exists()
+
+
+def test_cancel_set_by_the_consumer_stops_the_download(sftp_server, tmp_path):
+    write_remote(sftp_server, "/SCN_BDD/SIREC", "sirec_2025.csv", CSV)
+    cancel = threading.Event()
+    cancel.set()
+
+    with pytest.raises(DownloadCancelled):
+        downloader(sftp_server, tmp_path, cancel=cancel).download_all([entry("/SCN_BDD/SIREC", "sirec", "sa_sirec.csv")])
+
+    assert not (tmp_path / "input" / "sa_sirec.csv").exists()
@@ -0,0 +1,78 @@
+"""Tests of sftp_manifest.py: up-to-date detection, resume conditions and persistence."""
+
+import hashlib
+import os
+
+from sftp_download import RemoteFile
+from sftp_manifest import SyncManifest
+
+REMOTE = RemoteFile("/SCN_BDD/SIREC", "sirec_2025.csv", 1000, 1_700_000_000)
+DATA = b"x" * 1000
+
+
+def complete_download(tmp_path, data: bytes = DATA):
+    manifest = SyncManifest.for_directory(str(tmp_path / "input"))
+    local_path = tmp_path / "sa_sirec.csv"
+    local_path.write_bytes(data)
+    manifest.mark_pending("sa_sirec.csv", REMOTE)
+    manifest.mark_complete("sa_sirec.csv", str(local_path), hashlib.sha256(data).hexdigest())
+    return manifest, local_path
+
+
+def test_manifest_is_stored_next_to_the_input_directory(tmp_path):
+    manifest, _ = complete_download(tmp_path)
+
+    assert manifest.path == str(tmp_path / "input_sftp_manifest.json")
+    reloaded = SyncManifest.for_directory(str(tmp_path / "input") + "/")
+    assert reloaded.get("sa_sirec.csv") == manifest.get("sa_sirec.csv")
+
+
+def test_complete_copy_of_the_same_remote_version_is_up_to_date(tmp_path):
+    manifest, local_path = complete_download(tmp_path)
+    newer = RemoteFile(REMOTE.path, REMOTE.name, REMOTE.size, REMOTE.mtime + 1)
+
+    assert manifest.is_up_to_date("sa_sirec.csv", REMOTE, str(local_path))
+    assert not manifest.is_up_to_date("sa_sirec.csv", newer, str(local_path))
+    assert not manifest.is_up_to_date("sa_sivss.csv", REMOTE, str(local_path))
+
+
+def test_touched_local_copy_is_checked_against_its_checksum(tmp_path):
+    manifest, local_path = complete_download(tmp_path)
+    os.utime(local_path, (1, 1))
+    assert manifest.is_up_to_date("sa_sirec.csv", REMOTE, str(local_path))
+
+    local_path.write_bytes(b"y" * 1000)
+    assert not manifest.is_up_to_date("sa_sirec.csv", REMOTE, str(local_path))
+
+
+def test_local_size_is_used_for_transcoded_or_decompressed_copies(tmp_path):
+    manifest, local_path = complete_download(tmp_path, DATA * 3)
+
+    assert manifest.get("sa_sirec.csv").local_size == 3000
+    assert manifest.is_up_to_date("sa_sirec.csv", REMOTE, str(local_path))
+
+
+def test_only_a_pending_transfer_of_the_same_version_can_resume(tmp_path):
+    manifest = SyncManifest.for_directory(str(tmp_path / "input"))
+    part_path = tmp_path / "sa_sirec.csv.part"
+    manifest.mark_pending("sa_sirec.csv", REMOTE)
+    assert not manifest.can_resume("sa_sirec.csv", REMOTE, str(part_path))
+
+    part_path.write_bytes(DATA[:400])
+    other = RemoteFile(REMOTE.path, "sirec_2026.csv", REMOTE.size, REMOTE.mtime)
+    assert manifest.can_resume("sa_sirec.csv", REMOTE, str(part_path))
+    assert not manifest.can_resume("sa_sirec.csv", other, str(part_path))
+
+    part_path.write_bytes(DATA + b"extra")
+    assert not manifest.can_resume("sa_sirec.csv", REMOTE, str(part_path))
+
+
+def test_pending_entry_survives_a_restart(tmp_path):
+    manifest = SyncManifest.for_directory(str(tmp_path / "input"))
+    manifest.mark_pending("sa_sirec.csv", REMOTE)
+    part_path = tmp_path / "sa_sirec.csv.part"
+    part_path.write_bytes(DATA[:400])
+
+    reloaded = SyncManifest(manifest.path)
+
+    assert reloaded.can_resume("sa_sirec.csv", REMOTE, str(part_path))
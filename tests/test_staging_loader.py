@@ -0,0 +1,93 @@
+"""Tests of staging_loader.py: native boolean conversion, duplicated headers and history table references."""
+
+import logging
+
+import pytest
+
+from run_report import RunReport
+from staging_loader import NativeDuckDBLoader, StreamingDuckDBLoader, history_table_references
+
+DDL = """CREATE TABLE sa_flags (
+    id INTEGER,
+    flag BOOLEAN
+);
+"""
+
+
+def test_native_loader_sets_unmapped_booleans_to_false_and_counts_them(tmp_path):
+    (tmp_path / "ddl").mkdir()
+    (tmp_path / "ddl" / "sa_flags.sql").write_text(DDL, encoding="utf-8")
+    (tmp_path / "input").mkdir()
+    (tmp_path / "input" / "sa_flags.csv").write_text("id,flag\n1,true\n2,oui\n3,\n4,False\n", encoding="utf-8")
+    report = RunReport()
+    loader = NativeDuckDBLoader(
+        db_config={"path": str(tmp_path / "test.duckdb")},
+        config={"local_directory_input": str(tmp_path / "input"), "create_table_directory": str(tmp_path / "ddl")},
+        logger=logging.getLogger("test_staging_loader"),
+        report=report,
+    )
+    loader.connect()
+    try:
+        loader.run()
+        rows = loader.conn.execute("SELECT id, flag FROM sa_flags ORDER BY id").fetchall()
+    finally:
+        loader.close()
+
+    assert rows == [(1, True), (2, False), (3, False), (4, False)]
+    assert report.coerced == {"sa_flags": {"flag": 1}}
+
+
+DUPLICATED_DDL = """CREATE TABLE sa_counts (
+    a VARCHAR,
+    n_1 INTEGER,
+    n_11 INTEGER,
+    n_2 INTEGER
+);
+"""
+
+
+@pytest.mark.parametrize("loader_class", [NativeDuckDBLoader, StreamingDuckDBLoader])
+def test_duplicated_headers_fill_their_suffixed_columns(tmp_path, caplog, loader_class):
+    (tmp_path / "ddl").mkdir()
+    (tmp_path / "ddl" / "sa_counts.sql").write_text(DUPLICATED_DDL, encoding="utf-8")
+    (tmp_path / "input").mkdir()
+    (tmp_path / "input" / "sa_counts.csv").write_text("A,N-1,N-1\nx,1,2\ny,3,4\n", encoding="utf-8")
+    loader = loader_class(
+        db_config={"path": str(tmp_path / "test.duckdb")},
+        config={"local_directory_input": str(tmp_path / "input"), "create_table_directory": str(tmp_path / "ddl")},
+        logger=logging.getLogger("test_staging_loader"),
+        chunk_rows=1,
+    )
+    loader.connect()
+    try:
+        with caplog.at_level(logging.WARNING, logger="test_staging_loader"):
+            loader.run()
+        rows = loader.conn.execute("SELECT a, n_1, n_11, n_2 FROM sa_counts ORDER BY a").fetchall()
+    finally:
+        loader.close()
+
+    assert rows == [("x", 1, 2, None), ("y", 3, 4, None)]
+    assert "1 column(s) not found in the CSV header, left NULL: n_2" in caplog.text
+    assert "falling back to pandas" not in caplog.text
+
+
+def test_history_table_references_are_found_in_dbt_files(tmp_path):
+    models = tmp_path / "dbt" / "models"
+    models.mkdir(parents=True)
+    (models / "histo.sql").write_text("select * from {{ source('staging', 'zsa_sivss') }}", encoding="utf-8")
+    (models / "current.sql").write_text("select * from {{ source('staging', 'sa_sivss') }}", encoding="utf-8")
+    (tmp_path / "dbt" / "target").mkdir()
+    (tmp_path / "dbt" / "target" / "compiled.sql").write_text("select * from zsa_sirec", encoding="utf-8")
+
+    references = history_table_references(str(tmp_path / "dbt"), ["sa_sivss", "sa_sirec"])
+
+    assert references == {"zsa_sivss": ["models/histo.sql"]}
+
+
+def test_repository_dbt_project_reads_no_history_table():
+    from conftest import BASE_PATH
+    from ddl_schema import load_table_schemas
+
+    tables = load_table_schemas(str(BASE_PATH / "output_sql" / "staging"))
+
+    assert history_table_references(str(BASE_PATH / "dbtStaging"), tables) == {}
@@ -0,0 +1,49 @@
+"""Tests of benchmarks/synthetic_data.py: generated headers normalize back to the DDL column names."""
+
+import sys
+
+import pytest
+
+from conftest import BASE_PATH
+
+sys.path.insert(0, str(BASE_PATH / "benchmarks"))
+
+from ddl_schema import load_table_schemas, normalize_column_name, normalize_column_names
+from synthetic_data import SyntheticTableWriter, accented_header, accented_headers
+
+SCHEMAS = load_table_schemas(str(BASE_PATH / "output_sql" / "staging"))
+
+
+@pytest.mark.parametrize("table_name", sorted(SCHEMAS))
+def test_every_header_normalizes_back_to_its_column(table_name):
+    column_names = SCHEMAS[table_name].column_names
+
+    assert normalize_column_names(accented_headers(column_names)) == column_names
+
+
+def test_name_truncated_after_an_underscore_gets_a_continued_header():
+    column_name = "nombre_total_de_chambres_installees_au_31_decembre_de_lannee_n_"
+
+    header = accented_header(column_name)
+
+    assert header.endswith("n-1")
+    assert normalize_column_name(header) == column_name
+
+
+def test_duplicated_columns_repeat_the_header_of_their_column():
+    headers = accented_headers(["n_1", "n_11", "commentaire", "commentaire_1"])
+
+    assert headers[1] == headers[0]
+    assert headers[3] != headers[2] and headers[3].lower() == headers[2].lower()
+
+
+def test_generated_file_header_matches_the_ddl(tmp_path):
+    schema = SCHEMAS["sa_tdb_esms"]
+    path = tmp_path / "sa_tdb_esms.csv"
+
+    SyntheticTableWriter(schema).write(str(path), 10)
+
+    writer = SyntheticTableWriter(schema)
+    with open(path, encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split(writer.delimiter)
+    assert normalize_column_names(header) == schema.column_names
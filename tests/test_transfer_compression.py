@@ -0,0 +1,67 @@
+"""Tests of transfer_compression.py: variant detection, preference and streaming decompression."""
+
+import gzip
+import io
+
+import pytest
+
+import transfer_compression
+from transfer_compression import (
+    SUPPORTED_COMPRESSIONS,
+    compression_of,
+    is_supported,
+    missing_decompressor,
+    open_decompressed,
+    preference,
+    strip_compression,
+)
+
+DATA = b"".join(f"{i};value_{i}\n".encode() for i in range(50_000))
+
+
+def test_compression_is_read_from_the_extension():
+    assert compression_of("sirec_20251026.csv.gz") == "gzip"
+    assert compression_of("SIREC_20251026.CSV.ZST") == "zstd"
+    assert compression_of("sirec_20251026.csv") is None
+    assert strip_compression("SIREC_20251026.CSV.GZ") == "SIREC_20251026.CSV"
+    assert strip_compression("sirec_20251026.csv") == "sirec_20251026.csv"
+
+
+def test_supported_compressions_are_preferred_over_the_plain_file():
+    names = sorted(["sirec.csv", "sirec.csv.gz", "sirec.csv.zst"], key=preference)
+
+    assert names[-1] == "sirec.csv"
+    assert names[0] == ("sirec.csv.zst" if "zstd" in SUPPORTED_COMPRESSIONS else "sirec.csv.gz")
+    assert is_supported("sirec.csv") and is_supported("sirec.csv.gz")
+
+
+def test_concatenated_gzip_members_are_read_through():
+    stream = io.BytesIO(gzip.compress(DATA[:1000]) + gzip.compress(DATA[1000:]))
+
+    with open_decompressed(stream, "gzip") as reader:
+        assert reader.read() == DATA
+
+
+def test_concatenated_zstd_frames_are_read_through():
+    zstandard = pytest.importorskip("zstandard")
+    compressor = zstandard.ZstdCompressor()
+    stream = io.BytesIO(compressor.compress(DATA[:1000]) + compressor.compress(DATA[1000:]))
+
+    with open_decompressed(stream, "zstd") as reader:
+        assert b"".join(iter(lambda: reader.read(4096), b"")) == DATA
+
+
+def test_unknown_compression_is_rejected():
+    with pytest.raises(ValueError, match="bzip2"):
+        open_decompressed(io.BytesIO(b""), "bzip2")
+
+
+def test_zstd_without_zstandard_names_the_package_to_install(monkeypatch):
+    monkeypatch.setattr(transfer_compression, "zstandard", None)
+    monkeypatch.setattr(transfer_compression, "SUPPORTED_COMPRESSIONS", ("gzip",))
+
+    assert not is_supported("sirec.csv.zst")
+    assert "'zstandard' package" in missing_decompressor("sirec.csv.zst")
+    assert missing_decompressor("sirec.csv.gz") is None
+    with pytest.raises(ValueError, match="zstandard"):
+        open_decompressed(io.BytesIO(b""), "zstd")
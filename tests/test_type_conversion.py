@@ -0,0 +1,36 @@
+"""Tests of type_conversion.py: boolean mapping and coerced value counts."""
+
+import pandas as pd
+
+from type_conversion import compile_plan, to_bool
+
+
+def test_mapped_boolean_values_stay_plain_bool():
+    converted, coerced = to_bool(pd.Series(["true", "False", "1", "n", "", None], dtype="string"), "b")
+
+    assert converted.dtype == bool
+    assert converted.tolist() == [True, False, True, False, False, False]
+    assert coerced == 0
+
+
+def test_unmapped_boolean_values_become_false_and_are_counted():
+    converted, coerced = to_bool(pd.Series(["true", "oui", "false", "oui", "?"], dtype="string"), "b")
+
+    assert converted.dtype == bool
+    assert converted.tolist() == [True, False, False, False, False]
+    assert coerced == 3
+
+
+def test_plan_counts_unmapped_booleans():
+    schema_df = pd.DataFrame({
+        "column_name": ["flag", "label"],
+        "column_base_type": ["BOOLEAN", "VARCHAR"],
+        "column_length": [None, None],
+    })
+    df = pd.DataFrame({"flag": ["yes", "peut-être"], "label": ["a", None]}, dtype="string")
+    coerced = {}
+
+    compile_plan(schema_df, {"BOOLEAN": "bool", "VARCHAR": "string"}).apply(df, coerced)
+
+    assert df["flag"].tolist() == [True, False]
+    assert coerced == {"flag": 1}
@@ -1,15 +1,45 @@
 #!/usr/bin/env python3
 """
 CSV Schema Validation Script for ANAIS Pipeline
-Validates CSV files in input/staging/ directory against expected schemas from SQL files
+Validates the CSV files of input/staging/ listed in metadata.yml (files_to_download)
+against the CREATE TABLE files of output_sql/staging/.
+
+Each file is streamed once (never fully loaded in memory) and checked for:
+- header columns matching the DDL columns (normalized names)
+- the column count of every row
+- values parsing as the declared type (INTEGER/BIGINT/REAL, BOOLEAN, DATE)
+- VARCHAR(n) lengths (longer values are truncated by the loaders)
+
+Files are validated in parallel and a JSON summary is written to logs/.
+
+Usage:
+    python3 tests/validate_csv_schemas.py
+    python3 tests/validate_csv_schemas.py --workers 8 --summary logs/csv_validation.json
 """
 
+import argparse
 import csv
-import re
-from pathlib import Path
-from typing import Dict, List, Tuple
-from collections import defaultdict
+import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_PATH))
+
+from ddl_schema import TableSchema, load_table_schemas, normalize_column_names
+from file_inspection import inspect_file
+from type_conversion import BOOL_MAP, DATE_FORMATS, NUMERIC_NULLS
+
+# Maximum number of example line numbers / values kept per issue
+MAX_SAMPLES = 5
+# Fields may be very long (free-text columns)
+csv.field_size_limit(sys.maxsize)
 
 # ANSI color codes for terminal output
 class Colors:
@@ -20,342 +50,248 @@ class Colors:
     BOLD = '\033[1m'
     END = '\033[0m'
 
-# Expected schemas (extracted from SQL CREATE TABLE statements)
-SCHEMAS = {
-    'sa_sirec': [
-        'numero_de_la_reclamation', 'ancien_numero_de_la_reclamation', 'numero_demat_social',
-        'service_gestionnaire', 'statut_de_la_reclamation', 'services_en_lecture',
-        'signalement', 'date_de_la_demande_du_requerant', 'date_de_reception_a_l_ars',
-        'service_de_premier_niveau', 'date_de_reception_au_service_de_premier_niveau',
-        'description', 'date_de_creation_de_la_reclamation', 'domaine_fonctionnel',
-        'mode_de_reception', 'prioritaire_oui_non', 'precisions_sur_le_caractere_prioritaire',
-        'departement_de_la_reclamation', 'destinataire_s_de_la_reclamation',
-        'destinataire_primaire', 'destinataire_secondaire', 'saisine_du_procureur_par_requerant',
-        'institutions_de_provenance', 'date_de_reception_a_l_institution_de_provenance',
-        'reponse_attendue', 'courrier_signale_oui_non', 'le_requerant_est',
-        'le_requerant_est_anonyme', 'le_requerant_souhaite_garder_l_anonymat',
-        'statut_du_requerant', 'plus_de_2_reclamations_deposees', 'usager_victime_non_identifiee',
-        'sans_mis_en_cause', 'n_finess_rpps', 'autre_type', 'nom_structure', 'adresse',
-        'code_postal', 'ville', 'service_pour_les_etablissements_sanitaires',
-        'observations_du_mis_en_cause', 'motifs_igas_entree', 'motifs_igas_sortie',
-        'niveau_de_competence_de_traitement_de_la_reclamation', 'institution_s_partenaire_s',
-        'precisions_sur_le_niveau_de_competence_de_traitement_de_la_recl',
-        'envoi_d_un_accuse_reception', 'date_d_envoi_de_l_ar', 'precisions_sur_le_non_envoi_de_l_ar',
-        'date_de_transfert_a_l_institution_competente', 'date_de_prise_en_charge_par_le_service_gestionnaire',
-        'type_de_traitement', 'precisions_sur_le_type_de_traitement',
-        'reclamation_en_lien_avec_un_ou_plusieurs_signalements', 'numero_s_de_signalement_s_associe_s',
-        'date_d_examen_en_commission', 'type_d_action', 'mesures_prises_par_le_mis_en_cause',
-        'mesures_a_l_initiative_de', 'reponse_au_requerant_par_l_ars', 'date_de_reponse_au_requerant',
-        'precisions_sur_la_reponse_au_requerant', 'date_de_reponse_a_l_institution_de_provenance',
-        'motif_de_cloture', 'commentaire', 'date_de_cloture', 'siege_ars', 'motifs_declares'
-    ],
-    'sa_sivss': [
-        'structure_intitule', 'numero_sivss', 'date_reception', 'famille_principale',
-        'nature_principale', 'autre_signal_libelle', 'famille_secondaire', 'nature_secondaire',
-        'autre_signal_secondaire_libelle', 'est_eigs', 'consequences_personne_exposee',
-        'reclamation', 'declarant_est_anonyme', 'declarant_qualite_fonction',
-        'declarant_categorie', 'declarant_organisme_type', 'declarant_etablissement_type',
-        'declarant_organisme_numero_finess', 'declarant_organisme_nom',
-        'declarant_organisme_region', 'declarant_organisme_departement',
-        'declarant_organisme_code_postal', 'declarant_organisme_commune',
-        'declarant_organisme_code_insee', 'survenue_cas_collectivite', 'scc_organisme_type',
-        'scc_etablissement_type', 'scc_organisme_nom', 'scc_organisme_finess',
-        'scc_organisme_region', 'scc_organisme_departement', 'scc_organisme_code_postal',
-        'scc_organisme_commune', 'scc_organisme_code_insee', 'etat', 'support_signalement',
-        'date_cloture', 'motif_cloture'
-    ],
-    'sa_siicea_decisions': [
-        'type_de_decision', 'complement', 'theme_decision', 'sous_theme_decision',
-        'nombre_d_ecart', 'commentaire', 'nombre_de_decisions', 'statut_de_decision',
-        'identifiant_de_la_mission', 'date_realisation_visite_mission', 'type_de_mission',
-        'modalite_d_investigation', 'groupe_de_cibles', 'nom_de_la_cible',
-        'finess_geographique', 'finess_de_rattcahement', 'identifiant_rpps',
-        'identifiant_siret', 'identifiant_uai', 'code_ape', 'type_d_etablissement',
-        'departement', 'commune', 'coordonnateur_mission',
-        'date_previsionelle', 'date_de_realisation', 'etat_d_avancement',
-        'action_type_action', 'commentaire_action', 'date_echeance_previsionnelle_action',
-        'date_realisation_action', 'etat_avancement_action'
-    ],
-    'sa_siicea_cibles': [
-        'finess', 'finess_ej', 'rpps', 'siret', 'code_ape', 'code_uai',
-        'groupe_cibles', 'nom_cible', 'code_departement', 'commune', 'adresse',
-        'nb_mission_realisees', 'nb_mission_abandonnees', 'nb_decisions'
-    ],
-    'sa_siicea_missions_prog': [
-        'identifiant_de_la_mission', 'mission_proposee_par', 'secteur_d_intervention',
-        'code_theme_igas', 'theme_igas', 'code_theme_regional', 'theme_regional',
-        'type_d_orientation', 'commanditaire_principal', 'referent_thematique',
-        'references_reglementaires', 'type_de_mission', 'modalite_d_investigation',
-        'type_de_planification', 'modalite_de_la_mission', 'critere_de_ciblage_1',
-        'critere_de_ciblage_2', 'critere_de_ciblage_3', 'mission_conjointe_avec_1',
-        'mission_conjointe_avec_2', 'code_uai', 'code_rpps', 'code_siret',
-        'departement', 'commune', 'adresse', 'groupe_de_cibles', 'cible',
-        'service_cible', 'caractere_juridique', 'type_de_cible', 'finess_geographique',
-        'nom_agent_1', 'prenom_agent_1', 'role_mission_agent_1', 'profession_agent_1',
-        'statut_agent_1', 'departement_agent_1', 'temps_total_agent_1',
-        'nom_agent_2', 'prenom_agent_2', 'role_mission_agent_2', 'profession_agent_2',
-        'statut_agent_2', 'departement_agent_2', 'temps_total_agent_2',
-        'nom_agent_3', 'prenom_agent_3', 'role_mission_agent_3', 'profession_agent_3',
-        'statut_agent_3', 'departement_agent_3', 'temps_total_agent_3',
-        'nom_agent_4', 'prenom_agent_4', 'role_mission_agent_4', 'profession_agent_4',
-        'statut_agent_4', 'departement_agent_4', 'temps_total_agent_4',
-        'nom_agent_5', 'prenom_agent_5', 'role_mission_agent_5', 'profession_agent_5',
-        'statut_agent_5', 'departement_agent_5', 'temps_total_agent_5',
-        'nom_agent_6', 'prenom_agent_6', 'role_mission_agent_6', 'profession_agent_6',
-        'statut_agent_6', 'departement_agent_6', 'temps_total_agent_6',
-        'nom_agent_7', 'prenom_agent_7', 'role_mission_agent_7', 'profession_agent_7',
-        'statut_agent_7', 'departement_agent_7', 'temps_total_agent_7',
-        'nom_agent_8', 'prenom_agent_8', 'role_mission_agent_8', 'profession_agent_8',
-        'statut_agent_8', 'departement_agent_8', 'temps_total_agent_8',
-        'date_de_realisation', 'date_prevue', 'duree_totale_de_la_mission',
-        'cout_total_de_la_mission', 'etat_d_avancement_de_la_mission', 'commentaire',
-        'commentaire_1', 'commentaire_2'
-    ],
-    'sa_siicea_missions_real': [
-        'identifiant_de_la_mission', 'mission_proposee_par', 'secteur_d_intervention',
-        'code_theme_igas', 'theme_igas', 'code_theme_regional', 'theme_regional',
-        'type_d_orientation', 'commanditaire_principal', 'referent_thematique',
-        'references_reglementaires', 'type_de_mission', 'modalite_d_investigation',
-        'type_de_planification', 'modalite_de_la_mission', 'critere_de_ciblage_1',
-        'critere_de_ciblage_2', 'critere_de_ciblage_3', 'mission_conjointe_avec_1',
-        'mission_conjointe_avec_2', 'code_uai', 'code_rpps', 'code_siret',
-        'departement', 'commune', 'adresse', 'groupe_de_cibles', 'cible',
-        'service_cible', 'caractere_juridique', 'type_de_cible', 'finess_geographique',
-        'nom_agent_1', 'prenom_agent_1', 'role_mission_agent_1', 'profession_agent_1',
-        'statut_agent_1', 'departement_agent_1', 'temps_total_agent_1',
-        'nom_agent_2', 'prenom_agent_2', 'role_mission_agent_2', 'profession_agent_2',
-        'statut_agent_2', 'departement_agent_2', 'temps_total_agent_2',
-        'nom_agent_3', 'prenom_agent_3', 'role_mission_agent_3', 'profession_agent_3',
-        'statut_agent_3', 'departement_agent_3', 'temps_total_agent_3',
-        'nom_agent_4', 'prenom_agent_4', 'role_mission_agent_4', 'profession_agent_4',
-        'statut_agent_4', 'departement_agent_4', 'temps_total_agent_4',
-        'nom_agent_5', 'prenom_agent_5', 'role_mission_agent_5', 'profession_agent_5',
-        'statut_agent_5', 'departement_agent_5', 'temps_total_agent_5',
-        'nom_agent_6', 'prenom_agent_6', 'role_mission_agent_6', 'profession_agent_6',
-        'statut_agent_6', 'departement_agent_6', 'temps_total_agent_6',
-        'nom_agent_7', 'prenom_agent_7', 'role_mission_agent_7', 'profession_agent_7',
-        'statut_agent_7', 'departement_agent_7', 'temps_total_agent_7',
-        'nom_agent_8', 'prenom_agent_8', 'role_mission_agent_8', 'profession_agent_8',
-        'statut_agent_8', 'departement_agent_8', 'temps_total_agent_8',
-        'date_de_realisation', 'date_prevue', 'duree_totale_de_la_mission',
-        'cout_total_de_la_mission', 'etat_d_avancement_de_la_mission', 'commentaire',
-        'commentaire_1', 'commentaire_2'
-    ]
-}
-
-# Expected delimiters by schema
-DELIMITER_MAP = {
-    'sa_sirec': ';',
-    'sa_sivss': '¤',
-    'sa_siicea_decisions': ',',
-    'sa_siicea_cibles': ',',
-    'sa_siicea_missions_prog': ',',
-    'sa_siicea_missions_real': ','
-}
-
-def shorten_column_names(text: str, max_length: int = 63) -> str:
-    """Truncate column names to PostgreSQL 63-character limit"""
-    if len(text) > max_length:
-        return text[:max_length]
-    return text
-
-def normalize_column_name(name: str) -> str:
-    """
-    Normalize column name to match pipeline standardization:
-    - Convert to lowercase
-    - Replace French accented characters
-    - Replace special characters with underscores
-    - Truncate to 63 characters (PostgreSQL limit)
-    """
-    # Replace French accented characters
-    accent_map = {
-        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
-        'à': 'a', 'â': 'a', 'ä': 'a',
-        'î': 'i', 'ï': 'i',
-        'ô': 'o', 'ö': 'o',
-        'ù': 'u', 'û': 'u', 'ü': 'u',
-        'ç': 'c', 'ñ': 'n',
-        'É': 'E', 'È': 'E', 'Ê': 'E', 'Ë': 'E',
-        'À': 'A', 'Â': 'A', 'Ä': 'A',
-        'Î': 'I', 'Ï': 'I',
-        'Ô': 'O', 'Ö': 'O',
-        'Ù': 'U', 'Û': 'U', 'Ü': 'U',
-        'Ç': 'C', 'Ñ': 'N'
-    }
-
-    for accented, plain in accent_map.items():
-        name = name.replace(accented, plain)
-
-    # Convert to lowercase
-    col = name.lower()
-
-    # Replace special characters (keep only alphanumeric and underscore)
-    col = re.sub(r'[^\w]', '_', col)
-
-    # Remove consecutive underscores
-    col = re.sub(r'_+', '_', col)
-
-    # Remove leading/trailing underscores
-    col = col.strip('_')
 
-    # Truncate to 63 characters
-    return shorten_column_names(col)
-
-def detect_delimiter(file_path: Path, potential_delimiters: List[str] = [',', ';', '¤', '\t']) -> str:
-    """
-    Detect CSV delimiter by reading first line and counting occurrences.
-    """
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        # Skip any leading empty lines
-        first_line = None
-        for line in f:
-            if line.strip():
-                first_line = line
-                break
-
-        if not first_line:
-            return ','  # Default fallback
-
-        # Count each delimiter
-        delimiter_counts = {}
-        for delimiter in potential_delimiters:
-            delimiter_counts[delimiter] = first_line.count(delimiter)
-
-        # Return delimiter with highest count
-        detected = max(delimiter_counts.items(), key=lambda x: x[1])
-        return detected[0] if detected[1] > 0 else ','
-
-def validate_csv_file(file_path: Path, schema_name: str) -> Dict:
+def load_expected_files(config: Dict) -> List[str]:
+    """CSV file names listed in files_to_download for a profile of metadata.yml"""
+    return [entry['file'] for entry in config.get('files_to_download') or []]
+
+
+class ColumnCheck:
+    """Type and length check of one column, with its failure counts and samples"""
+
+    def __init__(self, name: str, target: str, length: Optional[int], formats: Tuple[str, ...] = DATE_FORMATS):
+        self.name = name
+        self.target = target
+        self.length = length
+        self.formats = formats
+        self.invalid = 0
+        self.too_long = 0
+        self.samples: List[str] = []
+
+    def check(self, value: str) -> None:
+        if self.length is not None and len(value) > self.length:
+            self.too_long += 1
+        if self.target in ('int', 'float'):
+            if value.strip() in NUMERIC_NULLS:
+                return
+            try:
+                float(value)
+            except ValueError:
+                self._invalid(value)
+        elif self.target == 'bool':
+            if value and value not in BOOL_MAP:
+                self._invalid(value)
+        elif self.target == 'datetime64':
+            if value and not any(self._parses(value, date_format) for date_format in self.formats):
+                self._invalid(value)
+
+    @staticmethod
+    def _parses(value: str, date_format: str) -> bool:
+        try:
+            datetime.strptime(value, date_format)
+            return True
+        except ValueError:
+            return False
+
+    def _invalid(self, value: str) -> None:
+        self.invalid += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value[:50])
+
+
+def column_checks(schema: TableSchema, csv_columns: List[str]) -> Dict[int, ColumnCheck]:
+    """Checks of the CSV columns that need one (typed or VARCHAR(n)), by CSV position"""
+    columns = {column.name: column for column in schema.columns}
+    checks = {}
+    for position, name in enumerate(csv_columns):
+        column = columns.get(name)
+        if column is not None and (column.target != 'string' or column.length is not None):
+            checks[position] = ColumnCheck(name, column.target, column.length, column.formats or DATE_FORMATS)
+    return checks
+
+
+def validate_csv_file(file_path: Path, schema: TableSchema) -> Dict:
     """
-    Validate a single CSV file against its expected schema.
+    Validate a single CSV file against its DDL schema, streaming it once.
 
     Returns a dictionary with validation results.
     """
     result = {
         'file': file_path.name,
-        'schema': schema_name,
+        'schema': schema.name,
         'valid': True,
         'issues': [],
+        'warnings': [],
         'csv_columns': [],
-        'expected_columns': SCHEMAS[schema_name],
-        'delimiter': None
+        'expected_columns': schema.column_names,
+        'delimiter': None,
+        'encoding': None,
+        'rows': 0,
+        'bytes': file_path.stat().st_size,
     }
 
     try:
-        # Use expected delimiter from mapping
-        expected_delimiter = DELIMITER_MAP.get(schema_name, ',')
-        result['delimiter'] = expected_delimiter
-
-        # Read first line to get column names
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            # Skip warning line for SIREC (line 2 has warning text)
-            lines = f.readlines()
-            if schema_name == 'sa_sirec' and len(lines) > 1:
-                header_line = lines[0]
-            else:
-                header_line = lines[0] if lines else ''
-
-            # Parse CSV header
-            csv_reader = csv.reader([header_line], delimiter=expected_delimiter)
-            csv_columns_raw = next(csv_reader, [])
-
-            # Normalize column names
-            csv_columns = [normalize_column_name(col.strip()) for col in csv_columns_raw if col.strip()]
+        inspection = inspect_file(str(file_path), schema.name)
+        delimiter = inspection.delimiter
+        result['delimiter'] = delimiter
+        result['encoding'] = inspection.encoding
+        if inspection.encoding not in ('utf-8', 'utf-8-sig'):
+            result['warnings'].append(f"Encoding {inspection.encoding} (not UTF-8)")
+
+        with open(file_path, 'r', encoding=inspection.encoding, newline='') as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            header = next(reader, [])
+            csv_columns = normalize_column_names(header)
             result['csv_columns'] = csv_columns
 
-            # Check column count
-            expected_count = len(SCHEMAS[schema_name])
-            actual_count = len(csv_columns)
-
-            if actual_count != expected_count:
+            # Header vs DDL
+            expected_count = len(schema.column_names)
+            if len(csv_columns) != expected_count:
                 result['valid'] = False
                 result['issues'].append(
-                    f"Column count mismatch: expected {expected_count}, got {actual_count}"
+                    f"Column count mismatch: expected {expected_count}, got {len(csv_columns)}"
                 )
-
-            # Check for missing columns
-            expected_set = set(SCHEMAS[schema_name])
-            actual_set = set(csv_columns)
-
-            missing = expected_set - actual_set
-            extra = actual_set - expected_set
-
+            missing = set(schema.column_names) - set(csv_columns)
+            extra = set(csv_columns) - set(schema.column_names)
             if missing:
                 result['valid'] = False
                 result['issues'].append(f"Missing columns: {', '.join(sorted(missing))}")
-
             if extra:
                 result['valid'] = False
                 result['issues'].append(f"Extra columns: {', '.join(sorted(extra))}")
 
+            # Rows
+            checks = column_checks(schema, csv_columns)
+            checked = list(checks.items())
+            width = len(header)
+            bad_rows = 0
+            bad_row_samples = []
+            for row in reader:
+                if not row:
+                    continue
+                result['rows'] += 1
+                if len(row) != width:
+                    bad_rows += 1
+                    if len(bad_row_samples) < MAX_SAMPLES:
+                        bad_row_samples.append(f"line {reader.line_num}: {len(row)} fields")
+                    continue
+                for position, check in checked:
+                    check.check(row[position])
+
+        if bad_rows:
+            result['valid'] = False
+            result['issues'].append(
+                f"{bad_rows} row(s) with a column count different from the header ({width}): "
+                + "; ".join(bad_row_samples)
+            )
+        for check in checks.values():
+            if check.invalid:
+                result['valid'] = False
+                result['issues'].append(
+                    f"{check.name}: {check.invalid} value(s) not parsable as {check.target} "
+                    f"(e.g. {', '.join(repr(sample) for sample in check.samples)})"
+                )
+            if check.too_long:
+                result['warnings'].append(
+                    f"{check.name}: {check.too_long} value(s) longer than VARCHAR({check.length}), will be truncated"
+                )
+
+    except UnicodeDecodeError as e:
+        result['valid'] = False
+        result['issues'].append(f"Encoding error ({result['encoding']}) after {result['rows']} rows: {e}")
     except Exception as e:
         result['valid'] = False
         result['issues'].append(f"Error reading file: {str(e)}")
 
     return result
 
+
 def print_result(result: Dict):
     """Print validation result in a readable format"""
+    if result.get('missing'):
+        print(f"{Colors.BOLD}{result['file']}{Colors.END} ({result['schema']})")
+        print(f"  Status: {Colors.YELLOW}- MISSING{Colors.END}\n")
+        return
+
     status = f"{Colors.GREEN}✓ VALID{Colors.END}" if result['valid'] else f"{Colors.RED}✗ INVALID{Colors.END}"
 
     print(f"{Colors.BOLD}{result['file']}{Colors.END} ({result['schema']})")
     print(f"  Status: {status}")
-    print(f"  Delimiter: {result['delimiter']}")
+    print(f"  Delimiter: {result['delimiter']} - Encoding: {result.get('encoding')}")
     print(f"  Columns: {len(result['csv_columns'])} (expected: {len(result['expected_columns'])})")
+    print(f"  Rows: {result['rows']} ({result['bytes'] / 1024 / 1024:.1f} MB)")
 
     if result['issues']:
         print(f"  {Colors.RED}Issues:{Colors.END}")
         for issue in result['issues']:
             print(f"    - {issue}")
+    if result['warnings']:
+        print(f"  {Colors.YELLOW}Warnings:{Colors.END}")
+        for warning in result['warnings']:
+            print(f"    - {warning}")
 
     print()
 
+
 def main():
     """Main validation logic"""
+    parser = argparse.ArgumentParser(description="Validate staging CSV files against the DDL")
+    parser.add_argument('--profile', default='Staging', help="Profile of metadata.yml listing the files")
+    parser.add_argument('--input-dir', default=None, help="CSV directory (default: the profile input directory)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Files validated in parallel")
+    parser.add_argument('--summary', default=str(BASE_PATH / 'logs' / 'csv_validation_summary.json'),
+                        help="JSON summary file")
+    args = parser.parse_args()
+
     print(f"{Colors.BOLD}{'='*80}{Colors.END}")
     print(f"{Colors.BOLD}CSV Schema Validation - input/staging/ Directory{Colors.END}")
     print(f"{Colors.BOLD}{'='*80}{Colors.END}\n")
 
-    # Get base path (tests directory)
-    base_path = Path(__file__).parent.parent
-
-    # Find all CSV files in input/staging directory
-    csv_files = []
-    staging_dir = base_path / 'input' / 'staging'
+    with open(BASE_PATH / 'metadata.yml', 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)[args.profile]
+    staging_dir = Path(args.input_dir) if args.input_dir else BASE_PATH / config['local_directory_input']
+    schemas = load_table_schemas(str(BASE_PATH / config['create_table_directory']))
+    expected_files = load_expected_files(config)
 
     if not staging_dir.exists():
         print(f"{Colors.RED}Staging directory not found: {staging_dir}{Colors.END}")
         print(f"{Colors.YELLOW}Expected location: DBT/anais_staging/input/staging/{Colors.END}")
         return 1
 
-    # Map files to schemas based on file names (already renamed to sa_*.csv)
-    file_schema_map = {
-        'sa_sirec.csv': 'sa_sirec',
-        'sa_sivss.csv': 'sa_sivss',
-        'sa_siicea_decisions.csv': 'sa_siicea_decisions',
-        'sa_siicea_cibles.csv': 'sa_siicea_cibles',
-        'sa_siicea_missions_prog.csv': 'sa_siicea_missions_prog',
-        'sa_siicea_missions_real.csv': 'sa_siicea_missions_real',
-    }
-
-    for csv_file in staging_dir.glob('*.csv'):
-        # Find matching schema
-        if csv_file.name in file_schema_map:
-            schema_name = file_schema_map[csv_file.name]
-            csv_files.append((csv_file, schema_name))
+    # Files of files_to_download, matched to their schema by name (sa_sirec.csv -> sa_sirec)
+    results = []
+    csv_files = []
+    for file_name in expected_files:
+        schema_name = Path(file_name).stem
+        file_path = staging_dir / file_name
+        if schema_name not in schemas:
+            results.append({
+                'file': file_name, 'schema': schema_name, 'valid': False,
+                'issues': [f"No CREATE TABLE file for {schema_name}"], 'warnings': [],
+                'csv_columns': [], 'expected_columns': [], 'delimiter': None, 'encoding': None,
+                'rows': 0, 'bytes': 0,
+            })
+        elif not file_path.exists():
+            results.append({'file': file_name, 'schema': schema_name, 'valid': True, 'missing': True})
+        else:
+            csv_files.append((file_path, schemas[schema_name]))
 
     if not csv_files:
         print(f"{Colors.YELLOW}No CSV files found in {staging_dir}{Colors.END}")
-        print(f"{Colors.YELLOW}Expected files: sa_sirec.csv, sa_sivss.csv, sa_siicea_*.csv{Colors.END}")
+        print(f"{Colors.YELLOW}Expected files: {', '.join(expected_files)}{Colors.END}")
         return 1
 
-    print(f"Found {len(csv_files)} CSV file(s) to validate in {staging_dir}\n")
+    print(f"Found {len(csv_files)}/{len(expected_files)} CSV file(s) to validate in {staging_dir}\n")
 
-    # Validate each file
-    results = []
-    for file_path, schema_name in csv_files:
-        result = validate_csv_file(file_path, schema_name)
-        results.append(result)
+    # Validate files in parallel, largest first
+    csv_files.sort(key=lambda item: -item[0].stat().st_size)
+    start = datetime.now()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        results += list(executor.map(validate_csv_file, *zip(*csv_files)))
+    elapsed = (datetime.now() - start).total_seconds()
+
+    results.sort(key=lambda r: r['file'])
+    for result in results:
         print_result(result)
 
     # Summary
@@ -363,11 +299,32 @@ def main():
     print(f"{Colors.BOLD}Summary{Colors.END}")
     print(f"{Colors.BOLD}{'='*80}{Colors.END}")
 
-    valid_count = sum(1 for r in results if r['valid'])
-    invalid_count = len(results) - valid_count
+    missing_count = sum(1 for r in results if r.get('missing'))
+    valid_count = sum(1 for r in results if r['valid'] and not r.get('missing'))
+    invalid_count = sum(1 for r in results if not r['valid'])
+
+    summary_path = Path(args.summary)
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'validated_at': start.isoformat(timespec='seconds'),
+            'seconds': round(elapsed, 3),
+            'input_directory': str(staging_dir),
+            'total': len(results),
+            'valid': valid_count,
+            'invalid': invalid_count,
+            'missing': missing_count,
+            'files': [
+                {key: value for key, value in r.items() if key not in ('csv_columns', 'expected_columns')}
+                for r in results
+            ],
+        }, f, indent=2, ensure_ascii=False)
 
     print(f"Total files: {len(results)}")
     print(f"{Colors.GREEN}Valid: {valid_count}{Colors.END}")
+    if missing_count > 0:
+        print(f"{Colors.YELLOW}Missing: {missing_count}{Colors.END}")
+    print(f"Validated in {elapsed:.1f}s - summary: {summary_path}")
     if invalid_count > 0:
         print(f"{Colors.RED}Invalid: {invalid_count}{Colors.END}")
         return 1
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Compressed Transfers for ANAIS Staging
+
+Upstream producers may drop gzip (.gz) or zstd (.zst) versions of the extracts next
+to the plain files in the /SCN_BDD/... folders. This module tells the compressed
+variants apart and wraps a remote file in a streaming decompressor, so the
+downloader writes the plain CSV while it reads the compressed bytes, without any
+compressed or full uncompressed copy on disk first.
+
+zstd needs the optional 'zstandard' package (the 'compression' extra): without it,
+.zst files are ignored and the .gz or plain variant is downloaded instead. A file
+only published as .zst then fails with the package to install (missing_decompressor).
+
+Usage:
+    compression = compression_of("sirec_20251026.csv.gz")   # "gzip"
+    with open_decompressed(remote_file, compression) as reader:
+        for block in iter(lambda: reader.read(READ_BLOCK_SIZE), b""):
+            ...
+"""
+
+# === Packages ===
+import gzip
+from typing import BinaryIO, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional: .zst variants are not selected
+    zstandard = None
+
+# === Constants ===
+# Extension -> compression, in order of preference when several variants exist
+COMPRESSIONS = {".zst": "zstd", ".gz": "gzip"}
+SUPPORTED_COMPRESSIONS = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+# Package providing each optional decompressor
+DECOMPRESSOR_PACKAGES = {"zstd": "zstandard"}
+
+
+def compression_of(name: str) -> Optional[str]:
+    """Compression of a file from its extension ('zstd', 'gzip'), None for a plain file."""
+    lower_name = name.lower()
+    for extension, compression in COMPRESSIONS.items():
+        if lower_name.endswith(extension):
+            return compression
+    return None
+
+
+def strip_compression(name: str) -> str:
+    """Name of the plain file: 'sirec_20251026.csv.gz' -> 'sirec_20251026.csv'."""
+    lower_name = name.lower()
+    for extension in COMPRESSIONS:
+        if lower_name.endswith(extension):
+            return name[:-len(extension)]
+    return name
+
+
+def is_supported(name: str) -> bool:
+    """Return True if the file is plain or compressed with an available decompressor."""
+    compression = compression_of(name)
+    return compression is None or compression in SUPPORTED_COMPRESSIONS
+
+
+def missing_decompressor(name: str) -> Optional[str]:
+    """Message naming the package to install to read a compressed file, None if it is readable."""
+    compression = compression_of(name)
+    if compression is None or compression in SUPPORTED_COMPRESSIONS:
+        return None
+    return decompressor_hint(compression)
+
+
+def decompressor_hint(compression: str) -> str:
+    """Package to install for an optional decompressor."""
+    package = DECOMPRESSOR_PACKAGES[compression]
+    return f"{compression} decompression needs the '{package}' package (uv sync --extra compression, or pip install {package})"
+
+
+def preference(name: str) -> int:
+    """Rank of a variant (lower is preferred): supported compressions first, plain file last."""
+    compression = compression_of(name)
+    return SUPPORTED_COMPRESSIONS.index(compression) if compression in SUPPORTED_COMPRESSIONS else len(SUPPORTED_COMPRESSIONS)
+
+
+def open_decompressed(fileobj: BinaryIO, compression: str) -> BinaryIO:
+    """
+    Wrap a readable binary file in a streaming decompressor.
+
+    Concatenated gzip members and zstd frames are read through.
+
+    Raises
+    ------
+    ValueError
+        If the compression is unknown or its decompressor is not installed.
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if compression == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True, closefd=False)
+    if compression in DECOMPRESSOR_PACKAGES:
+        raise ValueError(decompressor_hint(compression))
+    raise ValueError(f"Unsupported compression: {compression}")
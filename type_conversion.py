@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Type Conversion Engine for ANAIS Staging
+
+This module compiles the schema of a staging table (as read from its CREATE TABLE
+file in output_sql/staging/) into a typed conversion plan, then applies that plan
+to a DataFrame column by column in a single pass.
+
+The conversion rules are the ones of the patched ColumnsManagement.convert_columns_type:
+    - int / float : NULL, '' and 'nan' become 0
+    - bool        : explicit string mapping ('true'/'false', 'yes'/'no', '1'/'0', ...),
+                    NULL and unmapped values become False, unmapped values are counted
+    - datetime64  : the column's formats declared in its DDL, tried in order
+                    (default '%d-%m-%Y'); values matching none become NaT and are counted
+    - string      : NULL becomes '', values are truncated to VARCHAR(n)
+
+Dates are parsed once per distinct value: a column of millions of rows usually
+holds a few thousand dates. Parsed values are also kept in a bounded cache per
+format list, so the batches of a chunked load do not parse them again.
+
+When pyarrow is installed, string columns are held as Arrow-backed strings
+(STRING_DTYPE) and NULL filling and truncation run as Arrow compute kernels on the
+column buffers, instead of Python objects copied at each step. Without pyarrow,
+the pandas "string" dtype is used.
+
+Usage:
+    from type_conversion import compile_plan
+    plan = compile_plan(schema_df, type_mapping)
+    plan.apply(df)
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional: pandas strings are used instead
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# === Constants ===
+DATE_FORMAT = "%d-%m-%Y"
+DATE_FORMATS = (DATE_FORMAT,)
+DATE_CACHE_SIZE = 100_000
+# dtype of string columns (and of the CSV values read by the loaders)
+STRING_DTYPE = "string[pyarrow]" if pa is not None else "string"
+NUMERIC_NULLS = ("", "nan")
+
+# Built once for every boolean column (was rebuilt for each column before)
+BOOL_MAP = {
+    # String representations
+    'true': True, 'True': True, 'TRUE': True,
+    'false': False, 'False': False, 'FALSE': False,
+    # Numeric representations
+    '1': True, 1: True, 1.0: True,
+    '0': False, 0: False, 0.0: False,
+    # NULL/empty representations
+    '': False,
+    'nan': False, 'NaN': False, 'NAN': False,
+    # Additional common formats
+    'yes': True, 'Yes': True, 'YES': True,
+    'no': False, 'No': False, 'NO': False,
+    'y': True, 'Y': True,
+    'n': False, 'N': False,
+    't': True, 'T': True,
+    'f': False, 'F': False,
+}
+
+# Parsed dates by format list: value -> datetime64 (NaT when no format matches)
+_date_cache: Dict[Tuple[str, ...], Dict[str, np.datetime64]] = {}
+_date_cache_lock = threading.Lock()
+
+
+# === Vectorized kernels ===
+def to_number(series: pd.Series, dtype: str) -> pd.Series:
+    """
+    Convert a column to int or float, NULL / '' / 'nan' becoming 0.
+
+    Raises
+    ------
+    ValueError
+        If a value cannot be parsed as a number.
+    """
+    if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        series = pd.to_numeric(series.mask(series.isin(NUMERIC_NULLS)), errors="raise")
+    return series.fillna(0).astype(dtype, copy=False)
+
+
+def to_bool(series: pd.Series, col_name: str) -> Tuple[pd.Series, int]:
+    """
+    Convert a column to bool through BOOL_MAP.
+
+    The mapping is applied to the distinct values only (factorized codes), then
+    broadcast back to every row. NULL values become False; unmapped values are
+    logged and become False too.
+
+    Returns
+    -------
+    Tuple[pd.Series, int]
+        Converted column and number of values set to False because BOOL_MAP does
+        not map them.
+    """
+    if pd.api.types.is_bool_dtype(series.dtype) and not series.hasnans:
+        return series.astype(bool, copy=False), 0
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    mapped = [BOOL_MAP.get(value) for value in uniques]
+
+    unmapped = np.array([flag is None for flag in mapped] + [False], dtype=bool)
+    # Last slot receives the NA sentinel (-1)
+    lookup = np.array([bool(flag) for flag in mapped] + [False], dtype=bool)
+    converted = pd.Series(lookup[codes], index=series.index, name=series.name)
+    if not unmapped.any():
+        return converted, 0
+
+    logger.warning(
+        f"⚠️  Column '{col_name}': Found unmapped boolean values: "
+        f"{[value for value, flag in zip(uniques, mapped) if flag is None]}. These will be converted to False."
+    )
+    return converted, int(unmapped[codes].sum())
+
+
+def parse_dates(values: np.ndarray, formats: Tuple[str, ...]) -> np.ndarray:
+    """
+    Parse distinct date strings, each format in turn on the values no previous
+    format matched. Cached values are not parsed again.
+    """
+    with _date_cache_lock:
+        cache = _date_cache.setdefault(formats, {})
+        parsed = np.array([cache.get(value, np.datetime64("NaT")) for value in values], dtype="datetime64[ns]")
+        pending = np.array([value not in cache for value in values], dtype=bool)
+
+    to_parse = pending.copy()
+    for date_format in formats:
+        if not to_parse.any():
+            break
+        attempt = pd.to_datetime(pd.Series(values[to_parse], dtype=object), format=date_format, errors="coerce")
+        attempt = attempt.to_numpy(dtype="datetime64[ns]")
+        matched = ~np.isnat(attempt)
+        indices = np.flatnonzero(to_parse)
+        parsed[indices[matched]] = attempt[matched]
+        to_parse[indices[matched]] = False
+
+    with _date_cache_lock:
+        if len(cache) + int(pending.sum()) > DATE_CACHE_SIZE:
+            cache.clear()
+        cache.update(zip(values[pending], parsed[pending]))
+    return parsed
+
+
+def to_datetime(series: pd.Series, formats: Tuple[str, ...] = DATE_FORMATS) -> Tuple[pd.Series, int]:
+    """
+    Convert a column to datetime64 with the given formats, tried in order.
+
+    Each distinct value is parsed once (factorized codes), then broadcast back to
+    every row. Empty and NULL values become NaT.
+
+    Returns
+    -------
+    Tuple[pd.Series, int]
+        Converted column and number of non-empty values that matched no format
+        (coerced to NaT).
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series, 0
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object).astype(str)
+    parsed = parse_dates(uniques, formats)
+
+    failed = np.isnat(parsed) & (np.char.strip(uniques) != "")
+    coerced = int(np.bincount(codes[codes >= 0], minlength=len(uniques))[failed].sum()) if failed.any() else 0
+
+    # Last slot receives the NA sentinel (-1)
+    lookup = np.append(parsed, np.datetime64("NaT", "ns"))
+    return pd.Series(lookup[codes], index=series.index, name=series.name), coerced
+
+
+def to_string(series: pd.Series, length: Optional[int]) -> pd.Series:
+    """Convert a column to string, NULL becoming '' and values truncated to length."""
+    if pa is None:
+        series = series.astype("string", copy=False).fillna("")
+        if length is not None:
+            series = series.str.slice(0, length)
+        return series
+
+    # No copy when the column was already read as Arrow strings
+    array = series.astype(STRING_DTYPE, copy=False).array.__arrow_array__()
+    array = pc.fill_null(array, "")
+    if length is not None:
+        array = pc.utf8_slice_codeunits(array, 0, length)
+    return pd.Series(pd.arrays.ArrowStringArray(array), index=series.index, name=series.name, copy=False)
+
+
+# === Conversion plan ===
+@dataclass(frozen=True)
+class ColumnStep:
+    """Conversion of a single column: target pandas type, VARCHAR length and date formats."""
+    name: str
+    target: str
+    length: Optional[int] = None
+    formats: Tuple[str, ...] = DATE_FORMATS
+
+    def run(self, series: pd.Series) -> Tuple[pd.Series, int]:
+        """Apply the kernel matching the target type to the column; return it with its coerced value count."""
+        if self.target in ("int", "float"):
+            return to_number(series, self.target), 0
+        if self.target == "bool":
+            return to_bool(series, self.name)
+        if self.target == "datetime64":
+            return to_datetime(series, self.formats)
+        if self.target == "string":
+            return to_string(series, self.length), 0
+        return series.astype(self.target), 0
+
+
+@dataclass(frozen=True)
+class ConversionPlan:
+    """Ordered list of column conversions compiled from a table schema."""
+    steps: Tuple[ColumnStep, ...]
+
+    def apply(self, df: pd.DataFrame, coerced: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+        """
+        Convert the columns of df in a single pass.
+
+        Converted columns are written back into df with one bulk assignment.
+        A column that fails to convert is logged and kept as is. Dates matching
+        none of their formats (set to NaT) and unmapped booleans (set to False) are
+        logged and counted.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame read from the CSV file, modified in place.
+        coerced : Optional[Dict[str, int]]
+            If set, receives (adds up) the number of values coerced to NaT / False per column.
+
+        Returns
+        -------
+        pd.DataFrame
+            The same DataFrame, for chaining.
+        """
+        converted = {}
+        for step in self.steps:
+            if step.name not in df.columns:
+                continue
+            try:
+                converted[step.name], count = step.run(df[step.name])
+            except ValueError as e:
+                logger.warning(f"Erreur de conversion pour {step.name}: {e}")
+                continue
+            if count and step.target == "datetime64":
+                logger.warning(
+                    f"⚠️  Column '{step.name}': {count} value(s) matching none of the date formats "
+                    f"{list(step.formats)} were set to NaT"
+                )
+            if count and coerced is not None:
+                coerced[step.name] = coerced.get(step.name, 0) + count
+
+        if converted:
+            df[list(converted)] = pd.DataFrame(converted, index=df.index, copy=False)
+        return df
+
+
+def _normalize_length(col_length) -> Optional[int]:
+    """Return the VARCHAR length as int, or None when the column has no length."""
+    if col_length is None or pd.isna(col_length):
+        return None
+    return int(col_length)
+
+
+def _normalize_formats(col_formats) -> Tuple[str, ...]:
+    """Return the declared date formats as a tuple, or DATE_FORMATS when none are declared."""
+    if isinstance(col_formats, (list, tuple)) and col_formats:
+        return tuple(col_formats)
+    return DATE_FORMATS
+
+
+@lru_cache(maxsize=None)
+def _compile(schema: Tuple[Tuple[str, str, Optional[int], Tuple[str, ...]], ...],
+             type_mapping: Tuple[Tuple[str, str], ...]) -> ConversionPlan:
+    """Compile (and cache) the plan of a schema signature."""
+    mapping = dict(type_mapping)
+    steps = tuple(
+        ColumnStep(name=col_name, target=mapping[col_type], length=col_length, formats=col_formats)
+        for col_name, col_type, col_length, col_formats in schema
+        if col_type in mapping
+    )
+    return ConversionPlan(steps)
+
+
+def compile_plan(schema_df: pd.DataFrame, type_mapping: dict) -> ConversionPlan:
+    """
+    Compile a table schema into a conversion plan.
+
+    Plans are cached: a table schema is compiled only once per process.
+
+    Parameters
+    ----------
+    schema_df : pd.DataFrame
+        Schema with columns 'column_name', 'column_base_type', 'column_length' and,
+        optionally, 'column_formats' (accepted date formats, see ddl_schema.py).
+    type_mapping : dict
+        SQL base type -> pandas type ('int', 'float', 'bool', 'datetime64', 'string').
+
+    Returns
+    -------
+    ConversionPlan
+        Plan to apply on the DataFrames of that table.
+    """
+    formats = schema_df["column_formats"] if "column_formats" in schema_df else [()] * len(schema_df)
+    schema = tuple(
+        (name, str(base_type), _normalize_length(length), _normalize_formats(col_formats))
+        for name, base_type, length, col_formats in zip(
+            schema_df["column_name"], schema_df["column_base_type"], schema_df["column_length"], formats
+        )
+    )
+    return _compile(schema, tuple(sorted(type_mapping.items())))